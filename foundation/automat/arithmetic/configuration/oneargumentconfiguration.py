@@ -4,48 +4,84 @@ FUNC_NAMES = {
         'reverse_prefix':'arc',
         'import':['from math import sin'],
         'code':['num=sin(v0)'],
+        'numpy_code':['num=numpy.sin(v0)'],
+        'numpy_derivative_code':['d0=numpy.cos(v0)'],
+        'derivatives':['(cos $0)'],
         'reverse_import':['from math import asin'],
-        'reverse_code':['num=asin(v0)']
+        'reverse_code':['num=asin(v0)'],
+        'reverse_numpy_code':['num=numpy.arcsin(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.sqrt(numpy.subtract(1.0, numpy.square(v0))))'],
+        'reverse_derivatives':['(/ 1 (nroot 2 (- 1 (^ $0 2))))']
     },
     "cos":{
         'class_name':'Cosine',
         'reverse_prefix':'arc',
         'import':['from math import cos'],
         'code':['num=cos(v0)'],
+        'numpy_code':['num=numpy.cos(v0)'],
+        'numpy_derivative_code':['d0=numpy.negative(numpy.sin(v0))'],
+        'derivatives':['(* -1 (sin $0))'],
         'reverse_import':['from math import acos'],
-        'reverse_code':['num=acos(v0)']
+        'reverse_code':['num=acos(v0)'],
+        'reverse_numpy_code':['num=numpy.arccos(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(-1.0, numpy.sqrt(numpy.subtract(1.0, numpy.square(v0))))'],
+        'reverse_derivatives':['(/ -1 (nroot 2 (- 1 (^ $0 2))))']
     },
     "tan":{
         'class_name':'Tangent',
         'reverse_prefix':'arc',
         'import':['from math import tan'],
         'code':['num=tan(v0)'],
+        'numpy_code':['num=numpy.tan(v0)'],
+        'numpy_derivative_code':['d0=numpy.add(1.0, numpy.square(num))'],
+        'derivatives':['(+ 1 (^ (tan $0) 2))'],
         'reverse_import':['from math import atan'],
-        'reverse_code':['num=atan(v0)']
+        'reverse_code':['num=atan(v0)'],
+        'reverse_numpy_code':['num=numpy.arctan(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.add(1.0, numpy.square(v0)))'],
+        'reverse_derivatives':['(/ 1 (+ 1 (^ $0 2)))']
     },
     "sec":{
         'class_name':'Secant',
         'reverse_prefix':'arc',
-        'import':['from math import sin'],
-        'code':['num=1.0/sin(v0)'],
-        'reverse_import':['from math import asin'],
-        'reverse_code':['num=1.0/asin(v0)']
+        'import':['from math import cos'],
+        'code':['num=1.0/cos(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.cos(v0))'],
+        'numpy_derivative_code':['d0=numpy.multiply(num, numpy.tan(v0))'],
+        'derivatives':['(* (sec $0) (tan $0))'],
+        'reverse_import':['from math import acos'],
+        'reverse_code':['num=acos(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arccos(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.multiply(numpy.square(v0), numpy.sqrt(numpy.subtract(1.0, numpy.square(numpy.divide(1.0, v0))))))'],
+        'reverse_derivatives':['(/ 1 (* (^ $0 2) (nroot 2 (- 1 (^ (/ 1 $0) 2)))))']
     },
     "cosec":{
         'class_name':'Cosecant',
         'reverse_prefix':'arc',
-        'import':['from math import cos'],
-        'code':['num=1.0/cos(v0)'],
-        'reverse_import':['from math import acos'],
-        'reverse_code':['num=1.0/acos(v0)']
+        'import':['from math import sin'],
+        'code':['num=1.0/sin(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.sin(v0))'],
+        'numpy_derivative_code':['d0=numpy.negative(numpy.divide(num, numpy.tan(v0)))'],
+        'derivatives':['(* -1 (* (cosec $0) (cot $0)))'],
+        'reverse_import':['from math import asin'],
+        'reverse_code':['num=asin(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arcsin(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(-1.0, numpy.multiply(numpy.square(v0), numpy.sqrt(numpy.subtract(1.0, numpy.square(numpy.divide(1.0, v0))))))'],
+        'reverse_derivatives':['(/ -1 (* (^ $0 2) (nroot 2 (- 1 (^ (/ 1 $0) 2)))))']
     },
     "cot":{
         'class_name':'Cotangent',
         'reverse_prefix':'arc',
         'import':['from math import tan'],
         'code':['num=1.0/tan(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.tan(v0))'],
+        'numpy_derivative_code':['d0=numpy.negative(numpy.add(1.0, numpy.square(num)))'],
+        'derivatives':['(* -1 (+ 1 (^ (cot $0) 2)))'],
         'reverse_import':['from math import atan'],
-        'reverse_code':['num=1.0/atan(v0)']
+        'reverse_code':['num=atan(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arctan(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(-1.0, numpy.add(1.0, numpy.square(v0)))'],
+        'reverse_derivatives':['(/ -1 (+ 1 (^ $0 2)))']
     },
     ####Hyperbolic Trigonometric functions
 
@@ -54,47 +90,83 @@ FUNC_NAMES = {
         'reverse_prefix':'arc',
         'import':['from math import sinh'],
         'code':['num=sinh(v0)'],
+        'numpy_code':['num=numpy.sinh(v0)'],
+        'numpy_derivative_code':['d0=numpy.cosh(v0)'],
+        'derivatives':['(cosh $0)'],
         'reverse_import':['from math import asinh'],
-        'reverse_code':['num=asinh(v0)']
+        'reverse_code':['num=asinh(v0)'],
+        'reverse_numpy_code':['num=numpy.arcsinh(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.sqrt(numpy.add(numpy.square(v0), 1.0)))'],
+        'reverse_derivatives':['(/ 1 (nroot 2 (+ (^ $0 2) 1)))']
     },
     "cosh":{
         'class_name':'Cosineh',
         'reverse_prefix':'arc',
         'import':['from math import cosh'],
         'code':['num=cosh(v0)'],
+        'numpy_code':['num=numpy.cosh(v0)'],
+        'numpy_derivative_code':['d0=numpy.sinh(v0)'],
+        'derivatives':['(sinh $0)'],
         'reverse_import':['from math import acosh'],
-        'reverse_code':['num=acosh(v0)']
+        'reverse_code':['num=acosh(v0)'],
+        'reverse_numpy_code':['num=numpy.arccosh(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.sqrt(numpy.subtract(numpy.square(v0), 1.0)))'],
+        'reverse_derivatives':['(/ 1 (nroot 2 (- (^ $0 2) 1)))']
     },
     "tanh":{
         'class_name':'Tangenth',
         'reverse_prefix':'arc',
         'import':['from math import tanh'],
         'code':['num=tanh(v0)'],
+        'numpy_code':['num=numpy.tanh(v0)'],
+        'numpy_derivative_code':['d0=numpy.subtract(1.0, numpy.square(num))'],
+        'derivatives':['(- 1 (^ (tanh $0) 2))'],
         'reverse_import':['from math import atanh'],
-        'reverse_code':['num=atanh(v0)']
+        'reverse_code':['num=atanh(v0)'],
+        'reverse_numpy_code':['num=numpy.arctanh(v0)'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.subtract(1.0, numpy.square(v0)))'],
+        'reverse_derivatives':['(/ 1 (- 1 (^ $0 2)))']
     },
     "sech":{
         'class_name':'Secanth',
         'reverse_prefix':'arc',
-        'import':['from math import sinh'],
-        'code':['num=1.0/sinh(v0)'],
-        'reverse_import':['from math import asinh'],
-        'reverse_code':['num=1.0/asinh(v0)']
+        'import':['from math import cosh'],
+        'code':['num=1.0/cosh(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.cosh(v0))'],
+        'numpy_derivative_code':['d0=numpy.negative(numpy.multiply(num, numpy.tanh(v0)))'],
+        'derivatives':['(* -1 (* (sech $0) (tanh $0)))'],
+        'reverse_import':['from math import acosh'],
+        'reverse_code':['num=acosh(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arccosh(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(-1.0, numpy.multiply(numpy.square(v0), numpy.sqrt(numpy.subtract(numpy.square(numpy.divide(1.0, v0)), 1.0))))'],
+        'reverse_derivatives':['(/ -1 (* (^ $0 2) (nroot 2 (- (^ (/ 1 $0) 2) 1))))']
     },
     "cosech":{
         'class_name':'Cosecanth',
         'reverse_prefix':'arc',
-        'import':['from math import cosh'],
-        'code':['num=1.0/cosh(v0)'],
-        'reverse_import':['from math import acosh'],
-        'reverse_code':['num=1.0/acosh(v0)']
+        'import':['from math import sinh'],
+        'code':['num=1.0/sinh(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.sinh(v0))'],
+        'numpy_derivative_code':['d0=numpy.negative(numpy.divide(num, numpy.tanh(v0)))'],
+        'derivatives':['(* -1 (* (cosech $0) (coth $0)))'],
+        'reverse_import':['from math import asinh'],
+        'reverse_code':['num=asinh(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arcsinh(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(-1.0, numpy.multiply(numpy.square(v0), numpy.sqrt(numpy.add(numpy.square(numpy.divide(1.0, v0)), 1.0))))'],
+        'reverse_derivatives':['(/ -1 (* (^ $0 2) (nroot 2 (+ (^ (/ 1 $0) 2) 1))))']
     },
     "coth":{
         'class_name':'Cotangenth',
         'reverse_prefix':'arc',
         'import':['from math import tanh'],
         'code':['num=1.0/tanh(v0)'],
+        'numpy_code':['num=numpy.divide(1.0, numpy.tanh(v0))'],
+        'numpy_derivative_code':['d0=numpy.subtract(1.0, numpy.square(num))'],
+        'derivatives':['(- 1 (^ (coth $0) 2))'],
         'reverse_import':['from math import atanh'],
-        'reverse_code':['num=1.0/atanh(v0)']
+        'reverse_code':['num=atanh(1.0/v0)'],
+        'reverse_numpy_code':['num=numpy.arctanh(numpy.divide(1.0, v0))'],
+        'reverse_numpy_derivative_code':['d0=numpy.divide(1.0, numpy.subtract(1.0, numpy.square(v0)))'],
+        'reverse_derivatives':['(/ 1 (- 1 (^ $0 2)))']
     },
 }
\ No newline at end of file
@@ -1,11 +1,12 @@
 from abc import ABC
-from copy import deepcopy
 import importlib
 import inspect
 import os
+import threading
 
 from foundation.automat import AUTOMAT_MODULE_DIR
-from foundation.automat.common.backtracker import Backtracker
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.persistentmap import PersistentMap
 
 
 class Function:#(metaclass=FunctionHook):
@@ -21,9 +22,14 @@ class Function:#(metaclass=FunctionHook):
 
 
     """
-    FUNC_NAMES = [] # TODO this need to filled in __init__, need to parse the folder automat.arithmetic.standard
-    FUNCNAME_FILENAME = [] # TODO this need to be filled in __init__, need to parse the folder automat.arithmetic.standard
+    FUNC_NAMES = [] # filled by gatherStandardFunctions, from the folder automat.arithmetic.standard
+    FUNCNAME_FILENAME = {} # filled by gatherStandardFunctions, from the folder automat.arithmetic.standard
+    FUNCNAME_CLASS = {} # filled by gatherStandardFunctions, from the folder automat.arithmetic.standard
     _TRIGNOMETRIC_NAMES = []
+    _GATHER_LOCK = threading.Lock() # so that no thread sees the standard functions half gathered
+    IDENTITIES = [] # filled by child, (lhs, rhs) rewrite rules that always hold, see RewriteRule
+    NUMPY_DERIVATIVE_CODE = [] # filled by child, d0, d1... are the partial derivatives of num, by v0, v1...
+    DERIVATIVES = [] # filled by child, partial derivative by each input, patterns with $0, $1... as the inputs
 
     def __init__subclass(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -34,45 +40,104 @@ class Function:#(metaclass=FunctionHook):
         #     cls.TRIGONOMETRIC_NAMES.append(funcName)
         # import pdb;pdb.set_trace()
 
-    # @property # for now it wll return a property-object, and the expected list... , TODO so we will use it as a cls_method FOR NOW
     @classmethod
-    def TRIGONOMETRIC_NAMES(cls):
-        if len(cls._TRIGNOMETRIC_NAMES) == 0:
-            #gather all the trigonometric function names
+    def gatherStandardFunctions(cls):
+        """
+        imports every module in automat.arithmetic.standard (only once), and fills FUNC_NAMES, FUNCNAME_FILENAME,
+        FUNCNAME_CLASS and the trigonometric names
+        """
+        if len(cls.FUNCNAME_CLASS) > 0: # already gathered
+            return
+        with cls._GATHER_LOCK:
+            if len(cls.FUNCNAME_CLASS) > 0: # gathered by another thread, while this one waited
+                return
+            funcNameClass = {}
             module_dir = os.path.join(AUTOMAT_MODULE_DIR, 'arithmetic', 'standard')
-            for module in os.listdir(module_dir):
-                # print('***', module)
+            for module in sorted(os.listdir(module_dir)):
                 if module.endswith('.py') and module != '__init__.py':
                     module_name = module[:-3] # remove .py
                     module_obj = importlib.import_module(f'.{module_name}', package='foundation.automat.arithmetic.standard')
                     for name, ocls in inspect.getmembers(module_obj, predicate=inspect.isclass):
-                        if name in ['Function']:
+                        if name in ['Function'] or ocls.__module__ != module_obj.__name__: # skip the imported classes
                             continue
-                        # print('name***', name, '***ocls***', ocls)
-                        # import pdb;pdb.set_trace()
+                        cls.FUNC_NAMES.append(ocls.FUNC_NAME)
+                        cls.FUNCNAME_FILENAME[ocls.FUNC_NAME] = module_name
+                        funcNameClass[ocls.FUNC_NAME] = ocls
                         if ocls.TYPE == 'trigonometric':
-                            # import pdb;pdb.set_trace()
                             cls._TRIGNOMETRIC_NAMES.append(ocls.FUNC_NAME)
+            cls.FUNCNAME_CLASS.update(funcNameClass) # last, it is what the check above reads
+
+    @classmethod
+    def standardIdentities(cls):
+        """
+        :return: the IDENTITIES of all the standard functions, in the order of FUNC_NAMES
+        :rtype: list[tuple[str, str]]
+        """
+        cls.gatherStandardFunctions()
+        identities = []
+        for funcName in cls.FUNC_NAMES:
+            identities += cls.FUNCNAME_CLASS[funcName].IDENTITIES
+        return identities
 
+    # @property # for now it wll return a property-object, and the expected list... , TODO so we will use it as a cls_method FOR NOW
+    @classmethod
+    def TRIGONOMETRIC_NAMES(cls):
+        cls.gatherStandardFunctions()
         return cls._TRIGNOMETRIC_NAMES
 
 
 
     def __init__(self, equation):
-        print('in __init__')
         self.eq = equation
-        self.inverses = None
+        self.reverses = None # filled by child, mapping from (argumentIdx+1) to the reverse method
 
 
     def substitute(self, substitutionDictionary):
         """
         substituteDictionary is mapping from variable to primitives (numbers), this method finds self.FUNC_NAME sub-AST, in
-        self.equation.ast, and then substitute each variable under each sub-AST using substituteDictionary
+        self.equation.ast, and then substitute each variable under each sub-AST using substituteDictionary.
+        A self.FUNC_NAME sub-AST whose inputs are then all numbers, is replaced by its calculated value.
+
+        The AST of self.equation is not changed, rows are rewritten with path copying (see
+        :class:`PersistentMap`), so only the rows that change are new, the rest are shared.
 
         :param substitutionDictionary: mapping from variable (str) to numbers
         :type substitutionDictionary: dict[str, float]
+        :return: substituted ast
+        :rtype: :class:`PersistentMap`
+        """
+        self._checkSubstitution(substitutionDictionary)
+        return self._substituteWithPlan(PersistentMap.fromMapping(self.eq.ast), self._substitutionPlan(),
+                                        substitutionDictionary)
+
+    def substituteMany(self, substitutionDictionaries):
+        """
+        like :meth:`substitute`, for each substitution dictionary of substitutionDictionaries, but the AST is walked
+        only once, to find the self.FUNC_NAME nodes (in postorder), and every substitution only rewrites those. Results
+        are yielded one at a time, as substitutionDictionaries is read, one substitution dictionary ahead at most, so it
+        can be a generator of a sweep that does not fit in memory. The memory of the results is up to the caller, each
+        result shares its unchanged rows with self.equation.ast.
+
+        :param substitutionDictionaries: mappings from variable (str) to numbers
+        :type substitutionDictionaries: Iterable[dict[str, float]]
+        :return: substituted ast of each substitution dictionary, in order
+        :rtype: Iterator[:class:`PersistentMap`]
+        """
+        ast = PersistentMap.fromMapping(self.eq.ast) # copied once, if self.eq.ast is a view of a CompactAst
+        plan = self._substitutionPlan()
+        checkedVariables = set() # only check variables that were not seen before
+        for substitutionDictionary in substitutionDictionaries:
+            if not checkedVariables.issuperset(substitutionDictionary.keys()):
+                self._checkSubstitution(substitutionDictionary)
+                checkedVariables.update(substitutionDictionary.keys())
+            elif len(substitutionDictionary) == 0:
+                raise Exception("Did not input substitution")
+            yield self._substituteWithPlan(ast, plan, substitutionDictionary)
+
+    def _checkSubstitution(self, substitutionDictionary):
+        """
+        raise if substitutionDictionary cannot be substituted into self.equation
         """
-        #error-checking
         if self.FUNC_NAME not in self.eq.functions: # FUNC_NAME only defined in child
             raise Exception("Function not in equation")
         if len(substitutionDictionary) == 0:
@@ -80,83 +145,107 @@ class Function:#(metaclass=FunctionHook):
         for variableStr, value in substitutionDictionary.items():
             if variableStr not in self.eq.variables:
                 raise Exception("Function not in equation")
-        #look for all the self.FUNC_NAME, to make the substitutions
-        ast = deepcopy(self.eq.ast)
-        stack = [Backtracker(
-            ast['='][0], # label
-            None, # neighbours
-            None, # argumentIdx
-            None, # prev
-            ast['='][1] # id
-        )]
-        while len(stack) != 0:
-            current = stack.pop()
-            neighbours = deepcopy(ast[current.label]) # cannot modify the data, that we are reading (race condition)
-            hasFunction = False # does the sub-AST we are substituting, have a function as a input?
-            for idx, neighbour in enumerate(neighbours):
-                if current.label == self.FUNC_NAME: # FUNC_NAME only defined in child
-                    if neighbour.label in self.eq.functions: # is a function
-                        hasFunction = True # there is a function as input, so sub-AST cannot be removed
-                        stack.append(Backtracker(
-                            neighbour.label, # label
-                            None, # neighbours
-                            idx, # argumentIdx
-                            current, # prev
-                            neighbour.id # id
-                        ))
-                    elif neighbour.label in self.eq.variables: # is a variable
-                        ast[(current.label, current.id)][idx] = substitutionDictionary[neighbour.label] # change variable to primitive (number)
-                    else: # substituted value?
-                        pass
-                else: # plain old DFS
-                    stack.append(Backtracker(
-                        neighbour.label, # label
-                        None, # neighbours
-                        idx, # argumentIdx
-                        current, # prev
-                        neighbour.id # id
-                    ))
-            if (current.label == self.FUNC_NAME) and not hasFunction: # totally substitutable, no functions at all
-                ast[(current.prev.label, current.prev.id)][current.prev.argumentIdx] = self._calculate(ast[(current.label, current.id)])
-                del ast[(current.label, current.id)]
+
+    def _substitutionPlan(self):
+        """
+        the self.FUNC_NAME nodes of self.equation.ast, deepest first, so that inner self.FUNC_NAME are calculated,
+        before the self.FUNC_NAME that takes them as input, each with its parent, and its argumentIdx in the parent.
+        The nodes come from the label index of self.equation.astIndex, so this costs O(matches * depth), not O(n)
+
+        :rtype: list[tuple[tuple[str, int], tuple[str, int], int]]
+        """
+        astIndex = self.eq.astIndex
+        nodes = sorted((node for node in astIndex.nodesOf(self.FUNC_NAME) if astIndex.kindOf(node) == 'function'),
+                       key=lambda node: -astIndex.depthOf(node)) # FUNC_NAME only defined in child
+        return [(node, astIndex.parentOf(node), astIndex.argumentIdxOf(node)) for node in nodes]
+
+    def _substituteWithPlan(self, ast, plan, substitutionDictionary):
+        """
+        :param ast: self.equation.ast, as a :class:`PersistentMap`
+        :type ast: :class:`PersistentMap`
+        :param plan: from :meth:`_substitutionPlan`
+        :type plan: list[tuple[tuple[str, int], tuple[str, int], int]]
+        :param substitutionDictionary: mapping from variable (str) to numbers
+        :type substitutionDictionary: dict[str, float]
+        :return: substituted ast
+        :rtype: :class:`PersistentMap`
+        """
+        for node, parentNode, argumentIdx in plan:
+            neighbours = ast[node]
+            newNeighbours = []
+            values = []
+            for neighbour in neighbours:
+                if neighbour[0] in substitutionDictionary: # is a variable to substitute
+                    value = substitutionDictionary[neighbour[0]]
+                    newNeighbours.append((str(value), neighbour[1])) # change variable to primitive (number)
+                    values.append(value)
+                else: # primitives, and self.FUNC_NAME that were already calculated, are numbers
+                    newNeighbours.append(neighbour)
+                    values.append(float(neighbour[0]) if Booler.isNum(str(neighbour[0])) else None)
+            if None not in values: # totally substitutable, no functions or unknown variables at all
+                value = self._calculate(*values)
+                parentNeighbours = list(ast[parentNode])
+                parentNeighbours[argumentIdx] = (str(value), node[1])
+                ast = ast.delete(node).set(parentNode, parentNeighbours)
+            else:
+                ast = ast.set(node, newNeighbours)
         return ast # substituted ast
 
-    def inverse(self, argumentIdx, nodeIds):
+    def inverse(self, argumentIdx, nodeIds, ast=None, totalNodeCount=None):
         """
-        make argumentIdx the subject of the subAST
+        make argumentIdx the subject of the subAST. The AST of self.equation is not changed, the returned AST shares
+        all the rows, except for the rewritten ones, with it (see :class:`PersistentMap`)
 
         :param argumentIdx: the index of the argument of self(this function) to make into the subject of the formula
         :type argumentIdx: int
-        :param nodeIds: node ids (of the AST) to do the inversion on
+        :param nodeIds: node ids (of the AST) to do the inversion on, id of this function, then id of the equal
         :type nodeIds: list[int]
+        :param ast: the AST to invert in, defaults to self.equation.ast, which is only read, so that many threads can
+        invert in the same equation
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param totalNodeCount: number of nodes of ast, defaults to self.equation.totalNodeCount
+        :type totalNodeCount: int
         :return: multiple returns
             - Modified Abstract Syntax Tree
             - mapping from FUNC_NAME to (number of increase in FUNC_NAME in new tree, will be negative if it decrease)
             - mapping from variable_str to (number of increase in variable_str in new tree, will be negative it decrease)
             - how many primitives were added?
             - how many total nodes were added to the AST?
+            - rows of the AST that were removed
+            - rows of the AST that were added
         :rtype: tuple[
-            dict[tuple[str, int], list[tuple[str, int]]],
+            :class:`PersistentMap`,
             dict[str, int],
             dict[str, int],
             int,
-            int]
+            int,
+            dict[tuple[str, int], list[tuple[str, int]]],
+            dict[tuple[str, int], list[tuple[str, int]]]]
         """
-        ast = deepcopy(self.eq.ast)
+        ast = PersistentMap.fromMapping(self.eq.ast if ast is None else ast)
+        totalNodeCount = self.eq.totalNodeCount if totalNodeCount is None else totalNodeCount
         replacementDictionary = {}
-        for key, value in ast.items():
-            if key[1] in nodeIds:
-                replacementDictionary[key] = value
+        for nodeId in nodeIds:
+            for label in (self.FUNC_NAME, '='): # the row of this function, and the row of the equal it hangs from
+                if (label, nodeId) in ast:
+                    replacementDictionary[(label, nodeId)] = ast[(label, nodeId)]
+                    break
         #will raise error if function of the node with `nodeId` is not equals to self.FUNC_NAME, handle in child.inverse
-        (invertedResults, functionCountChange, variableCountChange,
-         primitiveCountChange, totalNodeCountChange) = self.inverses[argumentIdx](
-            replacementDictionary, self.eq.totalNodeCount)
-
-        for oldKey, oldValue in invertedResults.items():
-            if oldKey in ast: # due to addition of operations, `oldKey` might not exist in ast
-                del ast[oldKey]
-            ast[oldValue['newKey']] = oldValue['newValue']
-        return ast, functionCountChange, variableCountChange, primitiveCountChange, totalNodeCountChange
+        #child.reverses are numbered from 1
+        (invertedResults, functionCountChange,
+         primitiveCountChange, totalNodeCountChange) = self.reverses[argumentIdx+1](
+            replacementDictionary, totalNodeCount)
+        variableCountChange = {} # inverting does not add or remove variables
+
+        newRows = {}
+        for oldKey, oldValue in invertedResults.items(): # generated code gives lists, AST nodes are tuples
+            newRows[tuple(oldValue['newKey'])] = list(map(tuple, oldValue['newValue']))
+        for oldKey in invertedResults.keys():
+            if oldKey in ast and oldKey not in newRows: # due to addition of operations, `oldKey` might not exist in ast
+                ast = ast.delete(oldKey)
+        ast = ast.setMany(newRows)
+        return (ast, functionCountChange, variableCountChange, primitiveCountChange, totalNodeCountChange,
+                replacementDictionary, newRows)
 
     def evalFunctor(self):
         """
@@ -148,6 +148,12 @@ class StandardFunctionClassGenerator:
                     'num_of_variables':config['return_calculation'][0]['variableCount'],
                     'reverseFunctionStrs':returnReversesCode,
                     'calculateFunctionStr':renderedCalculateFTemplate,
+                    'calculationImports':repr(importings[:1]), # same as _calculate, only the first one
+                    'calculationCode':repr(config['return_calculation'][0]['code'][:1]),
+                    'numpyCode':repr(config['return_calculation'][0].get('numpy_code', [])),
+                    'numpyDerivativeCode':repr(config['return_calculation'][0].get('numpy_derivative_code', [])),
+                    'derivatives':repr(config.get('derivatives', [])),
+                    'identities':repr([tuple(identity) for identity in config.get('identities', [])]),
                     'imports':config['imports']
                 })
                 fileName = f"{initSubstitutionDict['@cN@'].lower()}.py"
@@ -30,6 +30,9 @@ class Standardconfigoneargument:
                 reverse_imports=str([f"from foundation.automat.arithmetic.standard.{hincname.lower()} import {hincname}"]).replace("'", '"'),
                 imports_as_str=str(mapping['import']).replace("'", '"'),
                 code_as_str=str(mapping['code']).replace("'", '"'),
+                numpy_code_as_str=str(mapping['numpy_code']).replace("'", '"'),
+                numpy_derivative_code_as_str=str(mapping['numpy_derivative_code']).replace("'", '"'),
+                derivatives_as_str=str(mapping['derivatives']).replace("'", '"'),
             )
             cls.writeToFile(f'{vorfname}.json', vorcontent, verbose=verbose)
             hincontent = template.render(
@@ -40,6 +43,9 @@ class Standardconfigoneargument:
                 reverse_imports=str([f"from foundation.automat.arithmetic.standard.{vorcname.lower()} import {vorcname}"]).replace("'", '"'),
                 imports_as_str=str(mapping['reverse_import']).replace("'", '"'),
                 code_as_str=str(mapping['reverse_code']).replace("'", '"'),
+                numpy_code_as_str=str(mapping['reverse_numpy_code']).replace("'", '"'),
+                numpy_derivative_code_as_str=str(mapping['reverse_numpy_derivative_code']).replace("'", '"'),
+                derivatives_as_str=str(mapping['reverse_derivatives']).replace("'", '"'),
             )
             cls.writeToFile(f'{hinfname}.json', hincontent, verbose=verbose)
 
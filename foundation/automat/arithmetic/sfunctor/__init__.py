@@ -1,7 +1,8 @@
 import importlib
+import inspect
 import os
 
-FUNCTOR_NAMES_TO_CLASS = []
+FUNCTOR_NAMES_TO_CLASS = {}
 
 #gather all the FUNC_NAME from folder sfunctor into FUNCTOR_NAMES_TO_CLASS
 module_dir = os.path.dirname(__file__)
@@ -10,4 +11,6 @@ for module in os.listdir(module_dir):
 		module_name = module[:-3] # remove .py
 		module_obj = importlib.import_module(f'.{module_name}', package=__name__)
 		for name, cls in inspect.getmembers(module_obj, predicate=inspect.isclass):
+			if cls.__module__ != module_obj.__name__: # skip the imported classes
+				continue
 			FUNCTOR_NAMES_TO_CLASS[cls.FUNC_NAME] = cls
\ No newline at end of file
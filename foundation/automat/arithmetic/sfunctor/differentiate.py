@@ -1,8 +1,29 @@
+import math
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.common.traversal import Traversal
+from foundation.automat.core.hashconsedast import HashConsedAst
+from foundation.automat.core.rewriteengine import RewriteRule
+from foundation.automat.core.simplifier import Simplifier
+
+
 class Differentiate(Function):
 	"""
-
+	Symbolic (partial) differentiation of a subtree of the Abstract Syntax Tree (ast for short), with the term rule
+	(+, -, and =), and the chain rule with the DERIVATIVES of each standard function, which also hold the product,
+	quotient and power rules (for *, / and ^).
+
+	The derivative is a DAG, not a tree: its nodes point to the nodes of the original ast wherever the derivative uses
+	them (like the u in (cos u), for the derivative of (sin u)), instead of copying them. Nodes are made through a
+	unique table, so asking twice for the same (label, children) gives the same node, and the derivative of each
+	distinct subtree (see :class:`HashConsedAst`) is made only once. Without this sharing, the derivative of a
+	product of n factors, or of nested functions, copies its inputs again at every level, and grows exponentially.
+	Products with 0 and 1, sums with 0, and functions of numbers are folded while building.
 	"""
 	FUNC_NAME = 'dif'
+	_PARSED_DERIVATIVES = {} # FUNC_NAME to the parsed DERIVATIVES of that standard function
 
 	def __init__(self, equation):
 		"""
@@ -29,71 +50,127 @@ class Differentiate(Function):
 
 	def _calculate(self, v0, v1):
 		"""
-		Do BST, and apply to each node
-		1. _chainRule (all-single-valued-functions)
-		2. _productRule (/quotientRule) (*, /)
-		3. _termRule (+, -)
-
-		"""
-		pass #TODO
-
-
-	def _recursiveCalculate(self, subAST):
-		"""
-		#differentiate number =0
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _variableAsConstant
-		#differentiate variableNumber =0
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _partialDifferentiation
-		#differentiate variable != withrespecttoARG (IGNORE...TODO?)
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _implicitDifferentiation
-		#differentiate variable != withrespecttoARG
-		#using x as an example
-		(diff, ?):[(x, ?1), (y, ?2)]
-
-		===
-		(*, ?3):[(diff, ?4), (applyDiff((x, ?1)))]
-		(diff, ?4):[(y, ?2), (x, ?5)]
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
-		#differentiate variable == withrespecttoARG =1
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _powerRule <<<<<<<<<<<<<<< this is part of Exponential FUNCTION....
-		(diff, ?):[(^, ?1), (?, ?)]
-		(^, ?1):[(?2, ?3), ([REAL_NUMBER], ?4)]
-
-		===
-		(*, ?5):[([REAL_NUMBER], ?4), (^, ?1)]
-		(^, ?1):[(?2, ?3), (-, ?6)]
-		(-, ?6):[([REAL_NUMBER], ?4), 1]
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _chainRule (applyDiff is implemented in each FUNCTION)
-		#differentiate single-valued functions (using sin as example)
-		(diff, ?):[(sin, ?), (x, ?)]
-		(sin, ?):[(?1, ?2)]
-
-		=== applyDiff should do written on each individual functions
-		(*, ?3):[(applyDiff(sin), ?), (diff, ?4)]
-		(applyDiff(sin), ?):[(?1, ?2)],
-		(diff, ?4):[(?1, ?2), (x, ?)]
-
-		#######TODO try a more complex example like sec(x), to get a feel of how to program.
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _productRule
-		##differentiate (*, /) (using / as example)
-		(diff, ?):[(/, ?1), (x, ?2)]
-		(/, ?1):[(?3, ?4), (?5, ?6)]
-
-		===
-		(+, ?):[(*, ?7), (*, ?8)]
-		(*, ?7):[(?3, ?4), (diff, ?9)]
-		(*, ?8):[(diff, ?10), (?5, ?6)]
-		(diff, ?9):[(?5, ?6), (x, ?)]
-		(diff, ?10):[(?3, ?4), (x, ?)]
-@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@ _termRule (differentiating equals is the same)
-		#differentiate (+, -) (using - as example)
-		(diff, ?):[(-, ?1), (x, ?)]
-		(-, ?1):[(?3, ?4), (?5, ?6)]
-
-		===
-		(-, ?1):[(diff, ?7), (diff, ?8)]
-		(diff, ?7):[(?3, ?4)]
-		(diff, ?8):[(?5, ?6)]
-
-		"""
-		pass
\ No newline at end of file
+		~SKETCH~
+		1. hash-cons the subtree of v0, so that equal subtrees are differentiated once
+		2. put the nodes of the subtree in the unique table, so the DERIVATIVES patterns point to them
+		3. in postorder, the derivative of each node is
+			a. a leaf : 1 if it is v1, else 0 (numbers, and the other variables are constants)
+			b. +, -, = : the same function of the derivatives of the inputs (term rule)
+			c. a standard function : the sum of the partial derivative by each input, times the derivative of the input
+			(chain rule), inputs with derivative 0 are skipped
+
+		:param v0: node of self.eq.ast, root of the subtree to differentiate
+		:type v0: tuple[str, int]
+		:param v1: the variable to differentiate by
+		:type v1: str
+		:return: multiple returns
+			- self.eq.ast, with the rows of the derivative added, self.eq.ast is not changed
+			- root of the derivative
+		:rtype: tuple[:class:`PersistentMap`, tuple[str, int]]
+		"""
+		Function.gatherStandardFunctions()
+		ast = self.eq.ast
+		hashConsedAst = HashConsedAst.fromAst(ast, v0)
+		self._newRows = {}
+		self._uniqueTable = {}
+		self._nextId = 1 + max((child[1] for children in ast.values() for child in children), default=v0[1])
+		#~~~~~~~~~~~~~STEP2
+		for node in hashConsedAst.nodeToDagId.keys():
+			self._uniqueTable.setdefault((str(node[0]), tuple(ast.get(node, ()))), node)
+		#~~~~~~~~~~~~~STEP3
+		derivativeOfDagId = {}
+		for node, _, _ in Traversal.postorder(ast, v0):
+			dagId = hashConsedAst.dagIdOf(node)
+			if dagId in derivativeOfDagId: # an equal subtree was already differentiated
+				continue
+			children = ast.get(node, ())
+			if len(children) == 0:
+				derivativeOfDagId[dagId] = self._make('1' if node[0] == v1 else '0', ())
+				continue
+			childDerivatives = [derivativeOfDagId[hashConsedAst.dagIdOf(child)] for child in children]
+			if node[0] in ('+', '-', '='):
+				derivativeOfDagId[dagId] = self._make(node[0], childDerivatives)
+				continue
+			terms = []
+			for argumentIdx, childDerivative in enumerate(childDerivatives):
+				if self._isNumber(childDerivative, 0):
+					continue
+				partialDerivative = self._instantiate(self._partialDerivative(node[0], argumentIdx), children)
+				terms.append(self._make('*', (partialDerivative, childDerivative)))
+			derivative = terms[0] if len(terms) > 0 else self._make('0', ())
+			for term in terms[1:]:
+				derivative = self._make('+', (derivative, term))
+			derivativeOfDagId[dagId] = derivative
+		derivativeNode = derivativeOfDagId[hashConsedAst.dagIdOf(v0)]
+		return PersistentMap.fromMapping(ast).setMany(self._newRows), derivativeNode
+
+	@classmethod
+	def _partialDerivative(cls, functionName, argumentIdx):
+		"""
+		:return: the pattern of the partial derivative of functionName by its input argumentIdx
+		:rtype: tuple[str, tuple]
+		"""
+		if functionName not in cls._PARSED_DERIVATIVES:
+			functionClass = Function.FUNCNAME_CLASS.get(functionName)
+			if functionClass is None or len(functionClass.DERIVATIVES) == 0:
+				raise Exception(f'Cannot differentiate {functionName}')
+			cls._PARSED_DERIVATIVES[functionName] = [RewriteRule.parsePattern(derivative) for derivative in functionClass.DERIVATIVES]
+		return cls._PARSED_DERIVATIVES[functionName][argumentIdx]
+
+	def _instantiate(self, pattern, inputs):
+		"""
+		:return: node of pattern, with $0, $1... as the nodes of inputs
+		:rtype: tuple[str, int]
+		"""
+		label, patternChildren = pattern
+		if RewriteRule.isPatternVariable(label):
+			return inputs[int(label[1:])]
+		return self._make(label, [self._instantiate(patternChild, inputs) for patternChild in patternChildren])
+
+	def _make(self, label, children):
+		"""
+		:return: the node of label with children, the one in the unique table if there is one, else a new one.
+		Functions of numbers, and 0 and 1 in +, -, *, /, ^ are folded, so the node may be one of children, or a number
+		:rtype: tuple[str, int]
+		"""
+		children = tuple(children)
+		if len(children) > 0 and label in Function.FUNCNAME_CLASS and all(self._isNumber(child) for child in children):
+			try:
+				value = Function.FUNCNAME_CLASS[label](None)._calculate(*[float(child[0]) for child in children])
+			except (ArithmeticError, ValueError, TypeError):
+				value = None
+			if isinstance(value, (int, float)) and math.isfinite(value) and Simplifier.numberLabel(value) is not None:
+				return self._make(Simplifier.numberLabel(value), ())
+		if label == '*':
+			if self._isNumber(children[0], 0) or self._isNumber(children[1], 0):
+				return self._make('0', ())
+			if self._isNumber(children[0], 1):
+				return children[1]
+			if self._isNumber(children[1], 1):
+				return children[0]
+		elif label == '+' and self._isNumber(children[0], 0):
+			return children[1]
+		elif label in ('+', '-') and self._isNumber(children[1], 0):
+			return children[0]
+		elif label == '-' and self._isNumber(children[0], 0):
+			return self._make('*', (self._make('-1', ()), children[1]))
+		elif label in ('/', '^') and self._isNumber(children[1], 1):
+			return children[0]
+		node = self._uniqueTable.get((label, children))
+		if node is None:
+			node = (label, self._nextId)
+			self._nextId += 1
+			self._uniqueTable[(label, children)] = node
+			if len(children) > 0:
+				self._newRows[node] = list(children)
+		return node
+
+	def _isNumber(self, node, value=None):
+		"""
+		:return: True if node is a primitive (number) leaf, with value, if value is given
+		:rtype: bool
+		"""
+		if node in self.eq.ast or node in self._newRows or not Booler.isNum(str(node[0])):
+			return False
+		return value is None or float(node[0]) == value
+
@@ -1,6 +1,14 @@
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.common.traversal import Traversal
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.core.quadrature import GaussKronrod
+
+
 class Integrate(Function):
 	"""
-
+	A definite integral is an int node with 4 inputs, (int integrand variable lower upper), see :meth:`definite`
 	"""
 	FUNC_NAME = 'int'
 
@@ -33,6 +41,80 @@ class Integrate(Function):
 		"""
 		pass #TODO
 
+	def definite(self, intNode, bindings=None, absoluteTolerance=1.49e-8, relativeTolerance=1.49e-8, maxIntervals=1000):
+		"""
+		calculates the definite integral of intNode numerically, for every row of bindings at once. The integrand, and
+		the limits, are compiled with NumPy ufuncs (see :class:`EquationCompiler`), and integrated with adaptive
+		Gauss-Kronrod quadrature (see :class:`GaussKronrod`), that evaluates all the intervals of all the rows in one
+		call per round.
+
+		:param intNode: node of self.eq.ast, (int integrand variable lower upper), the limits can have variables too
+		:type intNode: tuple[str, int]
+		:param bindings: mapping from every variable of intNode (except variable) to its values, arrays (or scalars)
+		that broadcast together
+		:type bindings: dict[str, numpy.ndarray]
+		:param absoluteTolerance: absolute error wanted for each integral
+		:type absoluteTolerance: float
+		:param relativeTolerance: relative error wanted for each integral
+		:type relativeTolerance: float
+		:param maxIntervals: most intervals for one integral
+		:type maxIntervals: int
+		:return: multiple returns, with the broadcast shape of bindings
+			- the integrals
+			- the estimated errors
+			- True where the error is within the tolerance
+		:rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+		"""
+		import numpy as np
+		bindings = {} if bindings is None else bindings
+		inputs = self.eq.ast.get(intNode, [])
+		if intNode[0] != self.FUNC_NAME or len(inputs) != 4:
+			raise Exception(f'{intNode} is not (int integrand variable lower upper)')
+		integrandNode, variableNode, lowerNode, upperNode = inputs
+		variable = variableNode[0]
+		parameters = sorted(set(parameter for node in (integrandNode, lowerNode, upperNode)
+			for parameter in self._variablesOf(node)) - set([variable]))
+		for parameter in parameters:
+			if parameter not in bindings:
+				raise Exception(f"{parameter} not in bindings")
+		for limitNode in (lowerNode, upperNode):
+			if variable in self._variablesOf(limitNode):
+				raise Exception(f'the limits cannot have {variable}')
+		arrays = [np.asarray(bindings[parameter], dtype=np.float64) for parameter in parameters]
+		shape = np.broadcast_shapes(*(array.shape for array in arrays)) if len(arrays) > 0 else ()
+		flatArrays = [np.broadcast_to(array, shape).reshape(-1) for array in arrays] # one row per parameter set
+		rowCount = int(np.prod(shape))
+		#compile
+		integrand = self._compile(integrandNode, [variable] + parameters)
+		lower = np.broadcast_to(self._compile(lowerNode, parameters)(*flatArrays), (rowCount,))
+		upper = np.broadcast_to(self._compile(upperNode, parameters)(*flatArrays), (rowCount,))
+		function = lambda x, rows: integrand(x, *[flatArray[rows] for flatArray in flatArrays])
+		#integrate
+		self.quadrature = GaussKronrod(absoluteTolerance=absoluteTolerance, relativeTolerance=relativeTolerance,
+			maxIntervals=maxIntervals)
+		values, errors, converged = self.quadrature.integrate(function, lower, upper)
+		return values.reshape(shape), errors.reshape(shape), converged.reshape(shape)
+
+	def _variablesOf(self, node):
+		"""
+		:return: the variables in the subtree of node
+		:rtype: set[str]
+		"""
+		variables = set()
+		for current, _, _ in Traversal.preorder(self.eq.ast, node):
+			if current not in self.eq.ast and not Booler.isNum(str(current[0])):
+				variables.add(current[0])
+		return variables
+
+	def _compile(self, node, parameters):
+		"""
+		:return: the subtree of node, compiled with NumPy ufuncs, taking parameters in that order
+		:rtype: Callable[..., numpy.ndarray]
+		"""
+		rootNode = ('=', -1) # ids of the ast are not negative
+		ast = PersistentMap.fromMapping(self.eq.ast).set(rootNode, [('_', -2), node])
+		return EquationCompiler.compileAst(ast, rootNode, parameters, target='numpy')
+
 
 	def _recursiveCalculate(self, subAST):
 		"""
@@ -8,6 +8,13 @@ class Cosine(Function):
     """
     TYPE = 'trigonometric'
     FUNC_NAME = 'cos'
+    #same as _calculate, for code generators (Equation.compile), v0, v1... are the inputs, num is the result
+    CALCULATION_IMPORTS = ['from math import cos']
+    CALCULATION_CODE = ['num=cos(v0)']
+    NUMPY_CODE = ['num=numpy.cos(v0)'] # same as CALCULATION_CODE, with NumPy ufuncs, inputs can be arrays
+    NUMPY_DERIVATIVE_CODE = ['d0=numpy.negative(numpy.sin(v0))'] # d0, d1... are the partial derivatives of num, by v0, v1...
+    DERIVATIVES = ['(* -1 (sin $0))'] # partial derivative by each input, patterns with $0, $1... as the inputs
+    IDENTITIES = [] # (lhs, rhs) rewrite rules that always hold, see RewriteRule
 
     def __init_subclass__(cls, **kwargs):
         kwargs['type'] = 'trigonometric'
@@ -55,21 +62,21 @@ class Cosine(Function):
             raise Exception('replacementDictionary incorrect length')
         key0 = None
         key1 = None
-        for key, value in replacementDictionary.items():
-            if value[1][0] == self.FUNC_NAME:
-                key0 = key
-            else:
+        for key in replacementDictionary.keys():
+            if key[0] == self.FUNC_NAME: # the row of this function, the other row is the equal
                 key1 = key
+            else:
+                key0 = key
         if key0 is None or key1 is None:
             raise Exception("replacementDictionary not according to format")
         
         from foundation.automat.arithmetic.standard.arccosine import Arccosine
         
-        return {key0: {"newKey": key0, "newValue": [replacementDictionary[key1][0], [Arccosine.FUNC_NAME, replacementDictionary[key0][1][1]]]}, key1: {"newKey": [Arccosine.FUNC_NAME, key1[1]], "newValue": [replacementDictionary[key0][0]]}}, {Arccosine.FUNC_NAME: 1, FUNC_NAME: -1}, 0, 0
+        return {key0: {"newKey": key0, "newValue": [replacementDictionary[key1][0], [Arccosine.FUNC_NAME, replacementDictionary[key0][1][1]]]}, key1: {"newKey": [Arccosine.FUNC_NAME, key1[1]], "newValue": [replacementDictionary[key0][0]]}}, {Arccosine.FUNC_NAME: 1, self.FUNC_NAME: -1}, 0, 0
 
     
 
-    def __calculate(self, v0):
+    def _calculate(self, v0):
         """
         Used to get the numerical value of this function, when all the inputs applied are numerical.
         Also used in substitution method of parent :class:`Function`
@@ -0,0 +1,141 @@
+
+from foundation.automat.arithmetic.function import Function
+
+
+class Minus(Function):
+    """
+
+    """
+    TYPE = 'other'
+    FUNC_NAME = '-'
+    #same as _calculate, for code generators (Equation.compile), v0, v1... are the inputs, num is the result
+    CALCULATION_IMPORTS = []
+    CALCULATION_CODE = ['num=v0-v1']
+    NUMPY_CODE = ['num=numpy.subtract(v0, v1)'] # same as CALCULATION_CODE, with NumPy ufuncs, inputs can be arrays
+    NUMPY_DERIVATIVE_CODE = ['d0=1.0', 'd1=-1.0'] # d0, d1... are the partial derivatives of num, by v0, v1...
+    DERIVATIVES = ['1', '-1'] # partial derivative by each input, patterns with $0, $1... as the inputs
+    IDENTITIES = [('(- $x 0)', '$x'), ('(- $x $x)', '0')] # (lhs, rhs) rewrite rules that always hold, see RewriteRule
+
+    def __init_subclass__(cls, **kwargs):
+        kwargs['type'] = 'other'
+        kwargs['funcName'] = '-'
+        super().__init_subclass__(**kwargs)
+
+    def __init__(self, equation):
+        """
+
+        """
+        super().__init__(equation)
+        self.reverses = {
+            
+                1: self._reverse1,
+                
+            
+                2: self._reverse2
+            
+        }
+
+    
+    def _reverse1(self, replacementDictionary, totalNodeCount):
+        """
+        replacementDictionary are the rows in the AST mapping that needs to be replaced.
+        Aim of this function is to make #1 input, the subject
+        replacementDictionary will always have exactly 2 rows, because of the nature of equality.
+        One of the list have this tuple ('-', nodeId) on the #2 argument. Since this is
+        the function that will operate on it.
+
+        :param replacementDictionary: 
+        :type replacementDictionary: dict[tuple[str, int], list[tuple[str, int]]]
+        :param totalNodeCount:
+        :type totalNodeCount: int
+        :return: tuple
+         - input that was reversed
+         - mapping from FuncName to how many of FuncName was added by this reversal, if its a negative, then its removal
+         - total number of primitives that was added. If its negative, then primitives was removed
+         - total number of nodes that was added. If its negative, the nodes were removed
+        :rtype: tuple [
+            dict[str, dict[str, Any]],
+            dict[str, int],
+            int,
+            int
+        ]
+        """
+        #error checking 
+        if len(replacementDictionary) != 2: # always be 2 due to nature of equality
+            raise Exception('replacementDictionary incorrect length')
+        key0 = None
+        key1 = None
+        for key in replacementDictionary.keys():
+            if key[0] == self.FUNC_NAME: # the row of this function, the other row is the equal
+                key1 = key
+            else:
+                key0 = key
+        if key0 is None or key1 is None:
+            raise Exception("replacementDictionary not according to format")
+        
+        from foundation.automat.arithmetic.standard.plus import Plus
+        
+        return {key0: {"newKey": key0, "newValue": [replacementDictionary[key1][0], [Plus.FUNC_NAME, replacementDictionary[key0][1][1]]]}, key1: {"newKey": [Plus.FUNC_NAME, key1[1]], "newValue": [replacementDictionary[key0][0], replacementDictionary[key1][1]]}}, {Plus.FUNC_NAME: 1, self.FUNC_NAME: -1}, 0, 0
+
+    
+    def _reverse2(self, replacementDictionary, totalNodeCount):
+        """
+        replacementDictionary are the rows in the AST mapping that needs to be replaced.
+        Aim of this function is to make #2 input, the subject
+        replacementDictionary will always have exactly 2 rows, because of the nature of equality.
+        One of the list have this tuple ('-', nodeId) on the #2 argument. Since this is
+        the function that will operate on it.
+
+        :param replacementDictionary: 
+        :type replacementDictionary: dict[tuple[str, int], list[tuple[str, int]]]
+        :param totalNodeCount:
+        :type totalNodeCount: int
+        :return: tuple
+         - input that was reversed
+         - mapping from FuncName to how many of FuncName was added by this reversal, if its a negative, then its removal
+         - total number of primitives that was added. If its negative, then primitives was removed
+         - total number of nodes that was added. If its negative, the nodes were removed
+        :rtype: tuple [
+            dict[str, dict[str, Any]],
+            dict[str, int],
+            int,
+            int
+        ]
+        """
+        #error checking 
+        if len(replacementDictionary) != 2: # always be 2 due to nature of equality
+            raise Exception('replacementDictionary incorrect length')
+        key0 = None
+        key1 = None
+        for key in replacementDictionary.keys():
+            if key[0] == self.FUNC_NAME: # the row of this function, the other row is the equal
+                key1 = key
+            else:
+                key0 = key
+        if key0 is None or key1 is None:
+            raise Exception("replacementDictionary not according to format")
+        
+        from foundation.automat.arithmetic.standard.plus import Plus
+        
+        return {key0: {"newKey": key0, "newValue": [replacementDictionary[key1][1], [Minus.FUNC_NAME, replacementDictionary[key0][1][1]]]}, key1: {"newKey": [Minus.FUNC_NAME, key1[1]], "newValue": [replacementDictionary[key1][0], replacementDictionary[key0][0]]}}, {}, 0, 0
+
+    
+
+    def _calculate(self, v0, v1):
+        """
+        Used to get the numerical value of this function, when all the inputs applied are numerical.
+        Also used in substitution method of parent :class:`Function`
+
+        
+        :param v0: 0-th input of this function
+        :type v0: float
+        
+        :param v1: 1-th input of this function
+        :type v1: float
+        
+        :return: calculated numerical result
+        :rtype: float
+        """
+        
+        num=v0-v1
+        return num
\ No newline at end of file
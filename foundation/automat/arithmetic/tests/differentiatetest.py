@@ -0,0 +1,59 @@
+import inspect
+import pprint
+
+from foundation.automat.arithmetic.sfunctor.differentiate import Differentiate
+from foundation.automat.core.dualevaluator import DualEvaluator
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.hashconsedast import HashConsedAst
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__differentiate__rules(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= y (+ (* (sin x) (^ x 2)) (/ a x)))', 'scheme')
+    expressionNode = eq0.ast[('=', 0)][1]
+    ast, derivativeNode = Differentiate(eq0)._calculate(expressionNode, 'x')
+    derivativeStr = Schemeparser(ast=ast)._recursiveUnparse(ast, derivativeNode)
+    sinNode = [node for node in eq0.ast.keys() if node[0] == 'sin'][0]
+    cosNode = [node for node in ast.keys() if node[0] == 'cos'][0]
+    if verbose:
+        pp.pprint(derivativeStr)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        derivativeStr == '(+ (+ (* (^ x 2) (cos x)) (* (sin x) (* 2 x))) (* -1 (/ a (^ x 2))))' and
+        ast[cosNode] == eq0.ast[sinNode] and # (cos x) points to the x of (sin x), not a copy
+        all(ast[node] == children for node, children in eq0.ast.items()) # the rows of eq0 are kept
+    ))
+
+
+def test__differentiate__sharedSubtrees(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    depth = 10
+    expressionStr = 'x'
+    for _ in range(depth): # t = (* (sin t) t), the tree doubles at each level
+        expressionStr = f'(* (sin {expressionStr}) {expressionStr})'
+    eq0 = Equation(f'(= y {expressionStr})', 'scheme')
+    expressionNode = eq0.ast[('=', 0)][1]
+    ast, derivativeNode = Differentiate(eq0)._calculate(expressionNode, 'x')
+    derivativeRows = dict((node, children) for node, children in ast.items() if node not in eq0.ast)
+    derivativeAst = dict(ast)
+    derivativeAst[('=', -1)] = [('dy', -2), derivativeNode]
+    x = np.linspace(0.1, 0.9, 5)
+    _, partials = DualEvaluator(eq0.ast, ('=', 0), ['x']).evaluate({'x':x})
+    derivativeValues = DualEvaluator(derivativeAst, ('=', -1), ['x']).evaluate({'x':x})[0]
+    if verbose:
+        pp.pprint(len(eq0.ast))
+        pp.pprint(len(derivativeRows))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(eq0.ast) > 2**depth and # the tree is exponential in depth
+        len(derivativeRows) <= 6 * depth and # the derivative is linear in depth
+        len(HashConsedAst.fromAst(ast, derivativeNode)) <= 8 * depth and
+        np.allclose(derivativeValues, partials['x'], rtol=1e-12, atol=0) # same as forward-mode
+    ))
+
+
+if __name__=='__main__':
+    test__differentiate__rules()
+    test__differentiate__sharedSubtrees()
@@ -2,11 +2,47 @@ import inspect
 import pprint
 
 from foundation.automat.arithmetic.function import Function
+from foundation.automat.arithmetic.standard.multiply import Multiply
+from foundation.automat.core.equation import Equation
+from foundation.automat.parser.sorte import Schemeparser
 
 def test__trigNameListNotEmpty__Function(verbose=False):
     pp = pprint.PrettyPrinter(indent=4)
     print(inspect.currentframe().f_code.co_name, ' PASSED? ', len(Function.TRIGONOMETRIC_NAMES)>0)
 
 
+def test__substitute__Multiply(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= a (+ b (* c (* d 2))))', 'scheme')
+    substitutedAst = Multiply(eq0).substitute({'c':3, 'd':5})
+    if verbose:
+        pp.pprint(substitutedAst)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=substitutedAst)._unparse() == '(= a (+ b 30.0))' and
+        Schemeparser(ast=eq0.ast)._unparse() == '(= a (+ b (* c (* d 2))))' # eq0 is not changed
+    ))
+
+
+def test__substituteMany__Multiply(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= a (+ b (* c (* d 2))))', 'scheme')
+    multiply = Multiply(eq0)
+    sweep = ({'c':3, 'd':d} for d in range(1000)) # a generator, read lazily
+    substitutedAsts = multiply.substituteMany(sweep)
+    firstAsts = [next(substitutedAsts) for _ in range(3)]
+    if verbose:
+        pp.pprint(firstAsts)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        [Schemeparser(ast=ast)._unparse() for ast in firstAsts] == [
+            '(= a (+ b 0.0))', '(= a (+ b 6.0))', '(= a (+ b 12.0))'] and
+        list(multiply.substituteMany([{'c':3, 'd':5}])) == [multiply.substitute({'c':3, 'd':5})] and
+        Schemeparser(ast=list(multiply.substituteMany([{'d':5}]))[0])._unparse() == '(= a (+ b (* c 10.0)))'
+    ))
+
+
 if __name__=='__main__':
+    test__substitute__Multiply()
+    test__substituteMany__Multiply()
     print(Function.TRIGONOMETRIC_NAMES)
\ No newline at end of file
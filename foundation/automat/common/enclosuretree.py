@@ -240,17 +240,16 @@ class EnclosureTree: # can be used to schedule processes by level too... TODO
         """
         enclosureTree, leaves = cls.makeEnclosureTreeWithLeaves(listOfPoss, firstContainsSecond, getId)
         tLeaves = set(leaves)
+        parentOf = {} # child to parent, so that going up does not scan the whole enclosureTree at every level
+        for pos, childenPos in enclosureTree.items():
+            for childPos in childenPos:
+                parentOf[childPos] = pos
         roots = []
         while len(tLeaves) > 0:
             #all roads lead to rome (find root of tree) TODO might need to add cycle detection
             rootId = list(tLeaves)[0]#getId(list(tLeaves)[0])
-            checkAgain = True
-            while checkAgain: # keep going up
-                checkAgain = False
-                for pos, childenPos in enclosureTree.items():
-                    if rootId in childenPos:
-                        rootId = pos #pos is parent of rootId
-                        checkAgain = True # might still have parent, so we check again.
+            while rootId in parentOf: # keep going up
+                rootId = parentOf[rootId] # might still have parent, so we check again.
             roots.append(rootId)
             #find all the leaves attached to this rootId
             leavesOfSubTree = set()
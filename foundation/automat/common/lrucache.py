@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import sys
+import threading
+
+
+class LRUCache:
+    """
+    Bounded mapping that forgets the least recently used entry when it is full. Bounded by the number of entries
+    (maxSize) and, if maxBytes is given, by the estimated memory of the values (measured with sizeOf when they are
+    put in). Counts hits, misses and evictions, so that callers can see if the cache is worth it.
+
+    Safe to share between threads, every method holds a lock.
+
+    :param maxSize: maximum number of entries
+    :type maxSize: int
+    :param maxBytes: maximum total of sizeOf(value) over the entries, None for no limit
+    :type maxBytes: int
+    :param sizeOf: estimates the bytes of a value, defaults to sys.getsizeof
+    :type sizeOf: Callable[Any, int]
+    """
+    def __init__(self, maxSize=128, maxBytes=None, sizeOf=None):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        if maxSize < 1:
+            raise Exception("maxSize must be at least 1")
+        self.maxSize = maxSize
+        self.maxBytes = maxBytes
+        self.sizeOf = sizeOf if sizeOf is not None else sys.getsizeof
+        self._entries = OrderedDict() # key to (value, nbytes), least recently used first
+        self._lock = threading.Lock()
+        self.currentBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        :return: the value of key (and marks it as most recently used), default if key is not cached
+        :rtype: Any
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        caches value under key, as the most recently used entry, evicting the least recently used entries until
+        both limits hold. A value bigger than maxBytes on its own is not cached.
+        """
+        nbytes = self.sizeOf(value)
+        with self._lock:
+            if key in self._entries:
+                self.currentBytes -= self._entries.pop(key)[1]
+            if self.maxBytes is not None and nbytes > self.maxBytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.currentBytes += nbytes
+            while len(self._entries) > self.maxSize or \
+                  (self.maxBytes is not None and self.currentBytes > self.maxBytes):
+                _, (_, evictedBytes) = self._entries.popitem(last=False)
+                self.currentBytes -= evictedBytes
+                self.evictions += 1
+
+    def clear(self):
+        """
+        removes all the entries, and resets the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.currentBytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(size={len(self)}/{self.maxSize}, bytes={self.currentBytes}/{self.maxBytes}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})'
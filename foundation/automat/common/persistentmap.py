@@ -0,0 +1,244 @@
+from collections.abc import Mapping
+
+
+class _Entry:
+    """
+    one key-value pair stored in a slot of :class:`PersistentMap`
+    """
+    __slots__ = ('keyHash', 'key', 'value')
+
+    def __init__(self, keyHash, key, value):
+        self.keyHash = keyHash
+        self.key = key
+        self.value = value
+
+
+class _Collision:
+    """
+    entries whose keys have the same hash, only at the bottom of :class:`PersistentMap`
+    """
+    __slots__ = ('keyHash', 'entries')
+
+    def __init__(self, keyHash, entries):
+        self.keyHash = keyHash
+        self.entries = entries # tuple[_Entry]
+
+
+class PersistentMap(Mapping):
+    """
+    Immutable dictionary with structural sharing (a hash array mapped trie). Each node of the trie has WIDTH slots,
+    picked by BITS bits of the hash of the key, so the trie is at most ceil(64/BITS) levels deep.
+
+    :meth:`set` and :meth:`delete` do not change this map, they return a new map, that copies only the trie nodes on
+    the path to the changed key (path copying), everything else is shared with this map. So keeping the original
+    Abstract Syntax Tree (ast for short) around, after rewriting a few rows of it, costs O(depth of trie) per row,
+    instead of a deepcopy of the whole ast.
+
+    Values are shared between versions too, so they should not be mutated in place, :meth:`set` a new value instead.
+    copy.deepcopy gives a plain, mutable dictionary, so code that copies before editing still works.
+
+    :param root: top node of the trie
+    :type root: tuple
+    :param size: number of keys
+    :type size: int
+    """
+    BITS = 5
+    WIDTH = 1 << BITS
+    MASK = WIDTH - 1
+
+    def __init__(self, root=None, size=0):
+        """
+        Just getters and setter. Also the constructor. Use :meth:`fromMapping` to build from a dictionary
+        """
+        self._root = root if root is not None else (None,) * self.WIDTH
+        self._size = size
+
+    @classmethod
+    def fromMapping(cls, mapping):
+        """
+        :param mapping: any dictionary, like the dictionary form of the ast
+        :type mapping: dict
+        :return: persistent map with the same items as mapping
+        :rtype: :class:`PersistentMap`
+        """
+        if isinstance(mapping, PersistentMap):
+            return mapping
+        return cls().setMany(mapping)
+
+    @classmethod
+    def _hash(cls, key):
+        return hash(key) & 0xFFFFFFFFFFFFFFFF # different hashes split within ceil(64/BITS) levels, same go to _Collision
+
+    def __getitem__(self, key):
+        keyHash = self._hash(key)
+        node = self._root
+        shift = 0
+        while True:
+            slot = node[(keyHash >> shift) & self.MASK]
+            if slot is None:
+                raise KeyError(key)
+            if isinstance(slot, tuple): # inner node, go down
+                node = slot
+                shift += self.BITS
+                continue
+            if isinstance(slot, _Entry):
+                if slot.keyHash == keyHash and slot.key == key:
+                    return slot.value
+                raise KeyError(key)
+            for entry in slot.entries: # _Collision
+                if entry.key == key:
+                    return entry.value
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except (KeyError, TypeError): # TypeError for unhashable keys, like dict does
+            return False
+        return True
+
+    def __iter__(self):
+        stack = [self._root]
+        while len(stack) > 0:
+            node = stack.pop()
+            for slot in node:
+                if slot is None:
+                    continue
+                if isinstance(slot, tuple):
+                    stack.append(slot)
+                elif isinstance(slot, _Entry):
+                    yield slot.key
+                else:
+                    for entry in slot.entries:
+                        yield entry.key
+
+    def __len__(self):
+        return self._size
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping) or len(self) != len(other):
+            return False
+        for key, value in self.items():
+            if key not in other or other[key] != value:
+                return False
+        return True
+
+    __hash__ = None # like dict
+
+    def __deepcopy__(self, memo):
+        return dict((key, list(value) if isinstance(value, list) else value) for key, value in self.items())
+
+    def __copy__(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+    def set(self, key, value):
+        """
+        :return: new map with key set to value, this map is not changed
+        :rtype: :class:`PersistentMap`
+        """
+        newRoot, added = self._set(self._root, 0, _Entry(self._hash(key), key, value))
+        return PersistentMap(newRoot, self._size + (1 if added else 0))
+
+    def setMany(self, mapping):
+        """
+        :param mapping: keys and values to set
+        :type mapping: dict
+        :return: new map with all the items of mapping set, this map is not changed
+        :rtype: :class:`PersistentMap`
+        """
+        root = self._root
+        size = self._size
+        for key, value in mapping.items():
+            root, added = self._set(root, 0, _Entry(self._hash(key), key, value))
+            if added:
+                size += 1
+        return PersistentMap(root, size)
+
+    def delete(self, key):
+        """
+        :return: new map without key, this map is not changed. Raises KeyError if key is not in this map
+        :rtype: :class:`PersistentMap`
+        """
+        newRoot = self._delete(self._root, 0, self._hash(key), key)
+        if newRoot is None: # removed the last key
+            newRoot = (None,) * self.WIDTH
+        return PersistentMap(newRoot, self._size - 1)
+
+    def _set(self, node, shift, newEntry):
+        """
+        :return: copy of node with newEntry in it, and whether a new key was added (instead of replaced)
+        :rtype: tuple[tuple, bool]
+        """
+        slotIdx = (newEntry.keyHash >> shift) & self.MASK
+        slot = node[slotIdx]
+        added = False
+        if slot is None:
+            newSlot = newEntry
+            added = True
+        elif isinstance(slot, tuple):
+            newSlot, added = self._set(slot, shift + self.BITS, newEntry)
+        elif isinstance(slot, _Entry):
+            if slot.keyHash == newEntry.keyHash and slot.key == newEntry.key:
+                newSlot = newEntry # replace
+            elif slot.keyHash == newEntry.keyHash:
+                newSlot = _Collision(slot.keyHash, (slot, newEntry))
+                added = True
+            else: # push both down one level
+                newSlot = self._merge(slot, newEntry, shift + self.BITS)
+                added = True
+        else: # _Collision
+            if slot.keyHash == newEntry.keyHash:
+                entries = tuple(entry for entry in slot.entries if entry.key != newEntry.key)
+                added = len(entries) == len(slot.entries)
+                newSlot = _Collision(slot.keyHash, entries + (newEntry,))
+            else:
+                newSlot = self._merge(slot, newEntry, shift + self.BITS)
+                added = True
+        return node[:slotIdx] + (newSlot,) + node[slotIdx+1:], added
+
+    def _merge(self, slot, newEntry, shift):
+        """
+        :return: new inner node holding slot (an _Entry or _Collision) and newEntry, which have different hashes
+        :rtype: tuple
+        """
+        oldSlotIdx = (slot.keyHash >> shift) & self.MASK
+        newSlotIdx = (newEntry.keyHash >> shift) & self.MASK
+        node = [None] * self.WIDTH
+        if oldSlotIdx == newSlotIdx:
+            node[oldSlotIdx] = self._merge(slot, newEntry, shift + self.BITS)
+        else:
+            node[oldSlotIdx] = slot
+            node[newSlotIdx] = newEntry
+        return tuple(node)
+
+    def _delete(self, node, shift, keyHash, key):
+        """
+        :return: copy of node without key, None if the copy would be empty
+        :rtype: tuple
+        """
+        slotIdx = (keyHash >> shift) & self.MASK
+        slot = node[slotIdx]
+        if slot is None:
+            raise KeyError(key)
+        if isinstance(slot, tuple):
+            newSlot = self._delete(slot, shift + self.BITS, keyHash, key)
+            if newSlot is not None: # an inner node left with one entry, is replaced by that entry
+                remaining = [s for s in newSlot if s is not None]
+                if len(remaining) == 1 and not isinstance(remaining[0], tuple):
+                    newSlot = remaining[0]
+        elif isinstance(slot, _Entry):
+            if slot.keyHash != keyHash or slot.key != key:
+                raise KeyError(key)
+            newSlot = None
+        else: # _Collision
+            entries = tuple(entry for entry in slot.entries if entry.key != key)
+            if len(entries) == len(slot.entries):
+                raise KeyError(key)
+            newSlot = entries[0] if len(entries) == 1 else _Collision(slot.keyHash, entries)
+        newNode = node[:slotIdx] + (newSlot,) + node[slotIdx+1:]
+        if all(s is None for s in newNode):
+            return None
+        return newNode
@@ -0,0 +1,42 @@
+import inspect
+import pprint
+
+from foundation.automat.common.lrucache import LRUCache
+
+
+def test__lruCache__evictsLeastRecentlyUsed(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    cache = LRUCache(maxSize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a') # b is now the least recently used
+    cache.put('c', 3)
+    if verbose:
+        pp.pprint(cache)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        'a' in cache and 'b' not in cache and 'c' in cache and
+        cache.get('b') is None and cache.get('c') == 3 and
+        cache.hits == 2 and cache.misses == 1 and cache.evictions == 1
+    ))
+
+
+def test__lruCache__memoryLimit(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    cache = LRUCache(maxSize=100, maxBytes=10, sizeOf=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.put('c', 'xxxx') # 12 bytes, a is evicted
+    cache.put('d', 'x' * 11) # bigger than maxBytes, not cached
+    if verbose:
+        pp.pprint(cache)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(cache) == 2 and 'a' not in cache and 'd' not in cache and
+        cache.currentBytes == 8 and cache.evictions == 1
+    ))
+
+
+if __name__=='__main__':
+    test__lruCache__evictsLeastRecentlyUsed()
+    test__lruCache__memoryLimit()
@@ -0,0 +1,50 @@
+import inspect
+import pprint
+
+from foundation.automat.common.persistentmap import PersistentMap
+
+
+def test__persistentMap__setDeleteSharesStructure(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    original = PersistentMap.fromMapping(dict((('x', i), [('y', i)]) for i in range(1000)))
+    changed = original.set(('x', 3), [('z', 3)]).delete(('x', 4)).set(('w', 1000), [])
+    if verbose:
+        pp.pprint(len(changed))
+    #slots of the top node, that are not on the path to the 3 changed keys, are the same objects
+    sharedSlots = sum(1 for slot0, slot1 in zip(original._root, changed._root) if slot0 is slot1)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(original) == 1000 and original[('x', 3)] == [('y', 3)] and ('x', 4) in original and
+        len(changed) == 1000 and changed[('x', 3)] == [('z', 3)] and ('x', 4) not in changed and
+        changed[('w', 1000)] == [] and
+        sharedSlots >= PersistentMap.WIDTH - 3 and
+        dict(changed) == dict(list((k, v) for k, v in original.items() if k != ('x', 4)) + [(('x', 3), [('z', 3)]), (('w', 1000), [])])
+    ))
+
+
+class _SameHash:
+    def __init__(self, name):
+        self.name = name
+    def __hash__(self):
+        return 42
+    def __eq__(self, other):
+        return isinstance(other, _SameHash) and self.name == other.name
+
+
+def test__persistentMap__hashCollision(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    persistentMap = PersistentMap().set(_SameHash('a'), 1).set(_SameHash('b'), 2).set(_SameHash('a'), 3)
+    deleted = persistentMap.delete(_SameHash('a'))
+    if verbose:
+        pp.pprint(persistentMap)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(persistentMap) == 2 and persistentMap[_SameHash('a')] == 3 and persistentMap[_SameHash('b')] == 2 and
+        len(deleted) == 1 and _SameHash('a') not in deleted and deleted[_SameHash('b')] == 2 and
+        len(deleted.delete(_SameHash('b'))) == 0
+    ))
+
+
+if __name__=='__main__':
+    test__persistentMap__setDeleteSharesStructure()
+    test__persistentMap__hashCollision()
@@ -0,0 +1,51 @@
+import inspect
+import pprint
+
+from foundation.automat.common.traversal import Traversal
+
+
+def test__traversal__orders(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    # (= a (+ (* b c) d))
+    ast = {
+        ('=', 0):[('a', 1), ('+', 2)],
+        ('+', 2):[('*', 3), ('d', 4)],
+        ('*', 3):[('b', 5), ('c', 6)]
+    }
+    preorder = [node[1] for node, _, _ in Traversal.preorder(ast, ('=', 0))]
+    postorder = list(Traversal.postorder(ast, ('=', 0)))
+    levelOrder = [node[1] for node, _, _ in Traversal.levelOrder(ast, ('=', 0))]
+    if verbose:
+        pp.pprint(preorder)
+        pp.pprint(postorder)
+        pp.pprint(levelOrder)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        preorder == [0, 1, 2, 3, 5, 6, 4] and
+        [node[1] for node, _, _ in postorder] == [1, 5, 6, 3, 4, 2, 0] and
+        levelOrder == [0, 1, 2, 3, 4, 5, 6] and
+        postorder[1] == (('b', 5), ('*', 3), 0) and postorder[-1] == (('=', 0), None, None)
+    ))
+
+
+def test__traversal__deepUnparse(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    from foundation.automat.parser.sorte.schemeparser import Schemeparser
+    depth = 5000 # far deeper than the recursion limit
+    ast = {('=', 0):[('a', 1), ('+', 2)]}
+    for level in range(depth):
+        ast[('+', 2*level+2)] = [('b', 2*level+3), ('+', 2*level+4)] if level < depth-1 else [('b', 2*level+3), ('c', 2*level+4)]
+    unparsed = Schemeparser(ast=ast)._unparse()
+    parsedAst = Schemeparser(equationStr='(= a (+ (* b c) d))').ast # numbered in level order
+    if verbose:
+        pp.pprint(unparsed[:100])
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        unparsed.startswith('(= a (+ b (+ b ') and unparsed.endswith('(+ b c)' + ')' * depth) and
+        parsedAst == {('=', 0):[('a', 1), ('+', 2)], ('+', 2):[('*', 3), ('d', 4)], ('*', 3):[('b', 5), ('c', 6)]}
+    ))
+
+
+if __name__=='__main__':
+    test__traversal__orders()
+    test__traversal__deepUnparse()
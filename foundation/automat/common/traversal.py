@@ -0,0 +1,101 @@
+from collections import deque
+
+
+class Traversal:
+    """
+    Iterative traversals of Abstract Syntax Trees (ast for short), as generators, so that they take linear time and
+    do not hit the recursion limit on any depth. Each yields (node, parentNode, argumentIdx), where argumentIdx is the
+    position of node in the row of parentNode, parentNode and argumentIdx are None for rootNode. Leaves are the nodes
+    that are not keys of ast.
+
+    The children of a node are ast.get(node, ()), or childrenOf(node) if childrenOf is given, so any tree (like the
+    :class:`Backtracker` of the parsers) can be walked.
+    """
+
+    @classmethod
+    def _childrenOf(cls, ast, childrenOf):
+        if childrenOf is not None:
+            return childrenOf
+        return lambda node: ast.get(node, ())
+
+    @classmethod
+    def preorder(cls, ast, rootNode, childrenOf=None):
+        """
+        :param ast: dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: node to start from
+        :type rootNode: tuple[str, int]
+        :param childrenOf: children of a node, defaults to the row of the node in ast
+        :type childrenOf: Callable[[Any], Sequence[Any]]
+        :return: parents before children, children from left to right
+        :rtype: Iterator[tuple[tuple[str, int], tuple[str, int], int]]
+        """
+        childrenOf = cls._childrenOf(ast, childrenOf)
+        stack = [(rootNode, None, None)]
+        while len(stack) > 0:
+            current = stack.pop()
+            yield current
+            node = current[0]
+            children = childrenOf(node)
+            for argumentIdx in range(len(children) - 1, -1, -1): # leftmost is popped first
+                stack.append((children[argumentIdx], node, argumentIdx))
+
+    @classmethod
+    def postorder(cls, ast, rootNode, childrenOf=None):
+        """
+        :return: children (from left to right) before parents, see :meth:`preorder` for the parameters
+        :rtype: Iterator[tuple[tuple[str, int], tuple[str, int], int]]
+        """
+        childrenOf = cls._childrenOf(ast, childrenOf)
+        stack = [(rootNode, None, None, False)]
+        while len(stack) > 0:
+            node, parentNode, argumentIdx, childrenDone = stack.pop()
+            if childrenDone:
+                yield node, parentNode, argumentIdx
+                continue
+            children = childrenOf(node)
+            if len(children) == 0: # leaf, no need to come back
+                yield node, parentNode, argumentIdx
+                continue
+            stack.append((node, parentNode, argumentIdx, True))
+            for childIdx in range(len(children) - 1, -1, -1):
+                stack.append((children[childIdx], node, childIdx, False))
+
+    @classmethod
+    def levelOrder(cls, ast, rootNode, childrenOf=None):
+        """
+        :return: breadth-first, each level from left to right, see :meth:`preorder` for the parameters
+        :rtype: Iterator[tuple[tuple[str, int], tuple[str, int], int]]
+        """
+        childrenOf = cls._childrenOf(ast, childrenOf)
+        queue = deque([(rootNode, None, None)])
+        while len(queue) > 0:
+            current = queue.popleft()
+            yield current
+            node = current[0]
+            for argumentIdx, child in enumerate(childrenOf(node)):
+                queue.append((child, node, argumentIdx))
+
+    @classmethod
+    def foldUp(cls, ast, rootNode, leafValue, nodeValue, childrenOf=None):
+        """
+        calculates a value for every node from the values of its children, without recursion, like unparsing
+
+        :param leafValue: value of a leaf
+        :type leafValue: Callable[[Any], Any]
+        :param nodeValue: value of a node, from the node and the values of its children (from left to right)
+        :type nodeValue: Callable[[Any, list[Any]], Any]
+        :return: value of rootNode
+        :rtype: Any
+        """
+        childrenOf = cls._childrenOf(ast, childrenOf)
+        values = [] # values of the nodes whose parent is not done yet, children are next to each other, in order
+        for node, parentNode, argumentIdx in cls.postorder(ast, rootNode, childrenOf=childrenOf):
+            children = childrenOf(node)
+            if len(children) == 0:
+                values.append(leafValue(node))
+                continue
+            childValues = values[len(values)-len(children):]
+            del values[len(values)-len(children):]
+            values.append(nodeValue(node, childValues))
+        return values[0]
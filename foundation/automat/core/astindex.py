@@ -0,0 +1,172 @@
+from foundation.automat.common.checker import Booler
+
+
+class AstIndex:
+    """
+    Index over an Abstract Syntax Tree (ast for short), from each node to its parent and to its argument position
+    (argumentIdx) on the parent. The ast only stores the links downwards, so without this, going up means scanning
+    every row of the ast once per level.
+
+    Ancestor queries and root-to-node paths then cost O(depth). Finding the nodes of a label (like all the sin), or
+    of a kind (function, variable or primitive) costs O(matches). Keep it up to date with :meth:`replaceRows`
+    whenever rows of the ast are replaced.
+
+    :param ast: the ast to index
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    """
+    KINDS = ('function', 'variable', 'primitive') # function for every node with children, = included
+
+    def __init__(self, ast):
+        """
+        builds the index with one pass over the rows of ast. Also the constructor.
+
+        :param ast: the ast to index
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        """
+        self.parent = {} # node to parent node, root is not in here
+        self.argumentIdx = {} # node to position of node in the children of parent
+        self.root = None
+        self.branches = set() # nodes that have a row (with children) in the ast
+        self.kind = {} # node to one of KINDS
+        self.labelNodes = {} # label to the nodes with that label, a dict with None values, so the order is kept
+        self.kindNodes = dict((kind, {}) for kind in self.KINDS) # kind to the nodes of that kind, like labelNodes
+        for parentNode, children in ast.items():
+            self._addRow(parentNode, children)
+        for parentNode in ast.keys():
+            if parentNode not in self.parent:
+                self.root = parentNode
+                break
+        for parentNode, children in ast.items(): # so the nodes of a label are in the order of the rows of ast
+            self._reindex(parentNode)
+            for child in children:
+                self._reindex(child)
+
+    def _addRow(self, parentNode, children):
+        self.branches.add(parentNode)
+        for argumentIdx, child in enumerate(children):
+            self.parent[child] = parentNode
+            self.argumentIdx[child] = argumentIdx
+
+    def _removeRow(self, parentNode, children):
+        self.branches.discard(parentNode)
+        for child in children:
+            if self.parent.get(child) == parentNode: # child might already be re-attached to another parent
+                del self.parent[child]
+                del self.argumentIdx[child]
+
+    def replaceRows(self, oldRows, newRows):
+        """
+        update the index after the rows oldRows of the ast were replaced by newRows, costs O(size of the rows)
+
+        :param oldRows: rows that were removed from the ast
+        :type oldRows: dict[tuple[str, int], list[tuple[str, int]]]
+        :param newRows: rows that were added to the ast
+        :type newRows: dict[tuple[str, int], list[tuple[str, int]]]
+        """
+        for parentNode, children in oldRows.items():
+            self._removeRow(parentNode, children)
+        for parentNode, children in newRows.items():
+            self._addRow(parentNode, children)
+        if self.root in oldRows and self.root not in newRows: # root was replaced
+            self.root = None
+        for parentNode in newRows.keys():
+            if parentNode not in self.parent:
+                self.root = parentNode
+        for rows in (oldRows, newRows): # only the nodes of these rows can have been added, removed, or changed kind
+            for parentNode, children in rows.items():
+                self._reindex(parentNode)
+                for child in children:
+                    self._reindex(child)
+
+    def _reindex(self, node):
+        """
+        puts node in labelNodes and kindNodes, if it is in the ast, else takes it out
+        """
+        oldKind = self.kind.pop(node, None)
+        if oldKind is not None:
+            del self.kindNodes[oldKind][node]
+            del self.labelNodes[node[0]][node]
+            if len(self.labelNodes[node[0]]) == 0:
+                del self.labelNodes[node[0]]
+        if node not in self.parent and node != self.root: # not in the ast anymore
+            return
+        if node in self.branches:
+            kind = 'function'
+        elif Booler.isNum(str(node[0])):
+            kind = 'primitive'
+        else:
+            kind = 'variable'
+        self.kind[node] = kind
+        self.kindNodes[kind][node] = None
+        self.labelNodes.setdefault(node[0], {})[node] = None
+
+    def parentOf(self, node):
+        """
+        :return: the parent of node, None if node is the root
+        :rtype: tuple[str, int]
+        """
+        return self.parent.get(node)
+
+    def argumentIdxOf(self, node):
+        """
+        :return: position of node in the children of its parent, None if node is the root
+        :rtype: int
+        """
+        return self.argumentIdx.get(node)
+
+    def kindOf(self, node):
+        """
+        :return: one of KINDS, None if node is not in the ast
+        :rtype: str
+        """
+        return self.kind.get(node)
+
+    def nodesOf(self, label):
+        """
+        :return: the nodes with label, in no particular order, costs O(matches)
+        :rtype: list[tuple[str, int]]
+        """
+        return list(self.labelNodes.get(label, ()))
+
+    def nodesOfKind(self, kind):
+        """
+        :param kind: one of KINDS
+        :type kind: str
+        :return: the nodes of kind, in no particular order, costs O(matches)
+        :rtype: list[tuple[str, int]]
+        """
+        return list(self.kindNodes[kind])
+
+    def depthOf(self, node):
+        """
+        :return: number of ancestors of node, 0 for the root, costs O(depth)
+        :rtype: int
+        """
+        return sum(1 for _ in self.ancestors(node))
+
+    def ancestors(self, node):
+        """
+        walks upwards from node to the root, node is not included
+
+        :param node: the node to start from
+        :type node: tuple[str, int]
+        :return: generator of the ancestors of node, parent first, root last
+        :rtype: generator[tuple[str, int]]
+        """
+        current = self.parent.get(node)
+        while current is not None:
+            yield current
+            current = self.parent.get(current)
+
+    def pathFromRoot(self, node):
+        """
+        :param node: the node to end at
+        :type node: tuple[str, int]
+        :return: list of (node, argumentIdx) from the root to node, argumentIdx of the root is None
+        :rtype: list[tuple[tuple[str, int], int]]
+        """
+        path = [(node, self.argumentIdx.get(node))]
+        for ancestor in self.ancestors(node):
+            path.append((ancestor, self.argumentIdx.get(ancestor)))
+        path.reverse()
+        return path
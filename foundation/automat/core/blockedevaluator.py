@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.core.hashconsedast import HashConsedAst
+
+
+class BlockedEvaluator:
+    """
+    Evaluates a solved Abstract Syntax Tree (ast for short), (= subject expression), over NumPy arrays, block by
+    block. Evaluating the whole arrays at once (like :meth:`Equation.evaluate`) makes one temporary array of the full
+    length per function node, here the temporaries are only blockSize long, and are preallocated once per thread,
+    then reused (with out=) for every block. A temporary is also reused by later nodes, once all its users are
+    calculated, so the number of temporaries is the most that are alive at the same time, not the number of nodes.
+
+    Blocks are split between threads, NumPy ufuncs release the GIL, so the threads run on different cores.
+    Memory used, other than the inputs and the output, is threads * self.bufferCount * blockSize * 8 bytes.
+
+    The code for each node is the NUMPY_CODE of its function class, with out= added to the outermost ufunc.
+
+    :param ast: the solved ast, the subject is input 0 of rootNode, and the expression is input 1
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    :param rootNode: the = of ast
+    :type rootNode: tuple[str, int]
+    :param variables: the inputs, in order
+    :type variables: list[str]
+    :param blockSize: number of rows in a block, the default keeps a few float64 temporaries inside L2 cache
+    :type blockSize: int
+    """
+    BLOCK_SIZE = 1 << 14
+    FUNCTION_NAME = 'evaluateBlock'
+    OUTERMOST_UFUNC = re.compile(r'^num=(numpy\.\w+)\((.*)\)$')
+
+    def __init__(self, ast, rootNode, variables, blockSize=None):
+        """
+        generates and compiles the code for one block. Also the constructor
+        """
+        self.variables = list(variables)
+        self.blockSize = blockSize if blockSize is not None else self.BLOCK_SIZE
+        self.source, self.bufferCount = self._generateSource(ast, rootNode)
+        namespace = {}
+        exec(compile(self.source, f'<{self.__class__.__name__}>', 'exec'), namespace)
+        self._evaluateBlock = namespace[self.FUNCTION_NAME]
+
+    def _generateSource(self, ast, rootNode):
+        """
+        ~SKETCH~
+        1. hash-cons the expression, dagIds are in postorder, so inputs come before the functions that use them
+        2. find the last user of each dagId
+        3. for each function dagId, take a free buffer (the output, if it is the expression), write the ufunc into it,
+        then free the buffers of the inputs, that are not used after this
+
+        :return: source of FUNCTION_NAME(inputs, buffers, out), and the number of buffers it needs
+        :rtype: tuple[str, int]
+        """
+        Function.gatherStandardFunctions()
+        expressionNode = ast[rootNode][1]
+        hashConsedAst = HashConsedAst.fromAst(ast, expressionNode)
+        expressionDagId = hashConsedAst.dagIdOf(expressionNode)
+        #~~~~~~~~~~~~~STEP2
+        lastUser = {}
+        for dagId in range(len(hashConsedAst)):
+            for childDagId in hashConsedAst.children[dagId]:
+                lastUser[childDagId] = dagId
+        #~~~~~~~~~~~~~STEP3
+        bodyLines = []
+        expressions = [] # dagId to the python expression of it
+        parameterNames = dict((variable, f'inputs[{idx}]') for idx, variable in enumerate(self.variables))
+        bufferOf = {} # dagId to the index of its buffer
+        freeBuffers = []
+        bufferCount = 0
+        for dagId in range(len(hashConsedAst)):
+            label = hashConsedAst.labels[dagId]
+            children = hashConsedAst.children[dagId]
+            if len(children) == 0:
+                expressions.append(EquationCompiler.leafCode(label, parameterNames))
+                continue
+            functionClass = Function.FUNCNAME_CLASS.get(label)
+            if functionClass is None:
+                raise Exception(f'{label} is not a standard function, cannot compile')
+            if dagId == expressionDagId:
+                outName = 'out'
+            else:
+                if len(freeBuffers) > 0:
+                    bufferOf[dagId] = freeBuffers.pop()
+                else:
+                    bufferOf[dagId] = bufferCount
+                    bufferCount += 1
+                outName = f'buffers[{bufferOf[dagId]}]'
+            for codeLine in functionClass.NUMPY_CODE:
+                codeLine = EquationCompiler.fillCode(codeLine, [expressions[childDagId] for childDagId in children])
+                match = self.OUTERMOST_UFUNC.match(codeLine)
+                if match is not None and self._balanced(match.group(2)):
+                    bodyLines.append(f'    {match.group(1)}({match.group(2)}, out={outName})')
+                else: # not a single ufunc call, copy the result in
+                    bodyLines.append(f'    {outName}[...] = {codeLine[len("num="):]}')
+            expressions.append(outName)
+            for childDagId in set(children):
+                if lastUser.get(childDagId) == dagId and childDagId in bufferOf:
+                    freeBuffers.append(bufferOf[childDagId])
+        if len(hashConsedAst.children[expressionDagId]) == 0: # expression is a variable or a primitive
+            bodyLines.append(f'    out[...] = {expressions[expressionDagId]}')
+        lines = ['import numpy', f'def {self.FUNCTION_NAME}(inputs, buffers, out):'] + bodyLines
+        return '\n'.join(lines) + '\n', bufferCount
+
+    @classmethod
+    def _balanced(cls, argumentsStr):
+        """
+        :return: True if the brackets in argumentsStr close each other, so that it is the whole argument list
+        :rtype: bool
+        """
+        depth = 0
+        for c in argumentsStr:
+            if c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+                if depth < 0:
+                    return False
+        return depth == 0
+
+    def evaluate(self, bindings, threads=None, out=None):
+        """
+        :param bindings: mapping from each of self.variables to its values, arrays of the same shape, or scalars.
+        Arrays with fewer dimensions are broadcast first (that makes a full-size copy of them)
+        :type bindings: dict[str, numpy.ndarray]
+        :param threads: number of threads, defaults to the number of cores
+        :type threads: int
+        :param out: array to write the result to, made if not given
+        :type out: numpy.ndarray
+        :return: the values of the expression, with the broadcast shape of bindings
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+        for variable in self.variables:
+            if variable not in bindings:
+                raise Exception(f"{variable} not in bindings")
+        arrays = [np.asarray(bindings[variable], dtype=np.float64) for variable in self.variables]
+        shape = np.broadcast_shapes(*(array.shape for array in arrays)) if len(arrays) > 0 else ()
+        inputs = [] # flat arrays, or scalars
+        for array in arrays:
+            if array.ndim == 0:
+                inputs.append(float(array))
+            elif array.shape == shape:
+                inputs.append(array.reshape(-1))
+            else:
+                inputs.append(np.broadcast_to(array, shape).reshape(-1))
+        if out is None:
+            out = np.empty(shape, dtype=np.float64)
+        elif out.shape != shape or not out.flags.c_contiguous:
+            raise Exception(f"out must be C-contiguous, with shape {shape}")
+        flatOut = out.reshape(-1) # a view, because out is C-contiguous
+        rowCount = flatOut.shape[0]
+        blockStarts = list(range(0, rowCount, self.blockSize))
+        threads = threads if threads is not None else (os.cpu_count() or 1)
+        threads = max(1, min(threads, len(blockStarts)))
+        def evaluateBlocks(threadIdx):
+            buffers = [np.empty(self.blockSize, dtype=np.float64) for _ in range(self.bufferCount)] # reused by every block
+            for start in blockStarts[threadIdx::threads]:
+                end = min(start + self.blockSize, rowCount)
+                blockInputs = [value[start:end] if isinstance(value, np.ndarray) else value for value in inputs]
+                blockBuffers = buffers if end - start == self.blockSize else [buffer[:end-start] for buffer in buffers]
+                self._evaluateBlock(blockInputs, blockBuffers, flatOut[start:end])
+        if threads == 1:
+            evaluateBlocks(0)
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for future in [executor.submit(evaluateBlocks, threadIdx) for threadIdx in range(threads)]:
+                    future.result() # raise errors of the threads
+        return out
@@ -0,0 +1,275 @@
+from array import array
+from collections.abc import Mapping
+
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.traversal import Traversal
+
+
+class CompactAst:
+    """
+    Struct-of-arrays form of the Abstract Syntax Tree (ast for short). The dictionary form used everywhere else,
+    (dict[tuple[label, id], list[tuple[label, id]]]) stores every label again in each parent's child list and needs
+    a tuple per node. Here, each node is just an index into flat arrays:
+
+    - labels : table of distinct label strings (interned, each label stored once)
+    - labelIds : labelIds[idx] is the position of the label of node idx in labels
+    - kinds : kinds[idx] is one of FUNCTION, VARIABLE, PRIMITIVE
+    - ids : ids[idx] is the id of node idx, in the dictionary form
+    - childOffsets : children of node idx are childIndices[childOffsets[idx]:childOffsets[idx+1]]
+    - childIndices : indices of the children, in argument order
+
+    Nodes are laid out in preorder from the root (index 0), so the subtree of idx is always a contiguous range of indices.
+    Use :meth:`view` to get a read-only dictionary of the same shape as the dictionary form, for code that expects it
+    (Schemeparser, Latexparser, Function)
+
+    :param labels: table of distinct labels
+    :type labels: list[str]
+    :param labelIds: label of each node, as an index into labels
+    :type labelIds: array
+    :param kinds: kind of each node
+    :type kinds: array
+    :param ids: id of each node in the dictionary form
+    :type ids: array
+    :param childOffsets: start of the children of each node in childIndices, has one more entry than there are nodes
+    :type childOffsets: array
+    :param childIndices: indices of children
+    :type childIndices: array
+    """
+    FUNCTION = 0
+    VARIABLE = 1
+    PRIMITIVE = 2
+
+    def __init__(self, labels, labelIds, kinds, ids, childOffsets, childIndices):
+        """
+        Just getters and setter. Also the constructor. Use :meth:`fromAst` to build from the dictionary form
+        """
+        self.labels = labels
+        self.labelIds = labelIds
+        self.kinds = kinds
+        self.ids = ids
+        self.childOffsets = childOffsets
+        self.childIndices = childIndices
+        self._idToIdx = None # built lazily, see _indexOfId
+
+    @classmethod
+    def fromAst(cls, ast, rootNode=None):
+        """
+        converts the dictionary form into arrays, the dictionary is walked once (preorder from rootNode, see :class:`Traversal`)
+
+        Kinds are decided by the shape of the tree, nodes with children are functions, leaves that are numbers are
+        primitives and all other leaves are variables
+
+        :param ast: the dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: where to start, defaults to the node with label '='
+        :type rootNode: tuple[str, int]
+        :return: the compact form of ast
+        :rtype: :class:`CompactAst`
+        """
+        if rootNode is None:
+            rootNode = cls._findRoot(ast)
+        labels = []
+        labelToLabelId = {}
+        labelIds = array('i')
+        kinds = array('b')
+        ids = array('i')
+        childCounts = array('i')
+        for current, _, _ in Traversal.preorder(ast, rootNode):
+            label = current[0]
+            labelId = labelToLabelId.get(label)
+            if labelId is None:
+                labelId = len(labels)
+                labelToLabelId[label] = labelId
+                labels.append(label)
+            labelIds.append(labelId)
+            ids.append(current[1])
+            children = ast.get(current, ())
+            childCounts.append(len(children))
+            if len(children) > 0:
+                kinds.append(cls.FUNCTION)
+            elif Booler.isNum(str(label)):
+                kinds.append(cls.PRIMITIVE)
+            else:
+                kinds.append(cls.VARIABLE)
+        #preorder, so the children of a node start right after the node, and each child is followed by its own subtree
+        nodeCount = len(ids)
+        subtreeSizes = [1] * nodeCount
+        for idx in range(nodeCount-1, -1, -1):
+            childIdx = idx + 1
+            for _ in range(childCounts[idx]):
+                subtreeSizes[idx] += subtreeSizes[childIdx]
+                childIdx += subtreeSizes[childIdx]
+        childOffsets = array('i', [0])
+        childIndices = array('i')
+        for idx in range(nodeCount):
+            childIdx = idx + 1
+            for _ in range(childCounts[idx]):
+                childIndices.append(childIdx)
+                childIdx += subtreeSizes[childIdx]
+            childOffsets.append(len(childIndices))
+        return cls(labels, labelIds, kinds, ids, childOffsets, childIndices)
+
+    @classmethod
+    def _findRoot(cls, ast):
+        for node in ast.keys():
+            if node[0] == '=':
+                return node
+        raise Exception('No equal, Invalid AST')
+
+    def __len__(self):
+        """
+        :return: number of nodes (leaves included)
+        :rtype: int
+        """
+        return len(self.ids)
+
+    def label(self, idx):
+        return self.labels[self.labelIds[idx]]
+
+    def kind(self, idx):
+        return self.kinds[idx]
+
+    def node(self, idx):
+        """
+        :return: the node idx, in the dictionary form
+        :rtype: tuple[str, int]
+        """
+        return (self.labels[self.labelIds[idx]], self.ids[idx])
+
+    def children(self, idx):
+        """
+        :return: indices of the children of node idx, in argument order
+        :rtype: array
+        """
+        return self.childIndices[self.childOffsets[idx]:self.childOffsets[idx+1]]
+
+    def childCount(self, idx):
+        return self.childOffsets[idx+1] - self.childOffsets[idx]
+
+    def subtreeEnd(self, idx):
+        """
+        subtree of idx is range(idx, self.subtreeEnd(idx)), because of the preorder layout.
+        The last node of the subtree is found by following the last children down, so this costs O(depth)
+
+        :return: one past the last index of the subtree of idx
+        :rtype: int
+        """
+        current = idx
+        while self.childOffsets[current] != self.childOffsets[current+1]:
+            current = self.childIndices[self.childOffsets[current+1]-1]
+        return current + 1
+
+    def indexOf(self, node):
+        """
+        :param node: a node in the dictionary form
+        :type node: tuple[str, int]
+        :return: index of node, or None if node is not in this tree
+        :rtype: int
+        """
+        idx = self._indexOfId(node[1])
+        if idx is None or self.labels[self.labelIds[idx]] != node[0]:
+            return None
+        return idx
+
+    def _indexOfId(self, nodeId):
+        if self._idToIdx is None:
+            if sorted(self.ids) == list(range(len(self.ids))): # ids from the parsers are 0...n-1
+                idToIdx = array('i', bytes(4 * len(self.ids)))
+                for idx, nid in enumerate(self.ids):
+                    idToIdx[nid] = idx
+                self._idToIdx = idToIdx
+            else:
+                self._idToIdx = dict((nid, idx) for idx, nid in enumerate(self.ids))
+        if isinstance(self._idToIdx, dict):
+            return self._idToIdx.get(nodeId)
+        if not isinstance(nodeId, int) or nodeId < 0 or nodeId >= len(self._idToIdx):
+            return None
+        return self._idToIdx[nodeId]
+
+    def toAst(self):
+        """
+        :return: the dictionary form, leaves are not keys
+        :rtype: dict[tuple[str, int], list[tuple[str, int]]]
+        """
+        ast = {}
+        for idx in range(len(self.ids)):
+            if self.childOffsets[idx] != self.childOffsets[idx+1]:
+                ast[self.node(idx)] = [self.node(childIdx) for childIdx in self.children(idx)]
+        return ast
+
+    def view(self):
+        """
+        :return: read-only dictionary view of this tree, that looks like the dictionary form
+        :rtype: :class:`CompactAstView`
+        """
+        return CompactAstView(self)
+
+    def nbytes(self):
+        """
+        :return: bytes held by the arrays and the label table
+        :rtype: int
+        """
+        total = sum(len(label) for label in self.labels)
+        for buffer in (self.labelIds, self.kinds, self.ids, self.childOffsets, self.childIndices):
+            total += buffer.itemsize * len(buffer)
+        return total
+
+    def asNumpy(self):
+        """
+        zero-copy NumPy views of the arrays, numpy is only imported when this is called
+
+        :return: mapping from array name to numpy.ndarray
+        :rtype: dict[str, numpy.ndarray]
+        """
+        import numpy as np
+        return {
+            'labelIds':np.frombuffer(self.labelIds, dtype=np.int32),
+            'kinds':np.frombuffer(self.kinds, dtype=np.int8),
+            'ids':np.frombuffer(self.ids, dtype=np.int32),
+            'childOffsets':np.frombuffer(self.childOffsets, dtype=np.int32),
+            'childIndices':np.frombuffer(self.childIndices, dtype=np.int32),
+        }
+
+
+class CompactAstView(Mapping):
+    """
+    Read-only dictionary of the shape dict[tuple[str, int], list[tuple[str, int]]], backed by a :class:`CompactAst`.
+    Children lists are made on each lookup, so mutating them does not change the tree.
+    Copying (copy.deepcopy) gives a plain, mutable dictionary, so code that copies before editing still works.
+
+    :param compactAst: the tree to look into
+    :type compactAst: :class:`CompactAst`
+    """
+    def __init__(self, compactAst):
+        self.compactAst = compactAst
+
+    def __getitem__(self, node):
+        idx = self.compactAst.indexOf(node)
+        if idx is None or self.compactAst.childCount(idx) == 0: # leaves are not keys
+            raise KeyError(node)
+        return [self.compactAst.node(childIdx) for childIdx in self.compactAst.children(idx)]
+
+    def __contains__(self, node):
+        if not isinstance(node, tuple) or len(node) != 2:
+            return False
+        idx = self.compactAst.indexOf(node)
+        return idx is not None and self.compactAst.childCount(idx) > 0
+
+    def __iter__(self):
+        compactAst = self.compactAst
+        for idx in range(len(compactAst)):
+            if compactAst.childOffsets[idx] != compactAst.childOffsets[idx+1]:
+                yield compactAst.node(idx)
+
+    def __len__(self):
+        compactAst = self.compactAst
+        return sum(1 for idx in range(len(compactAst)) if compactAst.childOffsets[idx] != compactAst.childOffsets[idx+1])
+
+    def __deepcopy__(self, memo):
+        return self.compactAst.toAst()
+
+    def __copy__(self):
+        return self.compactAst.toAst()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.compactAst.toAst()})'
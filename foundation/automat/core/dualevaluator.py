@@ -0,0 +1,142 @@
+import re
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.core.hashconsedast import HashConsedAst
+
+
+class DualEvaluator:
+    """
+    Evaluates a solved Abstract Syntax Tree (ast for short), (= subject expression), together with its partial
+    derivatives by all the variables, in one pass, with forward-mode automatic differentiation (dual numbers). Each
+    node carries its value, and its tangent, the partial derivatives of the node by every variable, stacked on axis 0.
+    The tangent of a function node is the sum over its inputs, of the partial derivative of the function by the input
+    (NUMPY_DERIVATIVE_CODE of its class in automat.arithmetic.standard), times the tangent of the input. Finite
+    differences would need len(variables)+1 evaluations, and lose half the digits.
+
+    The inputs can be NumPy arrays (or scalars) that broadcast together, like :meth:`Equation.evaluate`, there is one
+    ufunc call per function node for the values, and one per input for the tangents. The tangent of variable i is
+    row i of the identity, with shape (len(variables), 1, 1...), so it broadcasts against the values without a copy.
+    Subtrees without variables have no tangent, and their derivative code is not generated.
+
+    :param ast: the solved ast, the subject is input 0 of rootNode, and the expression is input 1
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    :param rootNode: the = of ast
+    :type rootNode: tuple[str, int]
+    :param variables: the inputs, in order
+    :type variables: list[str]
+    :param differentiateBy: the variables to differentiate by, defaults to all of variables, the others are constants
+    :type differentiateBy: list[str]
+    """
+    FUNCTION_NAME = 'evaluateDual'
+    DERIVATIVE_LINE = re.compile(r'^d(\d+)=(.*)$')
+
+    def __init__(self, ast, rootNode, variables, differentiateBy=None):
+        """
+        generates and compiles the code. Also the constructor
+        """
+        self.variables = list(variables)
+        self.differentiateBy = list(variables) if differentiateBy is None else list(differentiateBy)
+        self.source = self._generateSource(ast, rootNode)
+        namespace = {}
+        exec(compile(self.source, f'<{self.__class__.__name__}>', 'exec'), namespace)
+        self._evaluateDual = namespace[self.FUNCTION_NAME]
+
+    def _generateSource(self, ast, rootNode):
+        """
+        ~SKETCH~
+        1. hash-cons the expression, dagIds are in postorder, so inputs come before the functions that use them
+        2. for each function dagId
+            a. the value t<dagId>, from NUMPY_CODE
+            b. if an input has a tangent, the partial derivative by that input, from NUMPY_DERIVATIVE_CODE, and the
+            tangent g<dagId>, the sum of the partial derivatives times the tangents of the inputs
+        3. return the value and the tangent (None if the expression has no variables)
+
+        :return: source of FUNCTION_NAME(inputs, seeds)
+        :rtype: str
+        """
+        Function.gatherStandardFunctions()
+        expressionNode = ast[rootNode][1]
+        hashConsedAst = HashConsedAst.fromAst(ast, expressionNode)
+        #~~~~~~~~~~~~~STEP2
+        bodyLines = []
+        expressions = [] # dagId to the python expression of its value
+        tangents = [] # dagId to the python expression of its tangent, None if it has no variables
+        parameterNames = dict((variable, f'inputs[{idx}]') for idx, variable in enumerate(self.variables))
+        for dagId in range(len(hashConsedAst)):
+            label = hashConsedAst.labels[dagId]
+            children = hashConsedAst.children[dagId]
+            if len(children) == 0:
+                expressions.append(EquationCompiler.leafCode(label, parameterNames))
+                tangents.append(f'seeds[{self.differentiateBy.index(label)}]' if label in self.differentiateBy else None)
+                continue
+            functionClass = Function.FUNCNAME_CLASS.get(label)
+            if functionClass is None:
+                raise Exception(f'{label} is not a standard function, cannot compile')
+            localName = f't{dagId}'
+            inputCodes = [expressions[childDagId] for childDagId in children]
+            for codeLine in functionClass.NUMPY_CODE:
+                bodyLines.append(f'    {EquationCompiler.fillCode(codeLine, inputCodes, localName)}')
+            expressions.append(localName)
+            #~~~~~~~~~~~~~STEP2b
+            if all(tangents[childDagId] is None for childDagId in children):
+                tangents.append(None)
+                continue
+            if len(functionClass.NUMPY_DERIVATIVE_CODE) != len(children):
+                raise Exception(f'{label} has no derivative code, cannot differentiate')
+            terms = []
+            for codeLine in functionClass.NUMPY_DERIVATIVE_CODE:
+                argumentIdx, derivativeStr = self.DERIVATIVE_LINE.match(codeLine).groups()
+                childTangent = tangents[children[int(argumentIdx)]]
+                if childTangent is None: # input without variables, its derivative is not needed
+                    continue
+                derivativeStr = EquationCompiler.fillCode(derivativeStr, inputCodes, localName)
+                if Booler.isNum(derivativeStr) and float(derivativeStr) == 1.0:
+                    terms.append(childTangent)
+                    continue
+                if Booler.isNum(derivativeStr.lstrip('-')): # a constant, no need for a local variable
+                    terms.append(f'numpy.multiply({derivativeStr}, {childTangent})')
+                    continue
+                derivativeName = f'd{dagId}_{argumentIdx}'
+                bodyLines.append(f'    {derivativeName}={derivativeStr}')
+                terms.append(f'numpy.multiply({derivativeName}, {childTangent})')
+            tangentName = f'g{dagId}'
+            tangentStr = terms[0]
+            for term in terms[1:]:
+                tangentStr = f'numpy.add({tangentStr}, {term})'
+            bodyLines.append(f'    {tangentName}={tangentStr}')
+            tangents.append(tangentName)
+        #~~~~~~~~~~~~~STEP3
+        expressionDagId = hashConsedAst.dagIdOf(expressionNode)
+        bodyLines.append(f'    return {expressions[expressionDagId]}, {tangents[expressionDagId]}')
+        lines = ['import numpy', f'def {self.FUNCTION_NAME}(inputs, seeds):'] + bodyLines
+        return '\n'.join(lines) + '\n'
+
+    def evaluate(self, bindings):
+        """
+        :param bindings: mapping from each of self.variables to its values, arrays (or scalars) that broadcast together
+        :type bindings: dict[str, numpy.ndarray]
+        :return: multiple returns
+            - the values of the expression, with the broadcast shape of bindings
+            - mapping from each of self.differentiateBy to the partial derivative of the expression by it, with the
+            same shape
+        :rtype: tuple[numpy.ndarray, dict[str, numpy.ndarray]]
+        """
+        import numpy as np
+        for variable in self.variables:
+            if variable not in bindings:
+                raise Exception(f"{variable} not in bindings")
+        inputs = [np.asarray(bindings[variable], dtype=np.float64) for variable in self.variables]
+        shape = np.broadcast_shapes(*(array.shape for array in inputs)) if len(inputs) > 0 else ()
+        identity = np.eye(len(self.differentiateBy), dtype=np.float64)
+        seeds = [row.reshape((len(self.differentiateBy),) + (1,) * len(shape)) for row in identity]
+        value, tangent = self._evaluateDual(inputs, seeds)
+        value = np.array(np.broadcast_to(value, shape), dtype=np.float64)
+        if tangent is None: # none of self.differentiateBy in the expression
+            tangent = np.zeros((len(self.differentiateBy),) + shape, dtype=np.float64)
+        tangent = np.broadcast_to(tangent, (len(self.differentiateBy),) + shape)
+        partials = {}
+        for idx, variable in enumerate(self.differentiateBy):
+            partials[variable] = np.array(tangent[idx], dtype=np.float64)
+        return value, partials
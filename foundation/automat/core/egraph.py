@@ -0,0 +1,369 @@
+import math
+import time
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.common.traversal import Traversal
+from foundation.automat.core.rewriteengine import DiscriminationTree, RewriteRule
+from foundation.automat.core.simplifier import Simplifier
+
+
+class EGraph:
+    """
+    E-graph of Abstract Syntax Trees (ast for short), for equality saturation. Each e-class is a set of e-nodes that
+    are known to be equal, an e-node is (label, tuple of the e-classes of its children). Rewrite rules add the rhs of
+    each match to the e-graph, and merge it with the e-class of the match, so every form reached by the rules is
+    kept at once, and the best one is extracted at the end, by cost, instead of trying the orders of rewrites one
+    by one.
+
+    - union-find over e-class ids, :meth:`find` gives the canonical id
+    - hash-consed e-node table, an e-node (with canonical children) is in exactly one e-class
+    - :meth:`rebuild` restores congruence after merges (e-nodes that became equal are merged too), once per iteration
+    - constants : e-classes whose value is known, a function e-node whose children are all constants is calculated
+    with the _calculate of its class in automat.arithmetic.standard, and the number is added to its e-class
+
+    Rules are :class:`RewriteRule`, by default ALGEBRAIC_RULES and the IDENTITIES of the standard functions.
+    """
+    ALGEBRAIC_RULES = [ # (lhs, rhs), see RewriteRule, only safe in an e-graph, they would loop in a Simplifier
+        ('(+ $x $y)', '(+ $y $x)'),
+        ('(* $x $y)', '(* $y $x)'),
+        ('(+ (+ $x $y) $z)', '(+ $x (+ $y $z))'),
+        ('(* (* $x $y) $z)', '(* $x (* $y $z))'),
+        ('(* $x (+ $y $z))', '(+ (* $x $y) (* $x $z))'),
+        ('(+ (* $x $y) (* $x $z))', '(* $x (+ $y $z))'),
+        ('(* $x $x)', '(^ $x 2)'),
+    ]
+    EVALUATION_COSTS = {'+':1, '-':1, '*':1, '/':4, '^':8} # other functions cost DEFAULT_EVALUATION_COST
+    DEFAULT_EVALUATION_COST = 16
+
+    def __init__(self):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        Function.gatherStandardFunctions()
+        self._parent = [] # union-find, e-class id to its parent e-class id
+        self._nodes = {} # canonical e-class id to its set of e-nodes
+        self._uses = {} # canonical e-class id to list of (e-node, e-class id) that have it as a child
+        self._hashcons = {} # e-node to e-class id
+        self._constants = {} # canonical e-class id to its value
+        self._pending = [] # e-classes merged since the last rebuild
+
+    def __len__(self):
+        """
+        :return: number of e-nodes
+        :rtype: int
+        """
+        return len(self._hashcons)
+
+    def classCount(self):
+        return len(self._nodes)
+
+    def find(self, classId):
+        root = classId
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[classId] != root: # path compression
+            self._parent[classId], classId = root, self._parent[classId]
+        return root
+
+    def _canonical(self, enode):
+        return (enode[0], tuple(self.find(child) for child in enode[1]))
+
+    def add(self, label, children=()):
+        """
+        :param label: label of the e-node, numbers are stored in one form, so 2 and 2.0 are the same e-node
+        :type label: str
+        :param children: e-classes of the inputs
+        :type children: tuple[int]
+        :return: the e-class of the e-node
+        :rtype: int
+        """
+        label = str(label)
+        if len(children) == 0 and Booler.isNum(label):
+            label = Simplifier.numberLabel(float(label)) or label
+        enode = self._canonical((label, tuple(children)))
+        classId = self._hashcons.get(enode)
+        if classId is not None:
+            return self.find(classId)
+        classId = len(self._parent)
+        self._parent.append(classId)
+        self._nodes[classId] = set([enode])
+        self._uses[classId] = []
+        self._hashcons[enode] = classId
+        for child in enode[1]:
+            self._uses[child].append((enode, classId))
+        if len(enode[1]) == 0 and Booler.isNum(label):
+            self._constants[classId] = float(label)
+        else:
+            self._fold(enode, classId)
+        return classId
+
+    def _fold(self, enode, classId):
+        """
+        if all the children of enode are constants, calculate it, and merge the number into classId
+        """
+        if self.find(classId) in self._constants or len(enode[1]) == 0:
+            return
+        values = [self._constants.get(self.find(child)) for child in enode[1]]
+        functionClass = Function.FUNCNAME_CLASS.get(enode[0])
+        if None in values or functionClass is None:
+            return
+        try:
+            value = functionClass(None)._calculate(*values)
+        except (ArithmeticError, ValueError, TypeError):
+            return
+        if not isinstance(value, (int, float)) or not math.isfinite(value):
+            return
+        label = Simplifier.numberLabel(value)
+        if label is not None:
+            self.merge(classId, self.add(label))
+
+    def merge(self, classId0, classId1):
+        """
+        :return: the canonical e-class of the merged e-classes
+        :rtype: int
+        """
+        classId0, classId1 = self.find(classId0), self.find(classId1)
+        if classId0 == classId1:
+            return classId0
+        if len(self._nodes[classId0]) < len(self._nodes[classId1]): # smaller into larger
+            classId0, classId1 = classId1, classId0
+        self._parent[classId1] = classId0
+        self._nodes[classId0] |= self._nodes.pop(classId1)
+        self._uses[classId0] += self._uses.pop(classId1)
+        if classId1 in self._constants:
+            self._constants.setdefault(classId0, self._constants.pop(classId1))
+        self._pending.append(classId0)
+        return classId0
+
+    def rebuild(self):
+        """
+        ~SKETCH~
+        for every e-class that was merged, canonicalise the e-nodes that use it, in the hash-cons too. Two of them
+        that are now the same e-node (congruent) have their e-classes merged, which may make more pending e-classes.
+        Their constants are folded again, a child might have become a constant
+        """
+        while len(self._pending) > 0:
+            pending = set(self.find(classId) for classId in self._pending)
+            self._pending = []
+            for classId in pending:
+                classId = self.find(classId)
+                uses = {}
+                for enode, useClassId in self._uses[classId]:
+                    self._hashcons.pop(enode, None)
+                    enode = self._canonical(enode)
+                    if enode in uses:
+                        self.merge(useClassId, uses[enode])
+                    uses[enode] = self.find(useClassId)
+                    self._hashcons[enode] = uses[enode]
+                for enode, useClassId in uses.items():
+                    self._fold(enode, useClassId)
+                if self.find(classId) == classId:
+                    self._uses[classId] = list(uses.items())
+                else: # merged while repairing, the merged e-class is pending, and is repaired again
+                    self._uses[self.find(classId)] += list(uses.items())
+        for classId in list(self._nodes.keys()): # canonicalise the e-nodes of each e-class
+            self._nodes[classId] = set(self._canonical(enode) for enode in self._nodes[classId])
+
+    def addAst(self, ast, rootNode):
+        """
+        :param ast: the dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: node of ast to add, with its subtree
+        :type rootNode: tuple[str, int]
+        :return: the e-class of rootNode
+        :rtype: int
+        """
+        return Traversal.foldUp(ast, rootNode, lambda leaf: self.add(leaf[0], ()),
+                                lambda node, childClassIds: self.add(node[0], tuple(childClassIds)))
+
+    def ematch(self, pattern, classId):
+        """
+        :param pattern: lhs of a :class:`RewriteRule`
+        :type pattern: tuple[str, tuple]
+        :param classId: the e-class to match at
+        :type classId: int
+        :return: every binding of the pattern variables (to e-classes) that matches
+        :rtype: list[dict[str, int]]
+        """
+        return list(self._ematch(pattern, self.find(classId), {}))
+
+    def _ematch(self, pattern, classId, bindings):
+        """
+        not recursive, each state is the bindings so far, and the (pattern, e-class) pairs still to match, in order.
+        States are on a stack, the alternatives pushed in reverse, so bindings come in the same order as a recursive
+        match would give them
+        """
+        stack = [(bindings, ((pattern, classId),))]
+        while len(stack) > 0:
+            bindings, goals = stack.pop()
+            if len(goals) == 0:
+                yield bindings
+                continue
+            (label, patternChildren), classId = goals[0]
+            goals = goals[1:]
+            if RewriteRule.isPatternVariable(label):
+                if label[0] == DiscriminationTree.NUMBER and classId not in self._constants:
+                    continue
+                if label in bindings:
+                    if self.find(bindings[label]) == classId:
+                        stack.append((bindings, goals))
+                    continue
+                stack.append((dict(bindings, **{label:classId}), goals))
+                continue
+            if len(patternChildren) == 0 and Booler.isNum(label):
+                if self._constants.get(classId) == float(label):
+                    stack.append((bindings, goals))
+                continue
+            alternatives = []
+            for enodeLabel, children in sorted(self._nodes[classId]):
+                if enodeLabel != label or len(children) != len(patternChildren):
+                    continue
+                childGoals = tuple((patternChild, self.find(child)) for patternChild, child in zip(patternChildren, children))
+                alternatives.append((bindings, childGoals + goals))
+            stack += reversed(alternatives)
+
+    def _instantiate(self, pattern, bindings):
+        """
+        :return: the e-class of pattern, with its variables replaced by their e-classes in bindings
+        :rtype: int
+        """
+        return Traversal.foldUp(None, pattern,
+                                lambda leaf: bindings[leaf[0]] if RewriteRule.isPatternVariable(leaf[0]) else self.add(leaf[0]),
+                                lambda current, childClassIds: self.add(current[0], tuple(childClassIds)),
+                                childrenOf=lambda current: current[1])
+
+    def saturate(self, rules, iterationLimit=8, nodeLimit=10000, timeLimit=1.0):
+        """
+        ~SKETCH~
+        each iteration, find all the matches of all rules (only at the e-classes with an e-node of the head of the
+        lhs), then add the rhs of each match and merge it, then rebuild. Stop when an iteration adds nothing
+        (saturated), or at a limit
+
+        :param rules: the rules
+        :type rules: list[:class:`RewriteRule`]
+        :param iterationLimit: most iterations
+        :type iterationLimit: int
+        :param nodeLimit: stop when there are more e-nodes than this, matching stops when every match found could
+        add one e-node past it
+        :type nodeLimit: int
+        :param timeLimit: seconds, checked at each e-class while matching and at each merge, the matches of an
+        iteration that goes past it while matching are dropped
+        :type timeLimit: float
+        :return: why it stopped, one of saturated, iterationLimit, nodeLimit, timeLimit
+        :rtype: str
+        """
+        deadline = time.monotonic() + timeLimit
+        for _ in range(iterationLimit):
+            classesOfHead = {}
+            for classId, enodes in self._nodes.items():
+                for enode in enodes:
+                    classesOfHead.setdefault((enode[0], len(enode[1])), set()).add(classId)
+            matches = []
+            stopped = None # why matching or merging stopped early
+            for rule in rules:
+                head = (rule.lhs[0], len(rule.lhs[1]))
+                for classId in sorted(classesOfHead.get(head, ())): # sorted, so that ids do not depend on hashing
+                    if time.monotonic() > deadline:
+                        stopped = 'timeLimit'
+                        break
+                    for bindings in self.ematch(rule.lhs, classId):
+                        if rule.holds(dict((label, self._constants[self.find(boundClassId)]) for label, boundClassId in bindings.items()
+                                           if label[0] == DiscriminationTree.NUMBER)):
+                            matches.append((rule, classId, bindings))
+                    if len(self) + len(matches) > nodeLimit:
+                        stopped = 'nodeLimit'
+                        break
+                if stopped is not None:
+                    break
+            if stopped == 'timeLimit':
+                return stopped
+            sizeBefore, classCountBefore = len(self), self.classCount()
+            for rule, classId, bindings in matches:
+                self.merge(classId, self._instantiate(rule.rhs, bindings))
+                if len(self) > nodeLimit:
+                    stopped = 'nodeLimit'
+                    break
+                if time.monotonic() > deadline:
+                    stopped = 'timeLimit'
+                    break
+            self.rebuild()
+            if len(self) > nodeLimit:
+                return 'nodeLimit'
+            if stopped is not None:
+                return stopped
+            if len(self) == sizeBefore and self.classCount() == classCountBefore:
+                return 'saturated'
+            if time.monotonic() > deadline:
+                return 'timeLimit'
+        return 'iterationLimit'
+
+    def nodeCost(self, enode, cost):
+        """
+        :param cost: size (every node costs 1), or evaluation (EVALUATION_COSTS of the functions, leaves are free)
+        :type cost: str
+        """
+        if cost == 'size':
+            return 1
+        if cost == 'evaluation':
+            if len(enode[1]) == 0:
+                return 0
+            return self.EVALUATION_COSTS.get(enode[0], self.DEFAULT_EVALUATION_COST)
+        raise Exception(f'{cost} is not a cost, choose from size, evaluation')
+
+    def extract(self, classId, cost='size'):
+        """
+        the cheapest tree of classId, the best e-node of each e-class is found by relaxing, until no e-class gets
+        cheaper
+
+        :param classId: e-class to extract
+        :type classId: int
+        :param cost: see :meth:`nodeCost`
+        :type cost: str
+        :return: the cost of the tree, and the tree, as nested (label, tuple of children)
+        :rtype: tuple[float, tuple[str, tuple]]
+        """
+        bestCost = {}
+        bestNode = {}
+        changed = True
+        while changed:
+            changed = False
+            for currentClassId, enodes in self._nodes.items():
+                for enode in sorted(enodes): # ties go to the smallest e-node, whatever the hashing
+                    childCosts = [bestCost.get(self.find(child)) for child in enode[1]]
+                    if None in childCosts:
+                        continue
+                    total = self.nodeCost(enode, cost) + sum(childCosts)
+                    if total < bestCost.get(currentClassId, math.inf):
+                        bestCost[currentClassId] = total
+                        bestNode[currentClassId] = enode
+                        changed = True
+        classId = self.find(classId)
+        tree = Traversal.foldUp(None, classId,
+                                lambda leafClassId: (bestNode[self.find(leafClassId)][0], ()),
+                                lambda currentClassId, childTrees: (bestNode[self.find(currentClassId)][0], tuple(childTrees)),
+                                childrenOf=lambda currentClassId: bestNode[self.find(currentClassId)][1])
+        return bestCost[classId], tree
+
+    @classmethod
+    def treeToAst(cls, tree):
+        """
+        :param tree: nested (label, tuple of children), from :meth:`extract`
+        :type tree: tuple[str, tuple]
+        :return: dictionary form, ids numbered breadth first from 0, like the parsers
+        :rtype: :class:`PersistentMap`
+        """
+        rows = {}
+        queue = [(tree, 0)]
+        nextId = 1
+        for (label, children), nodeId in queue: # queue grows while it is walked
+            if len(children) == 0:
+                continue
+            row = []
+            for child in children:
+                row.append((child[0], nextId))
+                queue.append((child, nextId))
+                nextId += 1
+            rows[(label, nodeId)] = row
+        return PersistentMap.fromMapping(rows)
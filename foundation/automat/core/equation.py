@@ -1,9 +1,22 @@
-from copy import deepcopy
-from importlib import import_module
+from concurrent.futures import ProcessPoolExecutor
+import sys
 
-from foundation.automat.common.backtracker import Backtracker
 from foundation.automat.arithmetic.function import Function
-from foundation.automat.parser import Parser
+from foundation.automat.common.lrucache import LRUCache
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.core.astindex import AstIndex
+from foundation.automat.core.blockedevaluator import BlockedEvaluator
+from foundation.automat.core.compactast import CompactAst
+from foundation.automat.core.dualevaluator import DualEvaluator
+from foundation.automat.core.egraph import EGraph
+from foundation.automat.core.eulertour import EulerTour
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.core.hashconsedast import HashConsedAst
+from foundation.automat.core.polynomial import Polynomial
+from foundation.automat.core.rewriteengine import RewriteRule
+from foundation.automat.core.rootfinder import RootFinder
+from foundation.automat.core.simplifier import Simplifier
+from foundation.automat.parser.parser import Parser
 
 class Equation:
     """
@@ -13,14 +26,20 @@ class Equation:
 
     TODO ast should also be displayable in 2D/3D, and glow/shine and shift and rotate and all that
     TODO 2d/3d will help in debugging
-    TODO PICKLE too? https://docs.python.org/3/library/pickle.html
+    Parsed equations can be saved to a binary file, and loaded without parsing again, see :class:`EquationFile`
 
     :param equationStr: the equation str to be parsed
     :type equationStr: str
     :param parserName: the name of the parser to be used
     :type parserName: str
+    :param compact: keep the ast as :class:`CompactAst` arrays, self.ast is then a read-only dictionary view of it
+    :type compact: bool
     """
-    def __init__(self, equationStr, parserName):
+    #makeSubject results, shared by all equations, key is (structural hash of the ast, variable)
+    SOLVE_CACHE = LRUCache(maxSize=1024, maxBytes=64*1024*1024, sizeOf=lambda entry: Equation._solveCacheEntryBytes(entry))
+    MAX_POLYNOMIAL_DEGREE = 4 # most appearances of a variable that makeSubject solves in closed form
+
+    def __init__(self, equationStr, parserName, compact=False):
         """
         loads the parser with that name, throws a tantrum if parserName was not found. Also the constructor
 
@@ -28,90 +47,601 @@ class Equation:
         :type equationStr: str
         :param parserName: the name of the parser to be used
         :type parserName: str
+        :param compact: keep the ast as :class:`CompactAst` arrays, self.ast is then a read-only dictionary view of it
+        :type compact: bool
         """
         self._eqs = equationStr
         self._parserName = parserName
         (self.ast, self.functions, self.variables, self.primitives,
          self.totalNodeCount) = Parser(parserName).parse(self._eqs)
+        self.compactAst = None
+        if compact: # the dictionary form is dropped, only the arrays are kept
+            self.compactAst = CompactAst.fromAst(self.ast)
+            self.ast = self.compactAst.view()
+        else: # rewrites of the ast share the unchanged rows with it, instead of deepcopying
+            self.ast = PersistentMap.fromMapping(self.ast)
+        self._initIndices()
+
+    @classmethod
+    def fromCompactAst(cls, compactAst, functions, variables, primitives, totalNodeCount, equationStr=None,
+                       parserName=None):
+        """
+        makes an Equation from an already parsed ast, without parsing (like Equation(..., compact=True)), used to load
+        equations from a file (see :class:`EquationFile`)
+
+        :param compactAst: the parsed ast
+        :type compactAst: :class:`CompactAst`
+        :param functions: function name to count, like the parsers return
+        :type functions: dict[str, int]
+        :param variables: variable to count, like the parsers return
+        :type variables: dict[str, int]
+        :param primitives: number of primitives
+        :type primitives: int
+        :param totalNodeCount: number of nodes
+        :type totalNodeCount: int
+        :param equationStr: the equation str that was parsed, if known
+        :type equationStr: str
+        :param parserName: the name of the parser that parsed it, if known
+        :type parserName: str
+        :rtype: :class:`Equation`
+        """
+        equation = cls.__new__(cls)
+        equation._eqs = equationStr
+        equation._parserName = parserName
+        equation.functions = functions
+        equation.variables = variables
+        equation.primitives = primitives
+        equation.totalNodeCount = totalNodeCount
+        equation.compactAst = compactAst
+        equation.ast = compactAst.view()
+        equation._initIndices()
+        return equation
+
+    def _initIndices(self):
+        """
+        the indices over self.ast, that are built at construction, and the lazily built ones
+        """
+        self._astIndex = (self.ast, AstIndex(self.ast)) # see astIndex, (self.ast it was built from, index)
+        self._hashConsedAst = (None, None) # see hashConsedAst, (self.ast it was made from, hash-consed form)
+        self._eulerTour = (None, None) # see eulerTour, (self.ast it was laid out from, layout)
+        self._compiled = {} # see compile, (variable, target) to (self.ast it was compiled from, compiled function)
 
     def makeSubject(self, variable):
         """
-        make variable the subject of this equation
+        make variable the subject of this equation. The path from the root (=) down to variable is read from
+        self.astIndex, then the function nodes on that path are inverted, starting with the one nearest to =.
+        Each inversion only makes new rows for the nodes it rewrites, the rest are shared with self.ast, which is
+        not changed. Nothing of self is changed, so many threads can solve the same equation at once, without locks.
+
+        If variable appears 2 to MAX_POLYNOMIAL_DEGREE times, and the equation is a polynomial in it, each of its
+        roots is a solution, see :meth:`_makeSubjectOfPolynomial`.
+
+        Results are kept in Equation.SOLVE_CACHE, so solving a structurally identical equation (same labels and
+        shape, the ids may differ) for the same variable again, only remaps the ids of the stored result. The cache
+        keeps the rows as tuples, each call returns a new AST, with the rows as lists.
 
         :param variable:
         :type variable: str
-        :return: a new AST that has variable as the subject of the formula
-        :rtype: dict[tuple[str, int], list[tuple[str, int]]]
+        :return: a new AST that has variable as the subject of the formula, or a list of them, one for each root,
+        if variable appears more than once
+        :rtype: :class:`PersistentMap` | list[:class:`PersistentMap`]
         """
         #error checking
         if variable not in self.variables:
             raise Exception("Variable Not Available")
-        if self.variables[variable] > 1: 
-            #TODO, unable to further handle without more patterns like quadratic, cubic, quartic, AST-equivalence-for-special-substitution-techniques
+        if self.variables[variable] > 1:
+            #TODO, unable to further handle without more patterns like AST-equivalence-for-special-substitution-techniques
             #TODO can put factorisation here
-            raise Exception("Cannot handle")
+            return self._makeSubjectOfPolynomial(variable)
+
+        cacheKey = (self.hashConsedAst().hashOf(self.astIndex.root), variable)
+        cached = Equation.SOLVE_CACHE.get(cacheKey)
+        if cached is not None:
+            modifiedAst = self._remapCachedSubjectAst(*cached)
+            if modifiedAst is not None: # None if it was a hash collision
+                return modifiedAst
 
         #find path from subRoot to variable
-        stack = [Backtracker(
-            '=', #label
-            None, #neighbours
-            None, # argumentIdx
-            None, #prev
-            None, #id
-        )]
-        found = None
-        while len(stack) != 0:
-            current = stack.pop()
-            if current.label == variable:
-                found = current
-                break
-            for argumentIdx, (label, id) in enumerate(self.ast[current.label]):
-                backtracker = Backtracker(
-                    label, #label
-                    None, #neighbours
-                    argumentIdx, #argumentIdx
-                    current, #prev
-                    id
-                )
-                stack.append(backtracker)
-            if found is None:
-                raise Exception("No path to variable") # this shouldn't happen, most probably a parser error
-            ops = [{
-                'functionName':found.label,
-                'argumentIdx':found.argumentIdx,
-                'id':found.id,
-                'lastId':found.prev.id if found.prev is not None else None
-            }]
-            while found.prev is not None:
-                found = found.prev
-                ops.append({
-                    'functionName':found.label,
-                    'argumentIdx':found.argumentIdx,
-                    'id':found.id,
-                    'lastId':found.prev.id if found.prev is not None else None
-                })
-            originalAst = deepcopy(self.ast)
-            #apply the inverses
-            while len(ops) != 0:
-                op = ops.pop(0) # apply in reverse order (start with the one nearest to =)
-                op_filename = Function.FUNCNAME_FILENAME[op['functionName']]
-                op_foldername = "arithmetic.standard."+op_filename
-                functionClass = getattr(import_module(op_foldername, op_filename))
-                (invertedAst, functionCountChange,
-                variableCountChange, primitiveCountChange, totalNodeCountChange) = functionClass(self).inverse(
-                    op.argumentIdx, [op.id, op.lastId]
-                )
-                #update the `stat` of self
-                self.ast = invertedAst
-                for funcName, countChange in functionCountChange.items():
-                    self.functions[funcName] += countChange
-                for varStr, countChange in variableCountChange.items():
-                    self.variables[varStr] += countChange
-                self.primitives = primitiveCountChange
-                self.totalNodeCount += totalNodeCountChange
-            modifiedAst = deepcopy(self.ast)
-            self.ast = originalAst# put back
-            return modifiedAst
+        variableNode = self._findVariableNode(variable)
+        if variableNode is None:
+            raise Exception("No path to variable") # this shouldn't happen, most probably a parser error
+        path = self.astIndex.pathFromRoot(variableNode)
+        equalNode = path[0][0]
+        ops = []
+        for (functionNode, _), (_, argumentIdx) in zip(path[1:-1], path[2:]):
+            ops.append({
+                'functionName':functionNode[0],
+                'argumentIdx':argumentIdx,
+                'id':functionNode[1],
+                'lastId':equalNode[1] # after each inverse, the next function on the path hangs from =
+            })
+        sourceAst = PersistentMap.fromMapping(self.ast) # only copies if self.ast is a view of self.compactAst
+        ast = sourceAst
+        totalNodeCount = self.totalNodeCount # of ast, inverse of the next op reads it, self is only read
+        #apply the inverses
+        while len(ops) != 0:
+            op = ops.pop(0) # apply in reverse order (start with the one nearest to =)
+            ast, _, _, _, totalNodeCountChange = self._inverseAtEqual(
+                ast, (op['functionName'], op['id']), op['argumentIdx'], equalNode, totalNodeCount)
+            totalNodeCount += totalNodeCountChange
+        if ast[equalNode][0] != variableNode: # variable was already a side of =, put it on the left
+            ast = ast.set(equalNode, list(reversed(ast[equalNode])))
+        Equation.SOLVE_CACHE.put(cacheKey, (self._frozenRows(sourceAst), equalNode, self._frozenRows(ast)))
+        return ast
+
+    def _makeSubjectOfPolynomial(self, variable):
+        """
+        lhs - rhs is collected into a :class:`Polynomial` in one pass, the subtrees without variable are kept as
+        they are, in the coefficients. Each closed form root (see :meth:`Polynomial.roots`) is a solution
+
+        :param variable: appears 2 to MAX_POLYNOMIAL_DEGREE times
+        :type variable: str
+        :return: one AST for each root, that has variable as the subject of the formula, simplified
+        :rtype: list[:class:`PersistentMap`]
+        """
+        if self.variables[variable] > self.MAX_POLYNOMIAL_DEGREE:
+            raise Exception("Cannot handle")
+        equalNode = self.astIndex.root
+        lhs, rhs = self.ast[equalNode]
+        try:
+            polynomial = Polynomial.fromAst(self.ast, lhs, opaque=True) - Polynomial.fromAst(self.ast, rhs, opaque=True)
+            leadingCoefficient = polynomial.coefficients(variable).get(polynomial.degree(variable))
+            if leadingCoefficient is not None and all(coefficient < 0 for coefficient in leadingCoefficient.terms.values()):
+                polynomial = -polynomial # fewer -1 in the roots
+            rootTrees = polynomial.roots(variable)
+        except Exception: # not a polynomial in variable, or the degree is too high
+            raise Exception("Cannot handle")
+        return [Simplifier(EGraph.treeToAst((equalNode[0], ((variable, ()), rootTree)))).simplify()
+                for rootTree in rootTrees]
+
+    def _remapCachedSubjectAst(self, sourceAst, sourceRoot, subjectAst):
+        """
+        sourceAst was solved into subjectAst, and has the same structure as self.ast. Walks sourceAst and self.ast
+        together to pair up their ids, then renames the ids of subjectAst. Ids that are only in subjectAst (added by
+        the inversions) get new ids, after the largest id of self.ast.
+
+        :param sourceAst: the AST that was solved, rows as tuples
+        :type sourceAst: dict[tuple[str, int], tuple[tuple[str, int]]]
+        :param sourceRoot: the = of sourceAst
+        :type sourceRoot: tuple[str, int]
+        :param subjectAst: sourceAst solved for the variable, rows as tuples
+        :type subjectAst: dict[tuple[str, int], tuple[tuple[str, int]]]
+        :return: a new AST, subjectAst with the ids of self.ast, None if sourceAst does not have the same structure
+        as self.ast
+        :rtype: :class:`PersistentMap`
+        """
+        idMap = {}
+        stack = [(sourceRoot, self.astIndex.root)]
+        while len(stack) > 0:
+            sourceNode, node = stack.pop()
+            if sourceNode[0] != node[0]:
+                return None
+            idMap[sourceNode[1]] = node[1]
+            sourceChildren = sourceAst.get(sourceNode, ())
+            children = self.ast.get(node, ())
+            if len(sourceChildren) != len(children):
+                return None
+            stack += zip(sourceChildren, children)
+        if all(sourceId == nodeId for sourceId, nodeId in idMap.items()): # same ids, only the rows are copied
+            return PersistentMap.fromMapping(dict((node, list(children)) for node, children in subjectAst.items()))
+        nextId = max(idMap.values()) + 1
+        def remap(node):
+            nonlocal nextId
+            if node[1] not in idMap:
+                idMap[node[1]] = nextId
+                nextId += 1
+            return (node[0], idMap[node[1]])
+        remapped = {}
+        for node, children in subjectAst.items():
+            remapped[remap(node)] = [remap(child) for child in children]
+        return PersistentMap.fromMapping(remapped)
+
+    @classmethod
+    def _frozenRows(cls, ast):
+        """
+        :return: the rows of ast, as tuples, for Equation.SOLVE_CACHE, so no caller can change them
+        :rtype: dict[tuple[str, int], tuple[tuple[str, int]]]
+        """
+        return dict((node, tuple(children)) for node, children in ast.items())
+
+    @classmethod
+    def _solveCacheEntryBytes(cls, entry):
+        """
+        estimate of the memory held by a SOLVE_CACHE entry, rows shared between the two ASTs are counted twice
+        """
+        total = 0
+        for ast in (entry[0], entry[2]):
+            for node, children in ast.items():
+                total += sys.getsizeof(node) + sys.getsizeof(children) + sum(sys.getsizeof(child) for child in children)
+        return total
+
+    def makeSubjectAll(self, variables=None, processes=None):
+        """
+        make each of variables the subject of this equation, like :meth:`makeSubject` for each of them, but the paths
+        to all of them are walked in one traversal from the root (=), and the inversions of the functions that are
+        on more than one path (the upper part of the equation) are done only once, and shared.
+
+        ~SKETCH~
+        1. collect the node of each variable, and mark every ancestor of them (with self.astIndex)
+        2. DFS from the root, carrying the AST inverted so far. At a function node, each marked input is inverted
+        from the AST of the function (so the inversions above are shared by all inputs), and pushed
+        3. when a node is a variable, its AST is done
+
+        :param variables: variables to make into subjects, defaults to all the variables that appear only once
+        :type variables: list[str]
+        :param processes: if given, the variables are split by the input of the top function they are under, and
+        each group is solved in a pool of processes processes
+        :type processes: int
+        :return: mapping from variable to the AST that has variable as the subject of the formula
+        :rtype: dict[str, :class:`PersistentMap`]
+        """
+        equalNode = self.astIndex.root
+        if variables is None:
+            variables = [variable for variable, count in self.variables.items() if count == 1 and variable != equalNode[0]]
+        #error checking, same as makeSubject
+        for variable in variables:
+            if variable not in self.variables:
+                raise Exception("Variable Not Available")
+            if self.variables[variable] > 1:
+                raise Exception("Cannot handle")
+        #~~~~~~~~~~~~~STEP1
+        variables = set(variables)
+        variableNodes = {} # node to variable
+        for variable in variables:
+            for node in self.astIndex.nodesOf(variable):
+                if self.astIndex.kindOf(node) == 'variable': # leaves only
+                    variableNodes[node] = variable
+        if len(variableNodes) != len(variables):
+            raise Exception("No path to variable") # this shouldn't happen, most probably a parser error
+        if processes is not None:
+            return self._makeSubjectAllInProcesses(variableNodes, processes)
+        onPath = set(variableNodes.keys())
+        for variableNode in variableNodes.keys():
+            for ancestor in self.astIndex.ancestors(variableNode):
+                if ancestor in onPath: # the rest of the ancestors are already marked
+                    break
+                onPath.add(ancestor)
+        #~~~~~~~~~~~~~STEP2
+        Function.gatherStandardFunctions()
+        subjectAsts = {}
+        rootAst = PersistentMap.fromMapping(self.ast)
+        stack = [] # (ast inverted so far, totalNodeCount of that ast, node hanging from =)
+        for side in self.ast[equalNode]:
+            if side in onPath:
+                stack.append((rootAst, self.totalNodeCount, side))
+        while len(stack) > 0:
+            ast, totalNodeCount, current = stack.pop()
+            #~~~~~~~~~~~~~STEP3
+            if current in variableNodes:
+                if ast[equalNode][0] != current: # put it on the left
+                    ast = ast.set(equalNode, list(reversed(ast[equalNode])))
+                subjectAsts[variableNodes[current]] = ast
+                continue
+            for argumentIdx, child in enumerate(ast[current]):
+                if child not in onPath:
+                    continue
+                invertedAst, _, _, _, totalNodeCountChange = self._inverseAtEqual(ast, current, argumentIdx, equalNode,
+                                                                                 totalNodeCount)
+                stack.append((invertedAst, totalNodeCount + totalNodeCountChange, child))
+        return subjectAsts
+
+    def _makeSubjectAllInProcesses(self, variableNodes, processes):
+        """
+        splits variableNodes by the node under the top function of their path (or the side of =, if they are
+        directly under =), and runs :meth:`makeSubjectAll` for each group in a process pool. Within a group, the
+        inversions are still shared.
+
+        :param variableNodes: mapping from the node of each variable, to the variable
+        :type variableNodes: dict[tuple[str, int], str]
+        :param processes: maximum number of processes
+        :type processes: int
+        :return: mapping from variable to the AST that has variable as the subject of the formula
+        :rtype: dict[str, :class:`PersistentMap`]
+        """
+        groups = {}
+        for variableNode, variable in variableNodes.items():
+            path = self.astIndex.pathFromRoot(variableNode)
+            groupNode = path[2][0] if len(path) > 2 else path[1][0]
+            groups.setdefault(groupNode, []).append(variable)
+        compactAst = self.compactAst if self.compactAst is not None else CompactAst.fromAst(self.ast)
+        equationArguments = (compactAst, self.functions, self.variables, self.primitives, self.totalNodeCount)
+        subjectAsts = {}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_makeSubjectAllOfGroup, equationArguments, group) for group in groups.values()]
+            for future in futures:
+                subjectAsts.update(future.result())
+        return subjectAsts
+
+    def _inverseAtEqual(self, ast, functionNode, argumentIdx, equalNode, totalNodeCount):
+        """
+        inverts functionNode, which hangs from equalNode, so that its argumentIdx input is on the left of equalNode.
+        self is not changed, so many threads can solve the same equation at once.
+
+        :param ast: the AST to invert in
+        :type ast: :class:`PersistentMap`
+        :param functionNode: node of the function to invert
+        :type functionNode: tuple[str, int]
+        :param argumentIdx: the input of functionNode to make into the subject
+        :type argumentIdx: int
+        :param equalNode: node of the =
+        :type equalNode: tuple[str, int]
+        :param totalNodeCount: number of nodes of ast
+        :type totalNodeCount: int
+        :return: same as :meth:`Function.inverse`, without the replaced and the new rows
+        :rtype: tuple[:class:`PersistentMap`, dict[str, int], dict[str, int], int, int]
+        """
+        Function.gatherStandardFunctions()
+        if ast[equalNode][0] == functionNode: # reverses expect the function on the right of =
+            ast = ast.set(equalNode, list(reversed(ast[equalNode])))
+        functionClass = Function.FUNCNAME_CLASS[functionNode[0]]
+        (invertedAst, functionCountChange, variableCountChange, primitiveCountChange,
+         totalNodeCountChange, _, _) = functionClass(self).inverse(argumentIdx, [functionNode[1], equalNode[1]],
+                                                                   ast=ast, totalNodeCount=totalNodeCount)
+        return invertedAst, functionCountChange, variableCountChange, primitiveCountChange, totalNodeCountChange
+
+    def _singleSubject(self, variable):
+        """
+        :return: :meth:`makeSubject` of variable, if it has only one solution
+        :rtype: :class:`PersistentMap`
+        """
+        subjectAst = self.makeSubject(variable)
+        if isinstance(subjectAst, list):
+            raise Exception(f"{variable} has {len(subjectAst)} solutions, see makeSubject")
+        return subjectAst
+
+    def compile(self, variable, target='python'):
+        """
+        makes variable the subject, and compiles the other side into one Python function (see
+        :class:`EquationCompiler`), that takes all the other variables as parameters, in sorted order. Common
+        subexpressions are calculated once. The function is kept, so compiling again for the same variable is a
+        lookup, as long as self.ast was not replaced.
+
+        :param variable: the variable to solve for
+        :type variable: str
+        :param target: python (inputs are floats) or numpy (inputs can be NumPy arrays), see :class:`EquationCompiler`
+        :type target: str
+        :return: function that calculates variable, its attribute variables has the order of the parameters
+        :rtype: Callable[..., float]
+        """
+        compiled = self._compiled.get((variable, target))
+        if compiled is not None and compiled[0] is self.ast:
+            return compiled[1]
+        subjectAst = self._singleSubject(variable)
+        equalNode = self.astIndex.root
+        parameters = sorted(otherVariable for otherVariable in self.variables.keys()
+                            if otherVariable != variable and otherVariable != equalNode[0])
+        function = EquationCompiler.compileAst(subjectAst, equalNode, parameters, target=target)
+        self._compiled[(variable, target)] = (self.ast, function)
+        return function
+
+    def evaluate(self, bindings, variable=None, blockSize=None, threads=None):
+        """
+        calculates variable for every row of bindings at once, with NumPy. The equation is solved for variable and
+        compiled with NumPy ufuncs (see :meth:`compile`), then called once with the arrays, so there is one ufunc
+        call per function node, and no Python call per row.
+
+        If variable appears more than once, so that it cannot be made the subject, it is solved for numerically
+        instead (see :meth:`solveNumerically`), with the default bracketing, rows that did not converge are nan.
+
+        If blockSize or threads is given, the rows are calculated block by block instead, on a pool of threads, with
+        temporaries of blockSize rows that are reused for every block (see :class:`BlockedEvaluator`), so memory does
+        not grow with the number of function nodes, for huge inputs.
+
+        :param bindings: mapping from every other variable to its values, arrays (or scalars) that broadcast together
+        :type bindings: dict[str, numpy.ndarray]
+        :param variable: the variable to calculate, defaults to the only variable that is not in bindings
+        :type variable: str
+        :param blockSize: number of rows in a block, None for the default of :class:`BlockedEvaluator`
+        :type blockSize: int
+        :param threads: number of threads, None for the number of cores
+        :type threads: int
+        :return: the values of variable, with the broadcast shape of bindings
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+        variable = self._unboundVariable(bindings, variable)
+        if self.variables.get(variable, 0) > 1: # cannot be made the subject, see makeSubject
+            roots, converged = self.solveNumerically(variable, bindings)
+            return np.where(converged, roots, np.nan)
+        if blockSize is not None or threads is not None:
+            return self.blockedEvaluator(variable, blockSize=blockSize).evaluate(bindings, threads=threads)
+        function = self.compile(variable, target='numpy')
+        for parameter in function.variables:
+            if parameter not in bindings:
+                raise Exception(f"{parameter} not in bindings")
+        arrays = [np.asarray(bindings[parameter], dtype=np.float64) for parameter in function.variables]
+        result = np.asarray(function(*arrays), dtype=np.float64)
+        shape = np.broadcast_shapes(*(array.shape for array in arrays)) if len(arrays) > 0 else ()
+        if result.shape != shape: # the expression did not use some of the arrays
+            result = np.array(np.broadcast_to(result, shape))
+        return result
+
+    def blockedEvaluator(self, variable, blockSize=None):
+        """
+        makes variable the subject, and generates the block code for the other side (see :class:`BlockedEvaluator`).
+        Kept like :meth:`compile`, as long as self.ast was not replaced.
+
+        :param variable: the variable to solve for
+        :type variable: str
+        :param blockSize: number of rows in a block, None for the default of :class:`BlockedEvaluator`
+        :type blockSize: int
+        :return: evaluator of variable, its attribute variables are the other variables, in sorted order
+        :rtype: :class:`BlockedEvaluator`
+        """
+        compiled = self._compiled.get((variable, 'blocked', blockSize))
+        if compiled is not None and compiled[0] is self.ast:
+            return compiled[1]
+        subjectAst = self._singleSubject(variable)
+        equalNode = self.astIndex.root
+        parameters = sorted(otherVariable for otherVariable in self.variables.keys()
+                            if otherVariable != variable and otherVariable != equalNode[0])
+        evaluator = BlockedEvaluator(subjectAst, equalNode, parameters, blockSize=blockSize)
+        self._compiled[(variable, 'blocked', blockSize)] = (self.ast, evaluator)
+        return evaluator
+
+    def _unboundVariable(self, bindings, variable):
+        """
+        :return: variable, or if it is None, the only variable that is not in bindings
+        :rtype: str
+        """
+        if variable is not None:
+            return variable
+        equalNode = self.astIndex.root
+        unbound = [otherVariable for otherVariable in self.variables.keys()
+                   if otherVariable not in bindings and otherVariable != equalNode[0]]
+        if len(unbound) != 1:
+            raise Exception(f"Cannot tell which variable to evaluate, unbound variables: {unbound}")
+        return unbound[0]
+
+    def gradient(self, bindings, variable=None):
+        """
+        calculates variable, and its partial derivatives by every other variable, for every row of bindings, in one
+        pass, with forward-mode automatic differentiation (see :class:`DualEvaluator`), instead of finite differences
+
+        :param bindings: mapping from every other variable to its values, arrays (or scalars) that broadcast together
+        :type bindings: dict[str, numpy.ndarray]
+        :param variable: the variable to calculate, defaults to the only variable that is not in bindings
+        :type variable: str
+        :return: multiple returns
+            - the values of variable, with the broadcast shape of bindings
+            - mapping from every other variable to the partial derivative of variable by it, with the same shape
+        :rtype: tuple[numpy.ndarray, dict[str, numpy.ndarray]]
+        """
+        variable = self._unboundVariable(bindings, variable)
+        return self.dualEvaluator(variable).evaluate(bindings)
+
+    def dualEvaluator(self, variable):
+        """
+        makes variable the subject, and generates the code for the other side and its derivatives (see
+        :class:`DualEvaluator`). Kept like :meth:`compile`, as long as self.ast was not replaced.
+
+        :param variable: the variable to solve for
+        :type variable: str
+        :return: evaluator of variable, its attribute variables are the other variables, in sorted order
+        :rtype: :class:`DualEvaluator`
+        """
+        compiled = self._compiled.get((variable, 'dual'))
+        if compiled is not None and compiled[0] is self.ast:
+            return compiled[1]
+        subjectAst = self._singleSubject(variable)
+        equalNode = self.astIndex.root
+        parameters = sorted(otherVariable for otherVariable in self.variables.keys()
+                            if otherVariable != variable and otherVariable != equalNode[0])
+        evaluator = DualEvaluator(subjectAst, equalNode, parameters)
+        self._compiled[(variable, 'dual')] = (self.ast, evaluator)
+        return evaluator
+
+    def solveNumerically(self, variable, bindings, lower=None, upper=None, guess=None, tolerance=1e-12,
+                         maxIterations=100):
+        """
+        solves for variable numerically, for every row of bindings at once, with bracketing and safeguarded Newton
+        steps (see :class:`RootFinder`), for when variable cannot be made the subject (like in x = cos(x)). The
+        residual and its derivative are compiled once, and kept like :meth:`compile`.
+
+        :param variable: the variable to solve for
+        :type variable: str
+        :param bindings: mapping from every other variable to its values, arrays (or scalars) that broadcast together
+        :type bindings: dict[str, numpy.ndarray]
+        :param lower: lower end of the bracket of each row, found from guess if lower or upper is not given
+        :type lower: numpy.ndarray
+        :param upper: upper end of the bracket of each row
+        :type upper: numpy.ndarray
+        :param guess: where to start looking, defaults to 1
+        :type guess: numpy.ndarray
+        :param tolerance: relative tolerance of the root
+        :type tolerance: float
+        :param maxIterations: most steps
+        :type maxIterations: int
+        :return: multiple returns, with the broadcast shape of bindings
+            - the values of variable
+            - True where it converged
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        if variable not in self.variables:
+            raise Exception("Variable Not Available")
+        compiled = self._compiled.get((variable, 'root'))
+        if compiled is None or compiled[0] is not self.ast:
+            equalNode = self.astIndex.root
+            parameters = sorted(otherVariable for otherVariable in self.variables.keys()
+                                if otherVariable != variable and otherVariable != equalNode[0])
+            compiled = (self.ast, RootFinder(self.ast, equalNode, variable, parameters))
+            self._compiled[(variable, 'root')] = compiled
+        return compiled[1].solve(bindings, lower=lower, upper=upper, guess=guess, tolerance=tolerance,
+                                 maxIterations=maxIterations)
+
+    def simplify(self, ast=None, nodeBudget=None):
+        """
+        folds numeric subtrees and removes identities (like x*1, x+0), bottom-up, until nothing changes, see
+        :class:`Simplifier`. Useful after :meth:`makeSubject` and :meth:`Function.substitute`
+
+        :param ast: the ast to simplify, defaults to self.ast, which is not changed
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param nodeBudget: stop after looking at this many nodes, None for no limit
+        :type nodeBudget: int
+        :return: the simplified ast
+        :rtype: :class:`PersistentMap`
+        """
+        return Simplifier(self.ast if ast is None else ast, nodeBudget=nodeBudget).simplify()
+
+    def optimise(self, ast=None, cost='size', rules=None, iterationLimit=8, nodeLimit=10000, timeLimit=1.0):
+        """
+        finds a cheaper form of ast with equality saturation (see :class:`EGraph`), all the forms that rules reach
+        are kept in an e-graph at once, and the cheapest is extracted
+
+        :param ast: the ast to optimise, defaults to self.ast, which is not changed
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param cost: size (fewest nodes) or evaluation (cheapest to calculate), see :meth:`EGraph.nodeCost`
+        :type cost: str
+        :param rules: (lhs, rhs) patterns, see :class:`RewriteRule`, defaults to EGraph.ALGEBRAIC_RULES, the
+        IDENTITIES of the standard functions, and the CONDITIONAL_IDENTITIES of :class:`Simplifier`
+        :type rules: list[tuple[str, str]]
+        :param iterationLimit: most iterations of :meth:`EGraph.saturate`
+        :type iterationLimit: int
+        :param nodeLimit: most e-nodes
+        :type nodeLimit: int
+        :param timeLimit: seconds
+        :type timeLimit: float
+        :return: the cheapest ast found, ids are numbered again, breadth first
+        :rtype: :class:`PersistentMap`
+        """
+        ast = self.ast if ast is None else ast
+        rewriteRules = []
+        if rules is None:
+            rules = EGraph.ALGEBRAIC_RULES + Function.standardIdentities()
+            rewriteRules = [RewriteRule(lhs, rhs, condition=condition) for lhs, rhs, condition in Simplifier.conditionalIdentities()]
+        egraph = EGraph()
+        rootClassId = egraph.addAst(ast, self.astIndex.root)
+        egraph.saturate([RewriteRule(lhs, rhs) for lhs, rhs in rules] + rewriteRules, iterationLimit=iterationLimit,
+                        nodeLimit=nodeLimit, timeLimit=timeLimit)
+        _, tree = egraph.extract(rootClassId, cost=cost)
+        return EGraph.treeToAst(tree)
+
+    def expand(self, ast=None):
+        """
+        expands each side of the = and collects like terms, in the sparse form of :class:`Polynomial`, subtrees that
+        are not polynomial (like (sin a)) are kept as they are, like variables
+
+        :param ast: the ast to expand, defaults to self.ast, which is not changed
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :return: the expanded ast, ids are numbered again, breadth first
+        :rtype: :class:`PersistentMap`
+        """
+        ast = self.ast if ast is None else ast
+        equalNode = self.astIndex.root
+        sideTrees = tuple(Polynomial.fromAst(ast, side, opaque=True).toTree() for side in ast[equalNode])
+        return EGraph.treeToAst((equalNode[0], sideTrees))
+
+    def _findVariableNode(self, variable):
+        """
+        :param variable: label of the variable
+        :type variable: str
+        :return: the first node with label variable, None if there is no such node
+        :rtype: tuple[str, int]
+        """
+        for node in self.astIndex.nodesOf(variable): # O(matches), from the label index
+            if self.astIndex.kindOf(node) == 'variable':
+                return node
+        return None
 
 
     def toString(self, format):
@@ -124,32 +654,97 @@ class Equation:
         return Parser(format).unparse(self.ast)
 
 
+    @property
+    def astIndex(self):
+        """
+        parents, labels and kinds of the nodes of self.ast, built again only if self.ast was replaced, so methods that
+        read it never see the nodes of an older ast
+
+        :rtype: :class:`AstIndex`
+        """
+        ast, astIndex = self._astIndex # one attribute, like hashConsedAst
+        if ast is not self.ast:
+            ast = self.ast
+            astIndex = AstIndex(ast)
+            self._astIndex = (ast, astIndex)
+        return astIndex
+
+    def hashConsedAst(self):
+        """
+        hash-consed form of self.ast, made on the first call, and again only if self.ast was replaced
+
+        :return: DAG of self.ast where identical subtrees are one node, with structural hashes
+        :rtype: :class:`HashConsedAst`
+        """
+        ast, hashConsedAst = self._hashConsedAst # one attribute, so threads never see a mismatched pair
+        if hashConsedAst is None or ast is not self.ast:
+            ast = self.ast
+            hashConsedAst = HashConsedAst.fromAst(ast, self.astIndex.root)
+            self._hashConsedAst = (ast, hashConsedAst)
+        return hashConsedAst
+
+    def eulerTour(self):
+        """
+        preorder layout of self.ast, made on the first call, and laid out again (from the root of the current
+        self.astIndex) only if self.ast was replaced
+
+        :return: layout where every subtree is a contiguous slice, and ancestor tests are O(1)
+        :rtype: :class:`EulerTour`
+        """
+        ast, eulerTour = self._eulerTour # one attribute, like hashConsedAst
+        if eulerTour is None or ast is not self.ast:
+            ast = self.ast
+            eulerTour = EulerTour(ast, self.astIndex.root)
+            self._eulerTour = (ast, eulerTour)
+        return eulerTour
+
     def _findCommonFactorOfDistributivePath(self, distributivePath):
-        """TODO test
+        """
         current target usage for one-term factorisation
 
         ~SKETCH~
-        1. cut out the subAST of each termNode
-            a. convert to SchemeStr
-            b. Find ALL longestCommonSubStrings SL between this_SchemeStr and prev_SchemeStr
-                ~a. find possibleCommonFactors = set(this_SL).intersection(set(prev_SL))
-                    !a. if len(possibleCommonFactors) == 0, return [] # no common factor
-            c. for each possibleCommonFactorStr in possibleCommonFactors, cfAST = Schemeparser._unparse(possibleCommonFactor)
-                ~a. store cfAST in cfASTL
-        2. return cfSATL # list of common factors in AST format
-
-        :param distributivePath: list of nodes, where the names of all the nodes in distributivePath is distributiveOpStr (see _findAllDistributivePaths)
+        1. for each termNode, collect its factors, the inputs of termNode, and of the termNode[0] nodes directly
+        below it (so (* a (* b c)) has factors a, b, c)
+            a. each factor is replaced by the dagId of its subtree in self.hashConsedAst(), so identical factors in
+            different terms have the same dagId, O(1) per comparison
+            b. possibleCommonFactors = intersection of the dagIds of all the terms
+                ~a. if len(possibleCommonFactors) == 0, return [] # no common factor
+        2. for each possibleCommonFactor, cut the subAST of that factor from the first termNode
+        3. return cfASTL # list of common factors in AST format
+
+        :param distributivePath: list of nodes, where the names of all the nodes in distributivePath is baseOpStr (see _findAllDistributivePaths)
         :type distributivePath: list
+        :return: list of common factors in AST format, in the order they appear in the first termNode
+        :rtype: list[dict[tuple[str, int], list[tuple[str, int]]]]
         """
-        subAST = self._cutSubASTAtRoot(distributivePath[0])
-        subASTschemeStr = Schemeparser._unparse(ast=subAST) # TODO write test for _unparse
-        #TODO need to find ALL commonsubstrings....
-        possibleCommonFactors = set()
-        for nextIdx in range(1, len(distributivePath)):
-            subAST = self._cutSubASTAtRoot(termNode)
-            subASTschemeStr = Schemeparser._unparse(ast=subAST) # TODO write test for _unparse
-            #TODO need to find ALL commonsubstrings....
-
+        hashConsedAst = self.hashConsedAst()
+        possibleCommonFactors = None
+        firstTermFactors = None
+        for termNode in distributivePath:
+            factors = []
+            stack = [termNode]
+            while len(stack) > 0:
+                current = stack.pop()
+                for child in reversed(self.ast[current]):
+                    if child[0] == termNode[0] and child in self.ast: # same operation, flatten
+                        stack.append(child)
+                    else:
+                        factors.append(child)
+            factorDagIds = set(hashConsedAst.dagIdOf(factor) for factor in factors)
+            if possibleCommonFactors is None:
+                possibleCommonFactors = factorDagIds
+                firstTermFactors = factors
+            else:
+                possibleCommonFactors = possibleCommonFactors.intersection(factorDagIds)
+            if len(possibleCommonFactors) == 0:
+                return [] # no common factor
+        cfASTL = []
+        for factor in firstTermFactors:
+            dagId = hashConsedAst.dagIdOf(factor)
+            if dagId in possibleCommonFactors:
+                possibleCommonFactors.discard(dagId) # each common factor once
+                cfASTL.append(self._cutSubASTAtRoot(factor))
+        return cfASTL
 
 
     def _findAllDistributivePaths(self, distributiveOpStr, baseOpStr):
@@ -180,52 +775,52 @@ class Equation:
         :param baseOpStr: the name of the node to find factor
         :type baseOpStr: str
         """
-        distributionPaths = []
-        astCopy = copy.deepcopy(self.ast)
+        distributivePaths = []
+        astCopy = PersistentMap.fromMapping(self.ast) # deleting from it does not change self.ast
+        distributiveOpCandidates = [node for node in self.astIndex.nodesOf(distributiveOpStr)
+                                    if self.astIndex.kindOf(node) == 'function'] # must have children
+        distributiveOpCandidates.reverse() # popped from the end, so in the order of the index
         foundDistributiveOp = True # so that it goes through the first pass
         while foundDistributiveOp:
             #~~~~~~~~~~~~~STEP1
             foundDistributiveOp = False
-            #try to find a distributiveOp, must have children, so no need to look into values()
+            #try to find a distributiveOp, from the label index, the ones already in a distributivePath are not in astCopy
             distributiveOpNode = None
-            for branchNode in astCopy:
-                if branchNode[0] == distributiveOpStr:
+            while len(distributiveOpCandidates) > 0:
+                candidate = distributiveOpCandidates.pop()
+                if candidate in astCopy:
                     foundDistributiveOp = True
-                    distributiveOpNode = branchNode
+                    distributiveOpNode = candidate
                     break
             if distributiveOpNode is not None:
                 #~~~~~~~~~~~~~STEP2
-                #TODO refactor, this is similiar(PREDICATE:[if rootId in childenPos]: difference) algorithm as EnclosureTree.makeEnclosureTreeWithRoots
                 #go all the way to Rome(non-distributiveOpStr), then DFS down..., collect all the (non-distributiveOpNode)
+                #parents come from self.astIndex, so going up costs O(depth)
                 distributiveRoot = distributiveOpNode
-                checkAgain = True
-                while checkAgain: # keep going up
-                    checkAgain = False
-                    for parent, children in astCopy.items():
-                        if distributiveRoot in children and \
-                            parent[0] == distributiveOpStr: #extra PREDICATE different from EnclosureTree.makeEnclosureTreeWithRoots
-                            distributiveOpNode = parent
-                            checkAgain = True
-                            break # this is better than EnclosureTree.makeEnclosureTreeWithRoots (because tree so only 1 parent)
+                for ancestor in self.astIndex.ancestors(distributiveOpNode):
+                    if ancestor[0] != distributiveOpStr: #extra PREDICATE different from EnclosureTree.makeEnclosureTreeWithRoots
+                        break
+                    distributiveRoot = ancestor
                 #here we have root, DFS down
                 #~~~~~~~~~~~~~STEP3
                 terms = []
+                distributiveOpNodes = []
                 stack = [distributiveRoot]
                 while len(stack) > 0:
                     current = stack.pop()
+                    distributiveOpNodes.append(current)
                     children = astCopy[current]
                     for child in children:
                         if child[0] != distributiveOpStr:# a term, since childname!=distributiveOpStr #handle baseOp later
                             terms.append(child) # commutative
+                        else:
+                            stack.append(child)
 
                 #~~~~~~~~~~~~~STEP3a
                 distributivePaths.append(terms)
                 #~~~~~~~~~~~~~STEP3b
-                for node in terms:
-                    try:
-                        del astCopy[node]
-                    except:# will throw if node has no children
-                        pass
+                for node in distributiveOpNodes: # so that STEP1 does not find this distributivePath again
+                    astCopy = astCopy.delete(node)
 
         #~~~~~~~~~~~~~STEP~1
         newDistributivePaths = []
@@ -240,6 +835,8 @@ class Equation:
                     newDistributivePath = []
                 else:
                     newDistributivePath.append(termNode)
+            if len(newDistributivePath) > 1: # left-overs
+                newDistributivePaths.append(newDistributivePath)
 
         #~~~~~~~~~~~~~STEP~2
         return newDistributivePaths
@@ -258,28 +855,30 @@ class Equation:
         current target usage for one-term factorisation
 
         ~SKETCH~
-        Find the rootNode in self.ast, then DFS from there to get subAST
+        Find the rootNode in self.ast, then slice its subtree out of self.eulerTour, O(size of the subAST)
         
         TODO test
         """
 
-        if rootNode not in self.ast: # rootNode might be a leaf(variables/primitives)
-            if rootNode not in self.variables and rootNode not in self.primitives:
-                raise Exception(f'rootNode is not a valid node of AST')
-            else:
-                return {rootNode: []} # since rootNode is a leaf, TODO thats not the format that we agreed to
-        else: # rootNode is a non-leaf in self.ast, nous DFSons
-            subAST = {}
-            stack = [rootNode]
-            while len(stack) > 0:
-                current = stack.pop()
-                children = self.ast[current]
-                subAST[current] = children
-                stack += children
-            return subAST
+        kind = self.astIndex.kindOf(rootNode) # one lookup, instead of looking in self.ast, and in the parents
+        if kind is None:
+            raise Exception(f'rootNode is not a valid node of AST')
+        if kind != 'function': # rootNode is a leaf(variables/primitives)
+            return {rootNode: []} # since rootNode is a leaf, TODO thats not the format that we agreed to
+        else: # rootNode is a non-leaf in self.ast, its subtree is one slice of the layout, no DFS
+            return self.eulerTour().subAst(rootNode, self.ast)
+
 
 
 
+def _makeSubjectAllOfGroup(equationArguments, variables):
+    """
+    runs in a worker process of :meth:`Equation.makeSubjectAll`, the equation is sent over as its :class:`CompactAst`
+    arrays (with its counts, the arguments of :meth:`Equation.fromCompactAst`), so equations that were not parsed from
+    a string (like those of an :class:`EquationFile`) can be solved too
+    """
+    return Equation.fromCompactAst(*equationArguments).makeSubjectAll(variables)
+
 
 if __name__=='__main__':
     eq0 = Equation('(= a (+ b c))', 'scheme')
\ No newline at end of file
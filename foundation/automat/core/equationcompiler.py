@@ -0,0 +1,175 @@
+import builtins
+import keyword
+import math
+import re
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.core.hashconsedast import HashConsedAst
+
+
+class EquationCompiler:
+    """
+    Turns a solved Abstract Syntax Tree (ast for short), (= subject expression), into the source of one Python
+    function that calculates the expression, and compiles it. The code of each function node comes from
+    CALCULATION_CODE of its class in automat.arithmetic.standard, with v0, v1... replaced by its inputs.
+
+    The expression is hash-consed first (see :class:`HashConsedAst`), and each distinct subtree gets one local
+    variable, so common subexpressions are calculated once.
+
+    Targets:
+    - python : CALCULATION_CODE, the inputs are floats
+    - numpy : NUMPY_CODE, made of NumPy ufuncs, so the inputs can be arrays, and the whole array is calculated by
+    one call per function node. numpy is only imported when a function of this target is compiled
+    """
+    FUNCTION_NAME = 'evaluate'
+    RESERVED_NAMES = set(['num', FUNCTION_NAME]) | set(dir(builtins)) # like pow and float, used by the generated code
+    TARGETS = { # target to (name of the attribute of the function classes with the code, import lines)
+        'python':('CALCULATION_CODE', None), # None, use the CALCULATION_IMPORTS of the functions
+        'numpy':('NUMPY_CODE', ['import numpy']),
+    }
+
+    @classmethod
+    def compileAst(cls, ast, rootNode, variables, target='python'):
+        """
+        :param ast: the solved ast, the subject is input 0 of rootNode, and the expression is input 1
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: the = of ast
+        :type rootNode: tuple[str, int]
+        :param variables: the parameters of the compiled function, in order
+        :type variables: list[str]
+        :param target: one of TARGETS
+        :type target: str
+        :return: the compiled function, it also has the attributes source (the generated code) and variables
+        :rtype: Callable[..., float]
+        """
+        source = cls.generateSource(ast, rootNode, variables, target=target)
+        namespace = {}
+        exec(compile(source, f'<{cls.__name__}>', 'exec'), namespace)
+        function = namespace[cls.FUNCTION_NAME]
+        function.source = source
+        function.variables = list(variables)
+        return function
+
+    @classmethod
+    def generateSource(cls, ast, rootNode, variables, target='python'):
+        """
+        ~SKETCH~
+        1. hash-cons the expression, dagIds are in postorder, so inputs come before the functions that use them
+        2. for each dagId
+            a. a primitive is a float literal, a variable is its parameter
+            b. a function is the CALCULATION_CODE of its class, assigned to t<dagId>
+        3. return the local variable of the expression
+
+        :param ast: the solved ast, the subject is input 0 of rootNode, and the expression is input 1
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: the = of ast
+        :type rootNode: tuple[str, int]
+        :param variables: the parameters of the generated function, in order
+        :type variables: list[str]
+        :param target: one of TARGETS
+        :type target: str
+        :return: Python source, defining the function FUNCTION_NAME
+        :rtype: str
+        """
+        if target not in cls.TARGETS:
+            raise Exception(f'{target} is not a target, choose from {list(cls.TARGETS.keys())}')
+        codeAttribute, importLines = cls.TARGETS[target]
+        Function.gatherStandardFunctions()
+        expressionNode = ast[rootNode][1]
+        hashConsedAst = HashConsedAst.fromAst(ast, expressionNode)
+        if importLines is None: # only for the functions in the expression
+            importLines = []
+            for dagId in range(len(hashConsedAst)):
+                functionClass = Function.FUNCNAME_CLASS.get(hashConsedAst.labels[dagId])
+                if len(hashConsedAst.children[dagId]) == 0 or functionClass is None:
+                    continue
+                for importLine in functionClass.CALCULATION_IMPORTS:
+                    if importLine not in importLines:
+                        importLines.append(importLine)
+        usedNames = set() # names the generated code uses, that a parameter must not shadow
+        for importLine in importLines: # from x import a, b or import a
+            usedNames.update(name.strip() for name in importLine.split('import ')[1].split(','))
+        for dagId in range(len(hashConsedAst)):
+            functionClass = Function.FUNCNAME_CLASS.get(hashConsedAst.labels[dagId])
+            if len(hashConsedAst.children[dagId]) > 0 and functionClass is not None:
+                for codeLine in getattr(functionClass, codeAttribute):
+                    usedNames.update(re.findall(r'[A-Za-z_]\w*', codeLine))
+        parameterNames = {}
+        for idx, variable in enumerate(variables):
+            parameterNames[variable] = cls._parameterName(variable, idx, usedNames)
+        #~~~~~~~~~~~~~STEP2
+        bodyLines = []
+        expressions = [] # dagId to the python expression of it
+        for dagId in range(len(hashConsedAst)):
+            label = hashConsedAst.labels[dagId]
+            children = hashConsedAst.children[dagId]
+            if len(children) == 0:
+                expressions.append(cls.leafCode(label, parameterNames))
+                continue
+            functionClass = Function.FUNCNAME_CLASS.get(label)
+            if functionClass is None:
+                raise Exception(f'{label} is not a standard function, cannot compile')
+            localName = f't{dagId}'
+            for codeLine in getattr(functionClass, codeAttribute):
+                bodyLines.append(f'    {cls.fillCode(codeLine, [expressions[childDagId] for childDagId in children], localName)}')
+            expressions.append(localName)
+        #~~~~~~~~~~~~~STEP3
+        bodyLines.append(f'    return {expressions[hashConsedAst.dagIdOf(expressionNode)]}')
+        signature = ', '.join(parameterNames[variable] for variable in variables)
+        return '\n'.join(importLines + [f'def {cls.FUNCTION_NAME}({signature}):'] + bodyLines) + '\n'
+
+    @classmethod
+    def leafCode(cls, label, parameterNames):
+        """
+        the Python expression of a leaf, for the code generators (also :class:`BlockedEvaluator` and
+        :class:`DualEvaluator`), a float literal for a primitive, its parameter for a variable
+
+        :param label: label of the leaf
+        :type label: str
+        :param parameterNames: variable to its Python expression in the generated code
+        :type parameterNames: dict[str, str]
+        :rtype: str
+        """
+        if Booler.isNum(label):
+            return cls._floatLiteral(float(label))
+        if label in parameterNames:
+            return parameterNames[label]
+        raise Exception(f'{label} is not a parameter')
+
+    @classmethod
+    def fillCode(cls, codeLine, inputCodes, localName=None):
+        """
+        :param codeLine: a line of CALCULATION_CODE, NUMPY_CODE or NUMPY_DERIVATIVE_CODE, of the inputs v0, v1...
+        :type codeLine: str
+        :param inputCodes: the Python expression of each input
+        :type inputCodes: list[str]
+        :param localName: replaces num, the value of the function, None to keep num
+        :type localName: str
+        :return: codeLine with v0, v1... replaced by inputCodes
+        :rtype: str
+        """
+        codeLine = re.sub(r'\bv(\d+)\b', lambda match: inputCodes[int(match.group(1))], codeLine)
+        if localName is not None:
+            codeLine = re.sub(r'\bnum\b', localName, codeLine)
+        return codeLine
+
+    @classmethod
+    def _parameterName(cls, variable, idx, usedNames):
+        """
+        the variable itself, if it can be a Python parameter that does not shadow anything in the generated code,
+        else p<idx>
+        """
+        if variable.isidentifier() and not keyword.iskeyword(variable) and variable not in cls.RESERVED_NAMES and \
+           variable not in usedNames and re.fullmatch(r'[tp]\d+', variable) is None:
+            return variable
+        return f'p{idx}'
+
+    @classmethod
+    def _floatLiteral(cls, value):
+        """
+        repr of value, except inf and nan (like a primitive too long for a float), whose repr is not Python code
+        """
+        if math.isfinite(value):
+            return repr(value)
+        return f"float('{value!r}')"
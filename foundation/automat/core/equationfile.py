@@ -0,0 +1,211 @@
+from array import array
+from collections.abc import Sequence
+import mmap
+import struct
+import sys
+
+from foundation.automat.core.compactast import CompactAst
+
+
+class EquationFile(Sequence):
+    """
+    Binary file of parsed equations, so that a large corpus is parsed once, and loaded again without the parser.
+    The file is memory-mapped, opening it only reads the header, and each equation is made when it is indexed, with
+    the arrays of its :class:`CompactAst` pointing into the mapped file (no copy, pages are read on first use).
+
+    ~LAYOUT~ (little-endian, each record starts at a multiple of 8, so its int32 arrays are aligned)
+    header : MAGIC, VERSION (uint32), 0 (uint32, reserved), number of equations (uint64), offset of the index (uint64)
+    records, one per equation :
+        RECORD_HEADER : nodeCount, childIndexCount, labelCount, labelBytes, functionCount, variableCount,
+            primitives, totalNodeCount, equationStrBytes, parserNameBytes
+        int32 arrays : labelIds[nodeCount], ids[nodeCount], childOffsets[nodeCount+1], childIndices[childIndexCount],
+            labelEnds[labelCount] (end of each label in the label bytes), (labelId, count)[functionCount],
+            (labelId, count)[variableCount]
+        int8 array : kinds[nodeCount]
+        utf-8 : label bytes, equationStr, parserName
+    index : uint64 offset of each record
+
+    Use :meth:`write` to make a file, and EquationFile(path)[idx] to read the equation idx.
+
+    :param path: path of the file to read
+    :type path: str
+    """
+    MAGIC = b'AUTOMAT\x00'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIIQQ')
+    RECORD_HEADER = struct.Struct('<10I')
+    ALIGNMENT = 8
+
+    def __init__(self, path):
+        """
+        maps the file, and reads the header. Also the constructor
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count, indexOffset = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise Exception(f'{path} is not an equation file')
+        if version != self.VERSION:
+            raise Exception(f'{path} has version {version}, can only read version {self.VERSION}')
+        self._offsets = memoryview(self._mmap)[indexOffset:indexOffset+8*self._count].cast('Q') \
+            if sys.byteorder == 'little' else array('Q', self._mmap[indexOffset:indexOffset+8*self._count])
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+
+    @classmethod
+    def write(cls, path, equations):
+        """
+        writes equations to path, one record at a time, so equations can be a generator
+
+        :param path: path of the file to write
+        :type path: str
+        :param equations: the equations to write
+        :type equations: Iterable[:class:`Equation`]
+        :return: number of equations written
+        :rtype: int
+        """
+        offsets = array('Q')
+        with open(path, 'wb') as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, 0, 0))
+            for equation in equations:
+                offsets.append(file.tell())
+                file.write(cls._packEquation(equation))
+            indexOffset = file.tell()
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            file.write(offsets.tobytes())
+            file.seek(0)
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(offsets), indexOffset))
+        return len(offsets)
+
+    @classmethod
+    def _packEquation(cls, equation):
+        """
+        :return: the record of equation, padded to ALIGNMENT
+        :rtype: bytes
+        """
+        compactAst = equation.compactAst
+        if compactAst is None:
+            compactAst = CompactAst.fromAst(equation.ast, equation.astIndex.root)
+        labels = [str(label) for label in compactAst.labels]
+        labelToLabelId = dict((label, labelId) for labelId, label in enumerate(labels))
+        countEntries = []
+        for counts in (equation.functions, equation.variables):
+            entries = array('i')
+            for label, count in counts.items():
+                if str(label) not in labelToLabelId: # counted, but not in the tree
+                    labelToLabelId[str(label)] = len(labels)
+                    labels.append(str(label))
+                entries.extend((labelToLabelId[str(label)], count))
+            countEntries.append(entries)
+        labelBytes = b''
+        labelEnds = array('i')
+        for label in labels:
+            labelBytes += label.encode('utf-8')
+            labelEnds.append(len(labelBytes))
+        equationStrBytes = (equation._eqs or '').encode('utf-8')
+        parserNameBytes = (equation._parserName or '').encode('utf-8')
+        int32Arrays = [array('i', compactAst.labelIds), array('i', compactAst.ids), array('i', compactAst.childOffsets),
+                       array('i', compactAst.childIndices), labelEnds] + countEntries
+        if sys.byteorder != 'little':
+            for int32Array in int32Arrays:
+                int32Array.byteswap()
+        record = cls.RECORD_HEADER.pack(
+            len(compactAst), len(compactAst.childIndices), len(labels), len(labelBytes),
+            len(countEntries[0]) // 2, len(countEntries[1]) // 2, equation.primitives, equation.totalNodeCount,
+            len(equationStrBytes), len(parserNameBytes))
+        record += b''.join(int32Array.tobytes() for int32Array in int32Arrays)
+        record += array('b', compactAst.kinds).tobytes() + labelBytes + equationStrBytes + parserNameBytes
+        return record + bytes(-len(record) % cls.ALIGNMENT)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        """
+        :return: equation idx, its ast is a view of the arrays in the file (see :meth:`Equation.fromCompactAst`)
+        :rtype: :class:`Equation`
+        """
+        from foundation.automat.core.equation import Equation # equation imports this module
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._count))]
+        compactAst, functions, variables, primitives, totalNodeCount, equationStr, parserName = self._readRecord(idx)
+        return Equation.fromCompactAst(compactAst, functions, variables, primitives, totalNodeCount,
+                                       equationStr=equationStr, parserName=parserName)
+
+    def compactAst(self, idx):
+        """
+        :return: only the ast of equation idx
+        :rtype: :class:`CompactAst`
+        """
+        return self._readRecord(idx)[0]
+
+    def _readRecord(self, idx):
+        """
+        ~SKETCH~
+        1. read the record header
+        2. cut the int32 arrays out of the mapped file, without copying (copied and byteswapped on big-endian)
+        3. decode the labels and the strings, and put back the counts
+
+        :return: compactAst, functions, variables, primitives, totalNodeCount, equationStr, parserName
+        :rtype: tuple
+        """
+        if idx < 0:
+            idx += self._count
+        if idx < 0 or idx >= self._count:
+            raise IndexError(idx)
+        offset = self._offsets[idx]
+        (nodeCount, childIndexCount, labelCount, labelBytesLength, functionCount, variableCount, primitives,
+         totalNodeCount, equationStrLength, parserNameLength) = self.RECORD_HEADER.unpack_from(self._mmap, offset)
+        offset += self.RECORD_HEADER.size
+        #~~~~~~~~~~~~~STEP2
+        int32Arrays = []
+        for length in (nodeCount, nodeCount, nodeCount+1, childIndexCount, labelCount, 2*functionCount, 2*variableCount):
+            int32Arrays.append(self._int32Array(offset, length))
+            offset += 4 * length
+        labelIds, ids, childOffsets, childIndices, labelEnds, functionEntries, variableEntries = int32Arrays
+        kinds = memoryview(self._mmap)[offset:offset+nodeCount].cast('b')
+        offset += nodeCount
+        #~~~~~~~~~~~~~STEP3
+        labelBytes = self._mmap[offset:offset+labelBytesLength]
+        offset += labelBytesLength
+        labels = []
+        labelStart = 0
+        for labelEnd in labelEnds:
+            labels.append(labelBytes[labelStart:labelEnd].decode('utf-8'))
+            labelStart = labelEnd
+        equationStr = self._mmap[offset:offset+equationStrLength].decode('utf-8')
+        offset += equationStrLength
+        parserName = self._mmap[offset:offset+parserNameLength].decode('utf-8')
+        functions = dict((labels[functionEntries[i]], functionEntries[i+1]) for i in range(0, len(functionEntries), 2))
+        variables = dict((labels[variableEntries[i]], variableEntries[i+1]) for i in range(0, len(variableEntries), 2))
+        treeLabels = labels[:max(labelIds, default=-1)+1] # without the labels that are only counted
+        compactAst = CompactAst(treeLabels, labelIds, kinds, ids, childOffsets, childIndices)
+        return (compactAst, functions, variables, primitives, totalNodeCount,
+                equationStr or None, parserName or None)
+
+    def _int32Array(self, offset, length):
+        if sys.byteorder == 'little':
+            return memoryview(self._mmap)[offset:offset+4*length].cast('i')
+        int32Array = array('i', self._mmap[offset:offset+4*length])
+        int32Array.byteswap()
+        return int32Array
+
+    def close(self):
+        """
+        unmaps the file, if no equation read from it is still in use, else it is unmapped when they are all gone
+        """
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        try:
+            self._mmap.close()
+        except BufferError: # arrays of equations that are still in use point into it
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
@@ -0,0 +1,138 @@
+from foundation.automat.common.traversal import Traversal
+
+
+class EulerTour:
+    """
+    Preorder layout of an Abstract Syntax Tree (ast for short), every node has an enter number (its position in the
+    preorder) and an exit number (one past the position of its last descendant). The subtree of a node is then the
+    contiguous slice order[enter:exit], so it is extracted, or hashed, in O(size of the subtree), without a DFS, and
+    a is an ancestor of b exactly when enter[a] < enter[b] < exit[a], an O(1) comparison.
+
+    A caller that keeps a layout while it replaces rows of the ast can update it with :meth:`replaceRows`, only the
+    smallest subtree that has all the replaced rows is laid out again, the nodes after it are shifted.
+    :meth:`Equation.eulerTour` does not, it lays out the whole ast again when the ast is replaced.
+
+    :param ast: the ast to lay out
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    :param rootNode: the root of ast
+    :type rootNode: tuple[str, int]
+    """
+    def __init__(self, ast, rootNode):
+        """
+        lays out the whole ast. Also the constructor.
+        """
+        self.root = rootNode
+        self.order = [] # nodes in preorder
+        self.enter = {} # node to its position in order
+        self.exit = {} # node to one past the position of its last descendant in order
+        self.parent = {} # node to parent node, root is not in here
+        self.order = self._layout(ast, rootNode, 0)
+
+    def _layout(self, ast, rootNode, offset):
+        """
+        lays out the subtree of rootNode, as if it started at offset in order, fills enter, exit and parent
+
+        :return: the nodes of the subtree in preorder
+        :rtype: list[tuple[str, int]]
+        """
+        nodes = []
+        openNodes = [] # the nodes whose subtree is not done yet, from rootNode down
+        for node, parentNode, _ in Traversal.preorder(ast, rootNode):
+            while len(openNodes) > 0 and openNodes[-1] != parentNode: # the subtree of openNodes[-1] is done
+                self.exit[openNodes.pop()] = offset + len(nodes)
+            self.enter[node] = offset + len(nodes)
+            if parentNode is not None:
+                self.parent[node] = parentNode
+            nodes.append(node)
+            openNodes.append(node)
+        for node in openNodes:
+            self.exit[node] = offset + len(nodes)
+        return nodes
+
+    def replaceRows(self, oldRows, newRows, ast):
+        """
+        update the layout after the rows oldRows of ast were replaced by newRows, costs O(size of the smallest subtree
+        that has all of them) to lay them out again, and O(number of nodes after it) plain shifts
+
+        :param oldRows: rows that were removed from the ast
+        :type oldRows: dict[tuple[str, int], list[tuple[str, int]]]
+        :param newRows: rows that were added to the ast
+        :type newRows: dict[tuple[str, int], list[tuple[str, int]]]
+        :param ast: the ast, after the rows were replaced
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        """
+        changedNodes = [node for rows in (oldRows, newRows) for node in rows.keys() if node in self.enter]
+        if len(changedNodes) == 0: # only rows of nodes that are not in the layout, like new leaves
+            return
+        start = min(self.enter[node] for node in changedNodes)
+        end = max(self.exit[node] for node in changedNodes)
+        regionRoot = self.order[start]
+        while self.exit[regionRoot] < end: # up to the smallest subtree that has all the changed nodes
+            regionRoot = self.parent[regionRoot]
+        if regionRoot == self.root:
+            self.__init__(ast, self.root)
+            return
+        start, end = self.enter[regionRoot], self.exit[regionRoot]
+        parentNode = self.parent[regionRoot]
+        for node in self.order[start:end]:
+            del self.enter[node]
+            del self.exit[node]
+            self.parent.pop(node, None)
+        regionNodes = self._layout(ast, regionRoot, start)
+        self.parent[regionRoot] = parentNode
+        self.order[start:end] = regionNodes
+        shift = len(regionNodes) - (end - start)
+        if shift != 0:
+            for node in self.order[start+len(regionNodes):]:
+                self.enter[node] += shift
+                self.exit[node] += shift
+            for ancestor in self.ancestors(regionRoot):
+                self.exit[ancestor] += shift
+
+    def ancestors(self, node):
+        """
+        :return: generator of the ancestors of node, parent first, root last
+        :rtype: generator[tuple[str, int]]
+        """
+        current = self.parent.get(node)
+        while current is not None:
+            yield current
+            current = self.parent.get(current)
+
+    def isAncestor(self, ancestor, node):
+        """
+        :return: True if ancestor is a proper ancestor of node, O(1)
+        :rtype: bool
+        """
+        return self.enter[ancestor] < self.enter[node] < self.exit[ancestor]
+
+    def subtreeSize(self, node):
+        """
+        :return: number of nodes in the subtree of node, node included
+        :rtype: int
+        """
+        return self.exit[node] - self.enter[node]
+
+    def subtreeNodes(self, node):
+        """
+        :return: the nodes of the subtree of node, in preorder, O(size of the subtree)
+        :rtype: list[tuple[str, int]]
+        """
+        return self.order[self.enter[node]:self.exit[node]]
+
+    def subAst(self, node, ast):
+        """
+        :return: the rows of ast under node (node included), leaves are not keys, O(size of the subtree)
+        :rtype: dict[tuple[str, int], list[tuple[str, int]]]
+        """
+        return dict((current, ast[current]) for current in self.subtreeNodes(node) if current in ast)
+
+    def structureOf(self, node, ast):
+        """
+        the labels and the number of children of the subtree of node, in preorder, which determines the subtree,
+        without the ids, so two subtrees have the same structure exactly when they are identical
+
+        :return: tuple of (label, number of children), hashable, O(size of the subtree)
+        :rtype: tuple[tuple[str, int]]
+        """
+        return tuple((current[0], len(ast.get(current, ()))) for current in self.subtreeNodes(node))
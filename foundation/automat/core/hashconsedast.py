@@ -0,0 +1,129 @@
+from hashlib import blake2b
+
+from foundation.automat.common.traversal import Traversal
+
+
+class HashConsedAst:
+    """
+    Hash-consed form of the Abstract Syntax Tree (ast for short), a DAG where identical subtrees are one shared node.
+    Each DAG node has a structural (Merkle) hash, made from its label and the hashes of its children, in argument
+    order. So two subtrees of the ast are the same, exactly when they map to the same DAG node, and checking that is
+    a lookup, instead of unparsing both subtrees and comparing strings.
+
+    - labels : labels[dagId] is the label of DAG node dagId
+    - children : children[dagId] is a tuple of the dagIds of its children
+    - hashes : hashes[dagId] is the structural hash of DAG node dagId
+    - sizes : sizes[dagId] is the number of ast nodes in the subtree of DAG node dagId
+    - nodeToDagId : ast node to its DAG node
+
+    Hashes are blake2b digests, so they are the same in every process (unlike hash() of str), and can be used as keys
+    across processes.
+
+    :param labels: label of each DAG node
+    :type labels: list[str]
+    :param children: children of each DAG node
+    :type children: list[tuple[int]]
+    :param hashes: structural hash of each DAG node
+    :type hashes: list[int]
+    :param sizes: subtree size of each DAG node
+    :type sizes: list[int]
+    :param nodeToDagId: ast node to dagId
+    :type nodeToDagId: dict[tuple[str, int], int]
+    :param rootNode: root of the ast
+    :type rootNode: tuple[str, int]
+    """
+    DIGEST_SIZE = 8 # bytes
+
+    def __init__(self, labels, children, hashes, sizes, nodeToDagId, rootNode):
+        """
+        Just getters and setter. Also the constructor. Use :meth:`fromAst` to build from the dictionary form
+        """
+        self.labels = labels
+        self.children = children
+        self.hashes = hashes
+        self.sizes = sizes
+        self.nodeToDagId = nodeToDagId
+        self.rootNode = rootNode
+
+    @classmethod
+    def fromAst(cls, ast, rootNode):
+        """
+        hash-conses ast, with one postorder walk from rootNode, O(number of nodes)
+
+        :param ast: the dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param rootNode: where to start
+        :type rootNode: tuple[str, int]
+        :return: the hash-consed form of ast
+        :rtype: :class:`HashConsedAst`
+        """
+        labels = []
+        children = []
+        hashes = []
+        sizes = []
+        uniqueTable = {} # (label, tuple of children dagIds) to dagId
+        nodeToDagId = {}
+        for current, _, _ in Traversal.postorder(ast, rootNode):
+            currentChildren = ast.get(current, ())
+            label = str(current[0])
+            childDagIds = tuple(nodeToDagId[child] for child in currentChildren)
+            key = (label, childDagIds)
+            dagId = uniqueTable.get(key)
+            if dagId is None: # first time this subtree is seen
+                dagId = len(labels)
+                uniqueTable[key] = dagId
+                labels.append(label)
+                children.append(childDagIds)
+                hashes.append(cls._merkleHash(label, [hashes[childDagId] for childDagId in childDagIds]))
+                sizes.append(1 + sum(sizes[childDagId] for childDagId in childDagIds))
+            nodeToDagId[current] = dagId
+        return cls(labels, children, hashes, sizes, nodeToDagId, rootNode)
+
+    @classmethod
+    def _merkleHash(cls, label, childHashes):
+        digest = blake2b(digest_size=cls.DIGEST_SIZE)
+        digest.update(label.encode('utf-8'))
+        digest.update(len(childHashes).to_bytes(4, 'little')) # so that (f (g x)) and (f g x) differ
+        for childHash in childHashes:
+            digest.update(childHash.to_bytes(cls.DIGEST_SIZE, 'little'))
+        return int.from_bytes(digest.digest(), 'little')
+
+    def __len__(self):
+        """
+        :return: number of DAG nodes, that is the number of distinct subtrees
+        :rtype: int
+        """
+        return len(self.labels)
+
+    def dagIdOf(self, node):
+        return self.nodeToDagId[node]
+
+    def hashOf(self, node):
+        """
+        :param node: node of the ast
+        :type node: tuple[str, int]
+        :return: structural hash of the subtree of node
+        :rtype: int
+        """
+        return self.hashes[self.nodeToDagId[node]]
+
+    def sameSubtree(self, node0, node1):
+        """
+        :return: True if the subtrees of node0 and node1 are identical, O(1)
+        :rtype: bool
+        """
+        return self.nodeToDagId[node0] == self.nodeToDagId[node1]
+
+    def commonSubexpressions(self, minSize=2):
+        """
+        :param minSize: only return subtrees with at least minSize nodes, so leaves are left out by default
+        :type minSize: int
+        :return: mapping from dagId to the ast nodes that have that subtree, only for subtrees that appear more than
+        once
+        :rtype: dict[int, list[tuple[str, int]]]
+        """
+        dagIdToNodes = {}
+        for node, dagId in self.nodeToDagId.items():
+            if self.sizes[dagId] >= minSize:
+                dagIdToNodes.setdefault(dagId, []).append(node)
+        return dict((dagId, nodes) for dagId, nodes in dagIdToNodes.items() if len(nodes) > 1)
@@ -0,0 +1,447 @@
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.traversal import Traversal
+from foundation.automat.core.rewriteengine import RewriteRule
+from foundation.automat.core.simplifier import Simplifier
+
+
+class Polynomial:
+    """
+    Sparse multivariate polynomial, a mapping from the exponents of a monomial (one for each of variables, in order)
+    to its coefficient. Expanding, collecting like terms and multiplying are done here, on the terms, instead of
+    rewriting the Abstract Syntax Tree (ast for short) node by node. Zero coefficients are never kept, so two
+    polynomials are equal exactly when their terms are.
+
+    Products of two univariate polynomials in the same variable, that are dense (at least DENSE_RATIO of their
+    coefficients up to the degree are not zero) and of degree DENSE_DEGREE or more, are done with numpy.convolve.
+
+    Atoms are subtrees that are not polynomial (like (sin a)), kept as variables named by their Scheme string, when
+    made with :meth:`fromAst` with opaque=True, so that a polynomial in x can have coefficients like sin(a).
+
+    :param variables: names of the variables, in the order of the exponents
+    :type variables: tuple[str]
+    :param terms: mapping from exponents to coefficient
+    :type terms: dict[tuple[int], float]
+    :param atoms: mapping from the name of a variable that is an atom, to its subtree, nested (label, tuple of children)
+    :type atoms: dict[str, tuple[str, tuple]]
+    """
+    DENSE_RATIO = 0.5
+    DENSE_DEGREE = 32
+    MAX_POWER = 64 # largest exponent that fromAst expands
+    #closed forms of the roots, see roots, patterns with $0, $1... as the inputs
+    LINEAR_ROOT = '(/ (* -1 $1) $0)' # a, b of ax+b
+    QUADRATIC_ROOT = '(/ (+ (* -1 $1) (* $3 (nroot 2 (- (^ $1 2) (* 4 (* $0 $2)))))) (* 2 $0))' # a, b, c, sign
+    PURE_CUBIC_ROOT = '(nroot 3 (/ (* -1 $1) $0))' # a, d of ax^3+d, only the real root
+    BIQUADRATIC_ROOT = '(* $3 (nroot 2 (/ (+ (* -1 $1) (* $4 (nroot 2 (- (^ $1 2) (* 4 (* $0 $2)))))) (* 2 $0))))' # a, c, e of ax^4+cx^2+e, s1, s2
+    ROOT_TOLERANCE = 1e-12 # relative, a discriminant this close to 0 is 0, for repeated roots
+    POLISH_STEPS = 2 # Newton steps on each numeric cubic and quartic root
+
+    def __init__(self, variables=(), terms=None, atoms=None):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        self.variables = tuple(variables)
+        self.terms = dict((exponents, coefficient) for exponents, coefficient in (terms or {}).items() if coefficient != 0)
+        self.atoms = dict(atoms or {})
+
+    @classmethod
+    def constant(cls, value):
+        return cls((), {():value})
+
+    @classmethod
+    def variable(cls, name, atom=None):
+        """
+        :param atom: the subtree, if name is an atom
+        :type atom: tuple[str, tuple]
+        """
+        return cls((name,), {(1,):1}, atoms={} if atom is None else {name:atom})
+
+    @classmethod
+    def fromAst(cls, ast, node, opaque=False):
+        """
+        the polynomial of the subtree of node, made bottom-up (see :meth:`Traversal.foldUp`), with +, -, *, / by a
+        number, and ^ to a whole number from 0 to MAX_POWER
+
+        :param ast: dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param node: root of the subtree
+        :type node: tuple[str, int]
+        :param opaque: subtrees that are not polynomial become atoms, instead of raising
+        :type opaque: bool
+        :return: the expanded polynomial
+        :rtype: :class:`Polynomial`
+        """
+        def leafValue(leaf):
+            label = str(leaf[0])
+            tree = (label, ())
+            if Booler.isNum(label):
+                return cls.constant(float(label)), tree
+            return cls.variable(label), tree
+        def nodeValue(current, childValues):
+            label = str(current[0])
+            tree = (label, tuple(childTree for _, childTree in childValues))
+            polynomial = None
+            if None not in (childPolynomial for childPolynomial, _ in childValues):
+                polynomial = cls._combine(label, [childPolynomial for childPolynomial, _ in childValues])
+            if polynomial is None:
+                if not opaque:
+                    raise Exception(f'{current} is not a polynomial')
+                polynomial = cls.variable(cls.treeToScheme(tree), atom=tree)
+            return polynomial, tree
+        return Traversal.foldUp(ast, node, leafValue, nodeValue)[0]
+
+    @classmethod
+    def _combine(cls, label, inputs):
+        """
+        :return: label applied to the polynomials inputs, None if that is not a polynomial
+        :rtype: :class:`Polynomial`
+        """
+        if len(inputs) != 2:
+            return None
+        left, right = inputs
+        if label == '+':
+            return left + right
+        if label == '-':
+            return left - right
+        if label == '*':
+            return left * right
+        if label == '/' and right.isConstant() and right.constantValue() != 0:
+            return left * (1 / right.constantValue())
+        if label == '^' and right.isConstant():
+            exponent = right.constantValue()
+            if float(exponent).is_integer() and 0 <= exponent <= cls.MAX_POWER:
+                return left ** int(exponent)
+        return None
+
+    @classmethod
+    def treeToScheme(cls, tree):
+        """
+        :param tree: nested (label, tuple of children)
+        :type tree: tuple[str, tuple]
+        :rtype: str
+        """
+        return Traversal.foldUp(None, tree, lambda leaf: leaf[0],
+                                lambda current, argumentStrs: f"({current[0]} {' '.join(argumentStrs)})",
+                                childrenOf=lambda current: current[1])
+
+    def _aligned(self, other):
+        """
+        :return: the union of the variables, and the terms of self and other, with exponents for all of them
+        :rtype: tuple[tuple[str], dict[tuple[int], float], dict[tuple[int], float]]
+        """
+        if self.variables == other.variables:
+            return self.variables, self.terms, other.terms
+        variables = tuple(sorted(set(self.variables) | set(other.variables)))
+        alignedTerms = []
+        for polynomial in (self, other):
+            positions = [variables.index(variable) for variable in polynomial.variables]
+            terms = {}
+            for exponents, coefficient in polynomial.terms.items():
+                alignedExponents = [0] * len(variables)
+                for position, exponent in zip(positions, exponents):
+                    alignedExponents[position] = exponent
+                terms[tuple(alignedExponents)] = coefficient
+            alignedTerms.append(terms)
+        return variables, alignedTerms[0], alignedTerms[1]
+
+    def _coerce(self, other):
+        return other if isinstance(other, Polynomial) else Polynomial.constant(other)
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        variables, terms, otherTerms = self._aligned(other)
+        terms = dict(terms)
+        for exponents, coefficient in otherTerms.items():
+            terms[exponents] = terms.get(exponents, 0) + coefficient
+        return Polynomial(variables, terms, atoms={**self.atoms, **other.atoms})
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Polynomial(self.variables, dict((exponents, -coefficient) for exponents, coefficient in self.terms.items()),
+                          atoms=self.atoms)
+
+    def __sub__(self, other):
+        return self + (-self._coerce(other))
+
+    def __rsub__(self, other):
+        return self._coerce(other) - self
+
+    def __mul__(self, other):
+        other = self._coerce(other)
+        variables, terms, otherTerms = self._aligned(other)
+        atoms = {**self.atoms, **other.atoms}
+        if len(variables) == 1 and self._isDense(terms) and self._isDense(otherTerms):
+            return Polynomial(variables, self._convolve(terms, otherTerms), atoms=atoms)
+        product = {}
+        for exponents, coefficient in terms.items():
+            for otherExponents, otherCoefficient in otherTerms.items():
+                productExponents = tuple(exponent + otherExponent for exponent, otherExponent in zip(exponents, otherExponents))
+                product[productExponents] = product.get(productExponents, 0) + coefficient * otherCoefficient
+        return Polynomial(variables, product, atoms=atoms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent):
+        """
+        by squaring, so log2(exponent) multiplications
+        """
+        if not isinstance(exponent, int) or exponent < 0:
+            raise Exception(f'Can only raise a polynomial to a whole number, not {exponent}')
+        result = Polynomial.constant(1)
+        base = self
+        while exponent > 0:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent > 0:
+                base = base * base
+        return result
+
+    @classmethod
+    def _isDense(cls, terms):
+        degree = max((exponents[0] for exponents in terms.keys()), default=0)
+        return degree >= cls.DENSE_DEGREE and len(terms) >= cls.DENSE_RATIO * (degree + 1)
+
+    @classmethod
+    def _convolve(cls, terms, otherTerms):
+        """
+        product of two univariate polynomials, with numpy.convolve of their coefficients
+        """
+        import numpy as np
+        arrays = []
+        for polynomialTerms in (terms, otherTerms):
+            array = np.zeros(max(exponents[0] for exponents in polynomialTerms.keys()) + 1)
+            for exponents, coefficient in polynomialTerms.items():
+                array[exponents[0]] = coefficient
+            arrays.append(array)
+        product = np.convolve(arrays[0], arrays[1])
+        return dict(((int(exponent),), float(product[exponent])) for exponent in np.nonzero(product)[0])
+
+    def __eq__(self, other):
+        if not isinstance(other, Polynomial):
+            other = Polynomial.constant(other)
+        _, terms, otherTerms = self._aligned(other)
+        return terms == otherTerms
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.treeToScheme(self.toTree())})'
+
+    def isConstant(self):
+        return all(exponent == 0 for exponents in self.terms.keys() for exponent in exponents)
+
+    def constantValue(self):
+        """
+        :return: the coefficient of the monomial without variables
+        :rtype: float
+        """
+        return self.terms.get((0,) * len(self.variables), 0)
+
+    def degree(self, variable=None):
+        """
+        :return: the degree in variable, or the total degree if variable is None, -1 for the zero polynomial
+        :rtype: int
+        """
+        if variable is not None and variable not in self.variables:
+            return 0 if len(self.terms) > 0 else -1
+        degrees = [sum(exponents) if variable is None else exponents[self.variables.index(variable)]
+                   for exponents in self.terms.keys()]
+        return max(degrees, default=-1)
+
+    def coefficients(self, variable):
+        """
+        :return: mapping from the power of variable, to the coefficient of that power, a polynomial in the other
+        variables
+        :rtype: dict[int, :class:`Polynomial`]
+        """
+        if variable not in self.variables:
+            return {0:self} if len(self.terms) > 0 else {}
+        position = self.variables.index(variable)
+        otherVariables = self.variables[:position] + self.variables[position+1:]
+        coefficientTerms = {}
+        for exponents, coefficient in self.terms.items():
+            coefficientTerms.setdefault(exponents[position], {})[exponents[:position] + exponents[position+1:]] = coefficient
+        return dict((power, Polynomial(otherVariables, terms, atoms=self.atoms)) for power, terms in coefficientTerms.items())
+
+    def roots(self, variable):
+        """
+        closed forms of the real roots of self = 0 in variable, for degree 1 to 4, the coefficients are the other
+        variables (and atoms). ax^3+d (only its real root) and ax^4+cx^2+e (as a quadratic in x^2) are trees of the
+        coefficients. Other cubics and quartics have one or three (zero, two or four) real roots depending on the sign
+        of the discriminant, so they are only solved when all their coefficients are numbers: the depressed cubic
+        t^3+pt+q with Cardano (real cube roots) if it has one real root, with the trigonometric form (Viete) if it
+        has three, and the quartic with Ferrari, from the largest root of the resolvent cubic. Those roots are then
+        polished with Newton steps
+
+        :param variable: the variable to solve for
+        :type variable: str
+        :return: one tree for each root, nested (label, tuple of children), repeated roots are repeated
+        :rtype: list[tuple[str, tuple]]
+        """
+        for atom in self.atoms.values():
+            if any(node[0] == variable for node, _, _ in Traversal.preorder(None, atom, childrenOf=lambda current: current[1])):
+                raise Exception(f'{variable} is in {self.treeToScheme(atom)}, not a polynomial in {variable}')
+        degree = self.degree(variable)
+        if degree < 1 or degree > 4:
+            raise Exception(f'Cannot handle degree {degree} in {variable}')
+        coefficients = self.coefficients(variable)
+        inputs = [coefficients[power].toTree() if power in coefficients else ('0', ()) for power in range(degree, -1, -1)]
+        if degree == 1:
+            return [self._instantiate(self.LINEAR_ROOT, inputs)]
+        if degree == 2:
+            return [self._instantiate(self.QUADRATIC_ROOT, inputs + [(sign, ())]) for sign in ('1', '-1')]
+        if all(coefficient.isConstant() for coefficient in coefficients.values()):
+            values = [coefficients[power].constantValue() if power in coefficients else 0 for power in range(degree, -1, -1)]
+            rootValues = self._realCubicRoots(*values) if degree == 3 else self._realQuarticRoots(*values)
+            rootValues = [self._polishedRoot(values, rootValue) for rootValue in rootValues]
+            if len(rootValues) == 0:
+                raise Exception(f'No real root in {variable}')
+            return [(self._label(rootValue), ()) for rootValue in rootValues]
+        if degree == 3 and set(coefficients.keys()) <= {3, 0}:
+            return [self._instantiate(self.PURE_CUBIC_ROOT, [inputs[0], inputs[3]])]
+        if degree == 4 and set(coefficients.keys()) <= {4, 2, 0}:
+            return [self._instantiate(self.BIQUADRATIC_ROOT, [inputs[0], inputs[2], inputs[4], (s1, ()), (s2, ())])
+                    for s1 in ('1', '-1') for s2 in ('1', '-1')]
+        raise Exception(f'Cannot handle degree {degree} in {variable}, the number of real roots depends on the coefficients')
+
+    @classmethod
+    def _realCubicRoots(cls, a, b, c, d):
+        """
+        x = t - b/(3a), for the depressed cubic t^3+pt+q
+
+        :return: the real roots of ax^3+bx^2+cx+d, repeated roots are repeated
+        :rtype: list[float]
+        """
+        import math
+        p = (3 * a * c - b ** 2) / (3 * a ** 2)
+        q = (2 * b ** 3 - 9 * a * b * c + 27 * a ** 2 * d) / (27 * a ** 3)
+        shift = -b / (3 * a)
+        discriminant = (q / 2) ** 2 + (p / 3) ** 3
+        if discriminant > cls.ROOT_TOLERANCE * max((q / 2) ** 2, abs(p / 3) ** 3): # one real root, Cardano
+            cubeRoot = lambda value: math.copysign(abs(value) ** (1 / 3), value)
+            return [cubeRoot(-q / 2 + math.sqrt(discriminant)) + cubeRoot(-q / 2 - math.sqrt(discriminant)) + shift]
+        if p == 0: # t^3 = 0
+            return [shift] * 3
+        #Viete, t_k = 2 sqrt(-p/3) cos(arccos(3q/(2p) sqrt(-3/p))/3 - 2 pi k/3)
+        angle = math.acos(max(-1, min(1, 3 * q / (2 * p) * math.sqrt(-3 / p)))) / 3
+        return [2 * math.sqrt(-p / 3) * math.cos(angle - 2 * math.pi * k / 3) + shift for k in range(3)]
+
+    @classmethod
+    def _realQuarticRoots(cls, a, b, c, d, e):
+        """
+        x = y - b/(4a), for the depressed quartic y^4+py^2+qy+r
+
+        :return: the real roots of ax^4+bx^3+cx^2+dx+e, repeated roots are repeated
+        :rtype: list[float]
+        """
+        import math
+        p = (8 * a * c - 3 * b ** 2) / (8 * a ** 2)
+        q = (b ** 3 - 4 * a * b * c + 8 * a ** 2 * d) / (8 * a ** 3)
+        r = (-3 * b ** 4 + 256 * a ** 3 * e - 64 * a ** 2 * b * d + 16 * a * b ** 2 * c) / (256 * a ** 4)
+        shift = -b / (4 * a)
+        scale = max(abs(p), math.sqrt(abs(r)), abs(q) ** (2 / 3), 1e-300)
+        if abs(q) <= cls.ROOT_TOLERANCE * scale ** 1.5: # biquadratic, z^2+pz+r with z = y^2
+            squares = cls._realQuadraticRoots(1, p, r, scale ** 2)
+            return [sign * math.sqrt(max(square, 0)) + shift for square in squares if square >= -cls.ROOT_TOLERANCE * scale
+                    for sign in (1, -1)]
+        #Ferrari, 8m^3 + 8pm^2 + (2p^2-8r)m - q^2 = 0 is the resolvent cubic, its largest root is positive
+        m = max(cls._realCubicRoots(8, 8 * p, 2 * p ** 2 - 8 * r, -q ** 2))
+        rootValues = []
+        for s1 in (1, -1): # y = (s1 sqrt(2m) + s2 sqrt(-(2p + 2m + s1 sqrt(2) q/sqrt(m))))/2
+            radicand = -(2 * p + 2 * m + s1 * math.sqrt(2) * q / math.sqrt(m))
+            if radicand >= -cls.ROOT_TOLERANCE * scale:
+                rootValues += [(s1 * math.sqrt(2 * m) + s2 * math.sqrt(max(radicand, 0))) / 2 + shift for s2 in (1, -1)]
+        return rootValues
+
+    @classmethod
+    def _polishedRoot(cls, values, rootValue):
+        """
+        the closed forms lose a few digits in the cube and square roots (x^3 = x + 6 gives 1.9999999999999978), so
+        take up to POLISH_STEPS Newton steps, each only if it makes the residual smaller, and round to the nearest
+        integer if that is within ROOT_TOLERANCE, and an exact root
+
+        :param values: coefficients, highest power first
+        :type values: list[float]
+        :param rootValue: a root from the closed form
+        :type rootValue: float
+        :rtype: float
+        """
+        import math
+        def residual(x): # value and derivative, with Horner
+            value, derivative = 0, 0
+            for coefficient in values:
+                derivative = derivative * x + value
+                value = value * x + coefficient
+            return value, derivative
+        value, derivative = residual(rootValue)
+        for _ in range(cls.POLISH_STEPS):
+            if value == 0 or derivative == 0: # exact, or a repeated root
+                break
+            nextRootValue = rootValue - value / derivative
+            nextValue, nextDerivative = residual(nextRootValue)
+            if abs(nextValue) >= abs(value):
+                break
+            rootValue, value, derivative = nextRootValue, nextValue, nextDerivative
+        if not math.isfinite(rootValue):
+            return rootValue
+        integer = round(rootValue)
+        if abs(integer - rootValue) <= cls.ROOT_TOLERANCE * max(1, abs(rootValue)) and residual(integer)[0] == 0:
+            return float(integer) # not another root, that happens to be an integer
+        return rootValue
+
+    @classmethod
+    def _realQuadraticRoots(cls, a, b, c, scale):
+        """
+        :param scale: of b^2 - 4ac, a discriminant within ROOT_TOLERANCE of it is 0
+        :type scale: float
+        :return: the real roots of ax^2+bx+c, repeated roots are repeated
+        :rtype: list[float]
+        """
+        import math
+        discriminant = b ** 2 - 4 * a * c
+        if discriminant < -cls.ROOT_TOLERANCE * scale:
+            return []
+        return [(-b + sign * math.sqrt(max(discriminant, 0))) / (2 * a) for sign in (1, -1)]
+
+    @classmethod
+    def _instantiate(cls, patternStr, inputs):
+        """
+        :return: the tree of patternStr, with $0, $1... as the trees of inputs
+        :rtype: tuple[str, tuple]
+        """
+        return Traversal.foldUp(None, RewriteRule.parsePattern(patternStr),
+                                lambda leaf: inputs[int(leaf[0][1:])] if RewriteRule.isPatternVariable(leaf[0]) else leaf,
+                                lambda current, childTrees: (current[0], tuple(childTrees)),
+                                childrenOf=lambda current: current[1])
+
+    def toTree(self):
+        """
+        :return: the polynomial as nested (label, tuple of children), highest total degree first, atoms are put back
+        :rtype: tuple[str, tuple]
+        """
+        if len(self.terms) == 0:
+            return ('0', ())
+        orderedTerms = sorted(self.terms.items(), key=lambda term: (-sum(term[0]), tuple(-exponent for exponent in term[0])))
+        tree = None
+        for exponents, coefficient in orderedTerms:
+            factors = []
+            for variable, exponent in zip(self.variables, exponents):
+                if exponent == 0:
+                    continue
+                variableTree = self.atoms.get(variable, (variable, ()))
+                factors.append(variableTree if exponent == 1 else ('^', (variableTree, (self._label(exponent), ()))))
+            magnitude = coefficient if tree is None else abs(coefficient)
+            if magnitude != 1 or len(factors) == 0:
+                factors.insert(0, (self._label(magnitude), ()))
+            termTree = factors[0]
+            for factor in factors[1:]:
+                termTree = ('*', (termTree, factor))
+            if tree is None:
+                tree = termTree
+            else:
+                tree = ('-' if coefficient < 0 else '+', (tree, termTree))
+        return tree
+
+    @classmethod
+    def _label(cls, value):
+        label = Simplifier.numberLabel(value)
+        return label if label is not None else f'{value:.20f}'.rstrip('0') # no exponent
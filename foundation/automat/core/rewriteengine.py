@@ -0,0 +1,364 @@
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.traversal import Traversal
+
+
+class RewriteRule:
+    """
+    lhs is rewritten to rhs. Both are patterns in the Scheme format, without the =, like '(* $x 1)'. In patterns:
+
+    - $name matches any subtree, and the same subtree, if it is used more than once in lhs
+    - #name matches only a primitive (number)
+    - numbers match numbers of the same value ('0' matches '0.0'), other labels match the same label
+
+    :param lhs: pattern to look for
+    :type lhs: str
+    :param rhs: pattern to replace it with, every $name and #name in rhs must be in lhs
+    :type rhs: str
+    :param name: for debugging, defaults to 'lhs -> rhs'
+    :type name: str
+    :param condition: for rules that only hold for some numbers, called with the values of the #name of lhs, the
+    rule is only applied if it returns True
+    :type condition: Callable[[dict[str, float]], bool]
+    """
+    def __init__(self, lhs, rhs, name=None, condition=None):
+        """
+        parses the patterns, into (label, tuple of children). Also the constructor
+        """
+        self.lhs = self.parsePattern(lhs)
+        self.rhs = self.parsePattern(rhs)
+        self.name = name if name is not None else f'{lhs} -> {rhs}'
+        self.priority = None # set by RewriteEngine.addRule, rules added first are tried first
+        self.condition = condition
+        lhsVariables = set(self._patternVariables(self.lhs))
+        for variable in self._patternVariables(self.rhs):
+            if variable not in lhsVariables:
+                raise Exception(f'{variable} of rhs is not in lhs, in rule {self.name}')
+
+    @classmethod
+    def parsePattern(cls, patternStr):
+        """
+        :return: patternStr as nested (label, tuple of children), leaves have no children
+        :rtype: tuple[str, tuple]
+        """
+        tokens = patternStr.replace('(', ' ( ').replace(')', ' ) ').split()
+        stack = [[]] # children collected for each open bracket
+        for token in tokens:
+            if token == '(':
+                stack.append([])
+            elif token == ')':
+                if len(stack) < 2 or len(stack[-1]) == 0:
+                    raise Exception(f'Closing Brackets Mismatch, in {patternStr}')
+                label, *children = stack.pop()
+                stack[-1].append((label[0], tuple(children)))
+            else:
+                stack[-1].append((token, ()))
+        if len(stack) != 1 or len(stack[0]) != 1:
+            raise Exception(f'Not one pattern, in {patternStr}')
+        return stack[0][0]
+
+    @classmethod
+    def isPatternVariable(cls, label):
+        return label[0] in (DiscriminationTree.ANY, DiscriminationTree.NUMBER) and len(label) > 1
+
+    @classmethod
+    def _patternVariables(cls, pattern):
+        for (label, _), _, _ in Traversal.preorder(None, pattern, childrenOf=lambda current: current[1]):
+            if cls.isPatternVariable(label):
+                yield label
+
+    def holds(self, numbers):
+        """
+        :param numbers: the value of each #name of lhs, in a match
+        :type numbers: dict[str, float]
+        :return: True if the rule can be applied to that match
+        :rtype: bool
+        """
+        return self.condition is None or self.condition(numbers)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name})'
+
+
+class DiscriminationTree:
+    """
+    Index of patterns, a trie over the preorder of the pattern, where each node of the pattern is one key:
+
+    - a function, or a leaf : (label, number of children), numbers are (NUMBER, value), so 0 and 0.0 are the same
+    - $name : ANY, skips the whole subtree of the term
+    - #name : NUMBER, matches a primitive leaf
+
+    To find the patterns that may match a node of an ast, the trie is walked together with the preorder of the
+    subtree of the node, taking the branch of the key of the node, and the ANY (and NUMBER) branches. Only branches of
+    patterns that agree with the term so far are walked, so the cost depends on the size of the term and the number
+    of matching patterns, not on the number of patterns. A repeated $name is not checked here (see
+    :meth:`RewriteEngine.match`).
+    """
+    ANY = '$'
+    NUMBER = '#'
+    VALUES = None # key of the values stored at the end of a pattern
+
+    def __init__(self):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def _patternKey(cls, label, children):
+        if RewriteRule.isPatternVariable(label):
+            return label[0] # ANY or NUMBER
+        if Booler.isNum(label):
+            return (cls.NUMBER, float(label))
+        return (label, len(children))
+
+    def insert(self, pattern, value):
+        """
+        :param pattern: from :meth:`RewriteRule.parsePattern`
+        :type pattern: tuple[str, tuple]
+        :param value: returned by :meth:`retrieve` for the terms that pattern may match
+        :type value: Any
+        """
+        trieNode = self._root
+        for (label, children), _, _ in Traversal.preorder(None, pattern, childrenOf=lambda current: current[1]):
+            trieNode = trieNode.setdefault(self._patternKey(label, children), {})
+        trieNode.setdefault(self.VALUES, []).append(value)
+        self._size += 1
+
+    def retrieve(self, ast, node):
+        """
+        :param ast: dictionary form of the AST
+        :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+        :param node: node of ast, the root of the term
+        :type node: tuple[str, int]
+        :return: values of the patterns that may match the subtree of node
+        :rtype: list[Any]
+        """
+        values = []
+        stack = [(self._root, (node,))] # trie node, term nodes left to match, in preorder
+        while len(stack) > 0:
+            trieNode, pending = stack.pop()
+            if len(pending) == 0:
+                values += trieNode.get(self.VALUES, [])
+                continue
+            term = pending[0]
+            children = ast.get(term, ())
+            label = str(term[0])
+            if Booler.isNum(label) and len(children) == 0:
+                numberBranch = trieNode.get(self.NUMBER)
+                if numberBranch is not None:
+                    stack.append((numberBranch, pending[1:]))
+                key = (self.NUMBER, float(label))
+            else:
+                key = (label, len(children))
+            anyBranch = trieNode.get(self.ANY)
+            if anyBranch is not None: # skip the subtree of term
+                stack.append((anyBranch, pending[1:]))
+            branch = trieNode.get(key)
+            if branch is not None: # children of term come next, in preorder
+                stack.append((branch, tuple(children) + pending[1:]))
+        return values
+
+
+class RewriteEngine:
+    """
+    Set of :class:`RewriteRule`, indexed by a :class:`DiscriminationTree`, so that at each node of an Abstract Syntax
+    Tree (ast for short), only the rules that may apply are tried. :meth:`rewriteNode` applies the first rule (in the
+    order they were added) that matches, and is used by :class:`Simplifier` to rewrite until nothing changes.
+
+    :param rules: (lhs, rhs) patterns, see :class:`RewriteRule`
+    :type rules: list[tuple[str, str]]
+    """
+    def __init__(self, rules=()):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        self.rules = []
+        self.index = DiscriminationTree()
+        for lhs, rhs in rules:
+            self.addRule(lhs, rhs)
+
+    def addRule(self, lhs, rhs, name=None, condition=None):
+        """
+        :return: the added rule
+        :rtype: :class:`RewriteRule`
+        """
+        rule = RewriteRule(lhs, rhs, name=name, condition=condition)
+        rule.priority = len(self.rules)
+        self.rules.append(rule)
+        self.index.insert(rule.lhs, rule)
+        return rule
+
+    def candidates(self, ast, node):
+        """
+        :return: the rules whose lhs may match the subtree of node, in the order they were added
+        :rtype: list[:class:`RewriteRule`]
+        """
+        return sorted(self.index.retrieve(ast, node), key=lambda rule: rule.priority)
+
+    def match(self, ast, node):
+        """
+        :return: the first rule that matches the subtree of node, the bindings of its pattern variables to nodes of
+        ast (the first occurrence), the nodes of ast matched by the functions of lhs, and every node matched by each
+        occurrence of each pattern variable (a variable that appears twice in lhs, like (- $x $x), matches two
+        subtrees). None if no rule matches
+        :rtype: tuple[:class:`RewriteRule`, dict[str, tuple[str, int]], list[tuple[str, int]], dict[str, list[tuple[str, int]]]]
+        """
+        for rule in self.candidates(ast, node):
+            bindings = {}
+            matchedNodes = []
+            occurrences = {}
+            if self._matchPattern(ast, rule.lhs, node, bindings, matchedNodes, occurrences) and rule.holds(dict(
+                    (label, float(boundNode[0])) for label, boundNode in bindings.items() if label[0] == DiscriminationTree.NUMBER)):
+                return rule, bindings, matchedNodes, occurrences
+        return None
+
+    def _matchPattern(self, ast, pattern, node, bindings, matchedNodes, occurrences):
+        stack = [(pattern, node)]
+        while len(stack) > 0:
+            (label, patternChildren), current = stack.pop()
+            children = ast.get(current, [])
+            currentLabel = str(current[0])
+            if RewriteRule.isPatternVariable(label):
+                if label[0] == DiscriminationTree.NUMBER and (len(children) > 0 or not Booler.isNum(currentLabel)):
+                    return False
+                if label in bindings:
+                    if not self.sameSubtree(ast, bindings[label], current):
+                        return False
+                else:
+                    bindings[label] = current
+                occurrences.setdefault(label, []).append(current)
+                continue
+            if len(children) != len(patternChildren):
+                return False
+            if Booler.isNum(label):
+                if not Booler.isNum(currentLabel) or float(currentLabel) != float(label):
+                    return False
+            elif currentLabel != label:
+                return False
+            if len(children) > 0:
+                matchedNodes.append(current)
+            stack += reversed(list(zip(patternChildren, children))) # bind from left to right
+        return True
+
+    @classmethod
+    def sameSubtree(cls, ast, node0, node1):
+        """
+        :return: True if the subtrees of node0 and node1 have the same labels, in the same shape
+        :rtype: bool
+        """
+        stack = [(node0, node1)]
+        while len(stack) > 0:
+            current0, current1 = stack.pop()
+            if current0[0] != current1[0]:
+                return False
+            children0 = ast.get(current0, [])
+            children1 = ast.get(current1, [])
+            if len(children0) != len(children1):
+                return False
+            stack += zip(children0, children1)
+        return True
+
+    def rewriteNode(self, ast, node, parentNode, argumentIdx, nextId):
+        """
+        ~SKETCH~
+        1. find the first rule that matches node
+        2. make the rows of rhs, a function at the root of rhs keeps the id of node, other new nodes take ids from
+        nextId. A pattern variable used the first time is the bound subtree itself, after that, a copy with new ids
+        3. remove the rows of the functions matched by lhs, and of the subtrees matched by every occurrence of the
+        pattern variables that rhs does not use (rhs only uses the first occurrence, later ones are always removed),
+        then point the parent to the root of rhs
+
+        :param ast: the ast, not changed
+        :type ast: :class:`PersistentMap`
+        :param node: the node to rewrite
+        :type node: tuple[str, int]
+        :param parentNode: parent of node
+        :type parentNode: tuple[str, int]
+        :param argumentIdx: position of node in the row of parentNode
+        :type argumentIdx: int
+        :param nextId: smallest id that is not used in ast
+        :type nextId: int
+        :return: None if no rule matches, else multiple returns
+            - the rewritten ast
+            - root of rhs, that replaced node
+            - rows that were removed
+            - rows that were added
+            - smallest id that is not used in the rewritten ast
+        :rtype: tuple[:class:`PersistentMap`, tuple[str, int], dict, dict, int]
+        """
+        matched = self.match(ast, node)
+        if matched is None:
+            return None
+        rule, bindings, matchedNodes, occurrences = matched
+        #~~~~~~~~~~~~~STEP2
+        newRows = {}
+        usedVariables = set()
+        def instantiate(pattern, isRoot):
+            nonlocal nextId
+            label, patternChildren = pattern
+            if RewriteRule.isPatternVariable(label):
+                if label not in usedVariables:
+                    usedVariables.add(label)
+                    return bindings[label]
+                copied, nextId = self._copySubtree(ast, bindings[label], newRows, nextId)
+                return copied
+            if isRoot:
+                newNode = (label, node[1])
+            else:
+                newNode = (label, nextId)
+                nextId += 1
+            if len(patternChildren) > 0:
+                newRows[newNode] = [instantiate(patternChild, False) for patternChild in patternChildren]
+            return newNode
+        replacement = instantiate(rule.rhs, True)
+        #~~~~~~~~~~~~~STEP3
+        oldRows = {}
+        for matchedNode in matchedNodes:
+            oldRows[matchedNode] = ast[matchedNode]
+        for variable, occurrenceNodes in occurrences.items():
+            for occurrenceNode in occurrenceNodes:
+                if variable in usedVariables and occurrenceNode == bindings[variable]: # reused by rhs
+                    continue
+                stack = [occurrenceNode]
+                while len(stack) > 0:
+                    current = stack.pop()
+                    if current in ast and current not in oldRows:
+                        oldRows[current] = ast[current]
+                        stack += ast[current]
+        if replacement != node:
+            parentChildren = list(ast[parentNode])
+            parentChildren[argumentIdx] = replacement
+            oldRows[parentNode] = ast[parentNode]
+            newRows[parentNode] = parentChildren
+        for oldNode in oldRows.keys():
+            if oldNode not in newRows:
+                ast = ast.delete(oldNode)
+        ast = ast.setMany(newRows)
+        return ast, replacement, oldRows, newRows, nextId
+
+    @classmethod
+    def _copySubtree(cls, ast, node, newRows, nextId):
+        """
+        copies the subtree of node into newRows, with new ids from nextId
+
+        :return: the root of the copy, and the next unused id
+        :rtype: tuple[tuple[str, int], int]
+        """
+        copiedRoot = (node[0], nextId)
+        nextId += 1
+        stack = [(node, copiedRoot)]
+        while len(stack) > 0:
+            current, copied = stack.pop()
+            if current not in ast:
+                continue
+            copiedChildren = []
+            for child in ast[current]:
+                copiedChildren.append((child[0], nextId))
+                nextId += 1
+                stack.append((child, copiedChildren[-1]))
+            newRows[copied] = copiedChildren
+        return copiedRoot, nextId
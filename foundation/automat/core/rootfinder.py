@@ -0,0 +1,180 @@
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.core.dualevaluator import DualEvaluator
+
+
+class RootFinder:
+    """
+    Solves an equation for variable numerically, for every row of the other variables at once, when it cannot be made
+    the subject (like x = cos(x), where x appears more than once). The residual, lhs - rhs, and its derivative by
+    variable come from one :class:`DualEvaluator` pass, so each iteration is one call for all the rows still open.
+
+    ~SKETCH~
+    1. bracketing, if lower and upper are not given, from guess, the side with the smaller |residual| is pushed out,
+    until the residual changes sign
+    2. safeguarded Newton, inside the bracket, a Newton step that leaves the bracket, or does not halve the step
+    before the last, is replaced by bisection, so it converges like Newton near the root, and never worse than
+    bisection. The bracket is shrunk with the sign of the residual at each new point
+    3. rows without a bracket take plain Newton steps from guess, if lower and upper were not given. Rows where the
+    given lower and upper do not bracket a root are not solved, they do not converge
+
+    Each row stops on its own, when the step, or the bracket, is below tolerance * (1 + |root|), or the residual is 0.
+
+    The bindings of a solve are only kept in its locals, so one RootFinder (like the one cached by
+    :meth:`Equation.solveNumerically`) can solve for many threads at once.
+
+    :param ast: dictionary form of the AST
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    :param rootNode: the = of ast
+    :type rootNode: tuple[str, int]
+    :param variable: the variable to solve for
+    :type variable: str
+    :param parameters: the other variables, in order
+    :type parameters: list[str]
+    """
+    GROWTH = 1.6 # of the bracket, at each step of the bracketing
+
+    def __init__(self, ast, rootNode, variable, parameters):
+        """
+        compiles the residual. Also the constructor
+        """
+        self.variable = variable
+        self.parameters = list(parameters)
+        residualRoot = ('=', -1) # ids of the ast are not negative
+        residualNode = ('-', -3)
+        residualAst = PersistentMap.fromMapping(ast).setMany({
+            residualRoot:[('_', -2), residualNode],
+            residualNode:list(ast[rootNode])
+        })
+        self.evaluator = DualEvaluator(residualAst, residualRoot, [variable] + self.parameters, differentiateBy=[variable])
+        self.iterations = 0 # of the last solve that finished
+        self.evaluations = 0 # rows evaluated, in the last solve that finished
+
+    def solve(self, bindings, lower=None, upper=None, guess=None, tolerance=1e-12, maxIterations=100,
+              maxExpansions=50):
+        """
+        :param bindings: mapping from each of self.parameters to its values, arrays (or scalars) that broadcast together
+        :type bindings: dict[str, numpy.ndarray]
+        :param lower: lower end of the bracket, for each row, found from guess if lower or upper is not given. Rows
+            where the residual has the same sign at lower and upper do not converge
+        :type lower: numpy.ndarray
+        :param upper: upper end of the bracket, for each row
+        :type upper: numpy.ndarray
+        :param guess: where to start bracketing (and Newton, for rows that are not bracketed), defaults to 1
+        :type guess: numpy.ndarray
+        :param tolerance: relative tolerance of the root
+        :type tolerance: float
+        :param maxIterations: most Newton or bisection steps
+        :type maxIterations: int
+        :param maxExpansions: most bracketing steps
+        :type maxExpansions: int
+        :return: multiple returns, with the broadcast shape of bindings (and lower, upper, guess)
+            - the roots, the last iterate where it did not converge (nan where lower and upper were given and do not
+            bracket a root)
+            - True where it converged
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        import numpy as np
+        for parameter in self.parameters:
+            if parameter not in bindings:
+                raise Exception(f"{parameter} not in bindings")
+        arrays = [np.asarray(bindings[parameter], dtype=np.float64) for parameter in self.parameters]
+        limits = [np.asarray(limit, dtype=np.float64) for limit in (lower, upper, guess) if limit is not None]
+        shape = np.broadcast_shapes(*(array.shape for array in arrays + limits))
+        flatArrays = [np.broadcast_to(array, shape).reshape(-1) for array in arrays]
+        rowCount = int(np.prod(shape))
+        guess = np.broadcast_to(np.asarray(1.0 if guess is None else guess, dtype=np.float64), shape).reshape(-1)
+        iterations = 0
+        counts = {'evaluations':0}
+        #~~~~~~~~~~~~~STEP1
+        given = lower is not None and upper is not None
+        if not given:
+            lower, upper, lowerResidual, upperResidual = self._bracket(guess, maxExpansions, flatArrays, counts)
+        else:
+            lower = np.array(np.broadcast_to(lower, shape), dtype=np.float64).reshape(-1)
+            upper = np.array(np.broadcast_to(upper, shape), dtype=np.float64).reshape(-1)
+            lowerResidual, _ = self._residual(lower, np.arange(rowCount), flatArrays, counts)
+            upperResidual, _ = self._residual(upper, np.arange(rowCount), flatArrays, counts)
+        bracketed = np.isfinite(lowerResidual) & np.isfinite(upperResidual) & \
+            (np.sign(lowerResidual) * np.sign(upperResidual) <= 0)
+        swap = upperResidual < lowerResidual # so that the residual is negative at lower, positive at upper
+        lower, upper = np.where(swap, upper, lower), np.where(swap, lower, upper)
+        solvable = bracketed | (not given) # a bracket that was given is kept, Newton would leave it
+        #~~~~~~~~~~~~~STEP2
+        roots = np.where(bracketed, (lower + upper) / 2, np.where(solvable, guess, np.nan))
+        residuals, derivatives = self._residual(roots, np.arange(rowCount), flatArrays, counts)
+        lastSteps = np.abs(upper - lower)
+        lower = np.where(bracketed & (residuals < 0), roots, lower)
+        upper = np.where(bracketed & (residuals > 0), roots, upper)
+        converged = solvable & (residuals == 0)
+        active = solvable & ~converged
+        while iterations < maxIterations and active.any():
+            iterations += 1
+            rows = np.nonzero(active)[0]
+            root, residual, derivative = roots[rows], residuals[rows], derivatives[rows]
+            rowLower, rowUpper, rowBracketed = lower[rows], upper[rows], bracketed[rows]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                newton = root - residual / derivative
+            bisect = rowBracketed & (~np.isfinite(newton) |
+                (newton <= np.minimum(rowLower, rowUpper)) | (newton >= np.maximum(rowLower, rowUpper)) |
+                (np.abs(newton - root) > lastSteps[rows] / 2))
+            newRoot = np.where(bisect, (rowLower + rowUpper) / 2, newton) # rows without a bracket only take newton
+            step = np.abs(newRoot - root)
+            newResidual, newDerivative = self._residual(newRoot, rows, flatArrays, counts)
+            lower[rows] = np.where(rowBracketed & (newResidual < 0), newRoot, rowLower)
+            upper[rows] = np.where(rowBracketed & (newResidual > 0), newRoot, rowUpper)
+            scale = tolerance * (1 + np.abs(newRoot))
+            rowConverged = (newResidual == 0) | (np.isfinite(newResidual) & (step <= scale)) | \
+                (rowBracketed & (np.abs(upper[rows] - lower[rows]) <= scale))
+            roots[rows], residuals[rows], derivatives[rows], lastSteps[rows] = newRoot, newResidual, newDerivative, step
+            converged[rows] = rowConverged
+            active[rows] = ~rowConverged & np.isfinite(newRoot)
+        self.iterations, self.evaluations = iterations, counts['evaluations']
+        return roots.reshape(shape), converged.reshape(shape)
+
+    def _bracket(self, guess, maxExpansions, flatArrays, counts):
+        """
+        :param flatArrays: the bindings of self.parameters, flattened to one value for each row
+        :type flatArrays: list[numpy.ndarray]
+        :param counts: evaluations of this solve, added to
+        :type counts: dict[str, int]
+        :return: lower, upper, and the residuals at them, the residuals have the same sign where no bracket was found
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        import numpy as np
+        allRows = np.arange(len(guess))
+        width = np.maximum(1.0, np.abs(guess)) / 10
+        lower, upper = guess - width, guess + width
+        lowerResidual, _ = self._residual(lower, allRows, flatArrays, counts)
+        upperResidual, _ = self._residual(upper, allRows, flatArrays, counts)
+        for _ in range(maxExpansions):
+            notBracketed = ~(np.sign(lowerResidual) * np.sign(upperResidual) <= 0) # nan is not bracketed either
+            if not notBracketed.any():
+                break
+            rows = np.nonzero(notBracketed)[0]
+            expandLower = ~np.isnan(lowerResidual[rows]) & \
+                (np.isnan(upperResidual[rows]) | (np.abs(lowerResidual[rows]) < np.abs(upperResidual[rows])))
+            width = upper[rows] - lower[rows]
+            points = np.where(expandLower, lower[rows] - self.GROWTH * width, upper[rows] + self.GROWTH * width)
+            residuals, _ = self._residual(points, rows, flatArrays, counts)
+            lower[rows] = np.where(expandLower, points, lower[rows])
+            lowerResidual[rows] = np.where(expandLower, residuals, lowerResidual[rows])
+            upper[rows] = np.where(expandLower, upper[rows], points)
+            upperResidual[rows] = np.where(expandLower, upperResidual[rows], residuals)
+        return lower, upper, lowerResidual, upperResidual
+
+    def _residual(self, points, rows, flatArrays, counts):
+        """
+        :param flatArrays: the bindings of self.parameters, flattened to one value for each row
+        :type flatArrays: list[numpy.ndarray]
+        :param counts: evaluations of this solve, added to
+        :type counts: dict[str, int]
+        :return: the residual, and its derivative by self.variable, at points, for those rows
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        import numpy as np
+        bindings = dict(zip(self.parameters, (flatArray[rows] for flatArray in flatArrays)))
+        bindings[self.variable] = points
+        counts['evaluations'] += len(rows)
+        with np.errstate(all='ignore'): # nan outside the domain, those points are not used
+            residuals, partials = self.evaluator.evaluate(bindings)
+        return residuals, partials[self.variable]
@@ -0,0 +1,165 @@
+from collections import deque
+import math
+
+from foundation.automat.arithmetic.function import Function
+from foundation.automat.common.checker import Booler
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.common.traversal import Traversal
+from foundation.automat.core.astindex import AstIndex
+from foundation.automat.core.rewriteengine import RewriteEngine
+
+
+class Simplifier:
+    """
+    Simplifies an Abstract Syntax Tree (ast for short), bottom-up, with a worklist, until no rule applies:
+
+    - constant folding : a function whose inputs are all numbers is replaced by its value, calculated with the
+    _calculate of its class in automat.arithmetic.standard (not folded if that raises, or is not a finite real)
+    - identities : the rules of engine, by default the IDENTITIES of the classes in automat.arithmetic.standard
+    (x+0, x*1, x*0, x^0 ...), and CONDITIONAL_IDENTITIES, that only hold for some numbers, like (a^b)^c to a^(b*c).
+    They are looked up in the index of :class:`RewriteEngine`, so only the rules that may apply to a node are tried
+
+    The worklist starts with every function node, children before parents, and a node is put back on it whenever
+    one of its children is rewritten, so each rewrite only looks at the nodes above it. Rewrites keep the ids of the
+    nodes they replace, and the rows are rewritten with path copying (see :class:`PersistentMap`).
+
+    :param ast: the ast to simplify, not changed
+    :type ast: dict[tuple[str, int], list[tuple[str, int]]]
+    :param nodeBudget: stop after looking at this many nodes, the ast is then only partly simplified, None for no limit
+    :type nodeBudget: int
+    :param engine: the rules to rewrite with, defaults to the IDENTITIES of the standard functions
+    :type engine: :class:`RewriteEngine`
+    """
+    _IDENTITY_ENGINE = None # made on first use, from the IDENTITIES of the standard functions
+    #(lhs, rhs, name of the classmethod that is the condition), see RewriteRule
+    CONDITIONAL_IDENTITIES = [('(^ (^ $a #b) #c)', '(^ $a (* #b #c))', '_isPowerOfPowerSound')]
+
+    def __init__(self, ast, nodeBudget=None, engine=None):
+        """
+        Just getters and setter. Also the constructor.
+        """
+        Function.gatherStandardFunctions()
+        self.ast = PersistentMap.fromMapping(ast)
+        self.astIndex = AstIndex(self.ast)
+        self.nodeBudget = nodeBudget
+        self.engine = engine if engine is not None else self.identityEngine()
+        self.nodesVisited = 0
+        self.rewrites = 0
+        self._nextId = 1 + max((child[1] for children in self.ast.values() for child in children),
+                               default=self.astIndex.root[1])
+
+    @classmethod
+    def identityEngine(cls):
+        """
+        :return: the :class:`RewriteEngine` of the IDENTITIES of the standard functions, shared by all simplifiers
+        :rtype: :class:`RewriteEngine`
+        """
+        if Simplifier._IDENTITY_ENGINE is None:
+            engine = RewriteEngine(Function.standardIdentities())
+            for lhs, rhs, condition in cls.conditionalIdentities():
+                engine.addRule(lhs, rhs, condition=condition)
+            Simplifier._IDENTITY_ENGINE = engine
+        return Simplifier._IDENTITY_ENGINE
+
+    @classmethod
+    def conditionalIdentities(cls):
+        """
+        :return: CONDITIONAL_IDENTITIES, with the conditions as functions
+        :rtype: list[tuple[str, str, Callable[[dict[str, float]], bool]]]
+        """
+        return [(lhs, rhs, getattr(cls, conditionName)) for lhs, rhs, conditionName in cls.CONDITIONAL_IDENTITIES]
+
+    @classmethod
+    def _isPowerOfPowerSound(cls, numbers):
+        """
+        (a^b)^c = a^(b*c) for every real a (also negative) only if c is an integer, or b is an odd integer and b*c is
+        an integer, (x^2)^0.5 is |x|, not x
+        """
+        b, c = numbers['#b'], numbers['#c']
+        if float(c).is_integer():
+            return True
+        return float(b).is_integer() and int(b) % 2 == 1 and float(b * c).is_integer()
+
+    def simplify(self):
+        """
+        ~SKETCH~
+        1. put the function nodes on the worklist, in postorder
+        2. pop a node, apply constant folding, or the identities of its function, if something changed, put its
+        parent (and any new function node) on the worklist
+        3. stop when the worklist is empty, or nodeBudget nodes were visited
+
+        :return: the simplified ast
+        :rtype: :class:`PersistentMap`
+        """
+        worklist = deque(node for node, _, _ in Traversal.postorder(self.ast, self.astIndex.root) if node in self.ast)
+        inWorklist = set(worklist)
+        #~~~~~~~~~~~~~STEP2
+        while len(worklist) > 0:
+            if self.nodeBudget is not None and self.nodesVisited >= self.nodeBudget:
+                break
+            node = worklist.popleft()
+            inWorklist.discard(node)
+            if node not in self.ast: # removed by an earlier rewrite
+                continue
+            self.nodesVisited += 1
+            changedNodes = self._simplifyNode(node)
+            for changedNode in changedNodes:
+                if changedNode in self.ast and changedNode not in inWorklist:
+                    worklist.append(changedNode)
+                    inWorklist.add(changedNode)
+        return self.ast
+
+    def _simplifyNode(self, node):
+        """
+        :return: nodes to look at again, empty if nothing changed
+        :rtype: list[tuple[str, int]]
+        """
+        if node == self.astIndex.root:
+            return []
+        parentNode = self.astIndex.parentOf(node)
+        argumentIdx = self.astIndex.argumentIdxOf(node)
+        children = self.ast[node]
+        if all(Booler.isNum(str(child[0])) for child in children):
+            value = self._fold(node[0], [float(child[0]) for child in children])
+            if value is not None:
+                oldRows = {node:children, parentNode:self.ast[parentNode]}
+                parentChildren = list(self.ast[parentNode])
+                parentChildren[argumentIdx] = (value, node[1])
+                self.ast = self.ast.delete(node).set(parentNode, parentChildren)
+                self.astIndex.replaceRows(oldRows, {parentNode:parentChildren})
+                self.rewrites += 1
+                return [parentNode]
+        rewritten = self.engine.rewriteNode(self.ast, node, parentNode, argumentIdx, self._nextId)
+        if rewritten is None:
+            return []
+        self.ast, replacement, oldRows, newRows, self._nextId = rewritten
+        self.astIndex.replaceRows(oldRows, newRows)
+        self.rewrites += 1
+        return list(newRows.keys()) + [parentNode] # rows of rhs are made children first
+
+    def _fold(self, functionName, values):
+        """
+        :return: label of the value of functionName on values, None if it cannot be calculated
+        :rtype: str
+        """
+        functionClass = Function.FUNCNAME_CLASS.get(functionName)
+        if functionClass is None:
+            return None
+        try:
+            value = functionClass(None)._calculate(*values)
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        if not isinstance(value, (int, float)) or not math.isfinite(value):
+            return None
+        return self.numberLabel(value)
+
+    @classmethod
+    def numberLabel(cls, value):
+        """
+        :return: value as a primitive label, that Booler.isNum accepts, None if it needs an exponent
+        :rtype: str
+        """
+        if float(value).is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        label = repr(float(value))
+        return label if Booler.isNum(label) else None
@@ -0,0 +1,73 @@
+import inspect
+import pprint
+
+from foundation.automat.core.astindex import AstIndex
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__astIndex__pathFromRoot(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= x (* (sin a) b))'
+    astIndex = AstIndex(Schemeparser(equationStr=equationStr).ast)
+    path = astIndex.pathFromRoot(('a', 5))
+    if verbose:
+        pp.pprint(path)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        astIndex.root == ('=', 0) and
+        path == [(('=', 0), None), (('*', 2), 1), (('sin', 3), 0), (('a', 5), 0)] and
+        list(astIndex.ancestors(('b', 4))) == [('*', 2), ('=', 0)]
+    ))
+
+
+def test__astIndex__replaceRows(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= a (+ b c))'
+    ast = Schemeparser(equationStr=equationStr).ast
+    astIndex = AstIndex(ast)
+    #(= a (+ b c)) => (= b (- a c))
+    oldRows = {('=', 0):ast[('=', 0)], ('+', 2):ast[('+', 2)]}
+    newRows = {('=', 0):[('b', 3), ('-', 2)], ('-', 2):[('a', 1), ('c', 4)]}
+    astIndex.replaceRows(oldRows, newRows)
+    if verbose:
+        pp.pprint(astIndex.parent)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        astIndex.parentOf(('a', 1)) == ('-', 2) and astIndex.argumentIdxOf(('a', 1)) == 0 and
+        astIndex.parentOf(('b', 3)) == ('=', 0) and astIndex.argumentIdxOf(('b', 3)) == 0 and
+        ('+', 2) not in astIndex.parent and
+        astIndex.pathFromRoot(('c', 4)) == [(('=', 0), None), (('-', 2), 1), (('c', 4), 1)]
+    ))
+
+
+def test__astIndex__labelAndKindIndex(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    from foundation.automat.core.simplifier import Simplifier
+    equationStr = '(= y (+ (sin (* 2 x)) (sin (+ x 0))))'
+    ast = Schemeparser(equationStr=equationStr).ast
+    astIndex = AstIndex(ast)
+    sinNodes, xNodes = sorted(astIndex.nodesOf('sin')), sorted(astIndex.nodesOf('x'))
+    simplifier = Simplifier(ast) # keeps its AstIndex up to date with replaceRows, while it removes the + 0
+    simplifiedAst = simplifier.simplify()
+    rebuiltIndex = AstIndex(simplifiedAst)
+    if verbose:
+        pp.pprint(astIndex.labelNodes)
+        pp.pprint(simplifier.astIndex.labelNodes)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(sinNodes) == 2 and all(astIndex.kindOf(node) == 'function' for node in sinNodes) and
+        len(xNodes) == 2 and all(astIndex.kindOf(node) == 'variable' for node in xNodes) and
+        sorted(astIndex.nodesOfKind('primitive')) == sorted(astIndex.nodesOf('2') + astIndex.nodesOf('0')) and
+        astIndex.kindOf(('=', 0)) == 'function' and astIndex.nodesOf('cos') == [] and
+        astIndex.depthOf(xNodes[0]) == 4 and
+        simplifier.astIndex.nodesOf('0') == [] and # taken out with the + 0
+        simplifier.astIndex.kind == rebuiltIndex.kind and
+        dict((label, set(nodes)) for label, nodes in simplifier.astIndex.labelNodes.items()) ==
+        dict((label, set(nodes)) for label, nodes in rebuiltIndex.labelNodes.items())
+    ))
+
+
+if __name__=='__main__':
+    test__astIndex__pathFromRoot()
+    test__astIndex__replaceRows()
+    test__astIndex__labelAndKindIndex()
@@ -0,0 +1,48 @@
+import inspect
+import math
+import pprint
+
+from foundation.automat.core.blockedevaluator import BlockedEvaluator
+from foundation.automat.core.equation import Equation
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__blockedEvaluator__reusesBuffers(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    ast = Schemeparser(equationStr='(= z (+ (* (sin (* x 2)) a) (* (sin (* x 2)) (sec b))))').ast
+    evaluator = BlockedEvaluator(ast, ('=', 0), ['a', 'b', 'x'], blockSize=100)
+    if verbose:
+        print(evaluator.source)
+    x = np.linspace(0, 1, 1234) # last block is shorter
+    values = evaluator.evaluate({'a':1.5, 'b':0.25, 'x':x}, threads=3)
+    expected = np.sin(x*2)*1.5 + np.sin(x*2)/math.cos(0.25)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        evaluator.source.count('sin(') == 1 and
+        evaluator.bufferCount < 5 and # 5 function nodes below +, buffers are reused
+        values.shape == (1234,) and
+        np.allclose(values, expected, rtol=0, atol=1e-12)
+    ))
+
+
+def test__blockedEvaluator__sameAsEvaluate(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= (- x (/ y 2)) (^ e (* 3 (sin q))))', 'scheme')
+    x = np.linspace(2, 3, 5001).reshape(1667, 3)
+    values = eq0.evaluate({'x':x, 'y':2.0, 'e':math.e})
+    blockedValues = eq0.evaluate({'x':x, 'y':2.0, 'e':math.e}, blockSize=256, threads=4)
+    if verbose:
+        print(eq0.blockedEvaluator('q', blockSize=256).source)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        blockedValues.shape == (1667, 3) and
+        np.allclose(blockedValues, values, rtol=0, atol=1e-12) and
+        eq0.blockedEvaluator('q', blockSize=256) is eq0.blockedEvaluator('q', blockSize=256) # kept on the equation
+    ))
+
+
+if __name__=='__main__':
+    test__blockedEvaluator__reusesBuffers()
+    test__blockedEvaluator__sameAsEvaluate()
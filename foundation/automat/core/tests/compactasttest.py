@@ -0,0 +1,96 @@
+import inspect
+import pprint
+import sys
+from copy import deepcopy
+
+from foundation.automat.core.compactast import CompactAst
+from foundation.automat.core.equation import Equation
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__compactAst__roundTrip(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= (^ e (* i x)) (+ (cos x) (* i (sin x))))'
+    parser = Schemeparser(equationStr=equationStr)
+    compactAst = CompactAst.fromAst(parser.ast)
+    if verbose:
+        pp.pprint(compactAst.toAst())
+    expected_labels = ['=', '^', 'e', '*', 'i', 'x', '+', 'cos', 'sin']
+    expected_kinds = [CompactAst.FUNCTION, CompactAst.FUNCTION, CompactAst.VARIABLE, CompactAst.FUNCTION,
+                      CompactAst.VARIABLE, CompactAst.VARIABLE, CompactAst.FUNCTION, CompactAst.FUNCTION,
+                      CompactAst.VARIABLE, CompactAst.FUNCTION, CompactAst.VARIABLE, CompactAst.FUNCTION,
+                      CompactAst.VARIABLE]
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        compactAst.toAst() == parser.ast and
+        compactAst.labels == expected_labels and
+        list(compactAst.kinds) == expected_kinds and
+        compactAst.subtreeEnd(1) == 6 and # (^ e (* i x)) is 5 nodes, starting from index 1
+        compactAst.subtreeEnd(0) == len(compactAst)
+    ))
+
+
+def test__compactAst__viewActsLikeDictionary(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= (/ 1 a) (+ (/ 1 b) (/ 1 c)))'
+    parser = Schemeparser(equationStr=equationStr)
+    view = CompactAst.fromAst(parser.ast).view()
+    if verbose:
+        pp.pprint(dict(view))
+    copied = deepcopy(view) # copies are plain dictionaries, that can be edited
+    copied[('/', 1)] = []
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        dict(view) == parser.ast and
+        len(view) == len(parser.ast) and
+        ('+', 2) in view and
+        ('a', 4) not in view and # leaves are not keys
+        ('+', 3) not in view and # label does not match the id
+        view[('/', 6)] == [('1', 9), ('c', 10)] and
+        isinstance(copied, dict) and view[('/', 1)] == [('1', 3), ('a', 4)] and
+        Schemeparser(ast=view)._unparse() == equationStr
+    ))
+
+
+def test__compactAst__equationCompact(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= z (+ (* (sin (* (+ x 1) (- x 1))) a) (+ (* (sin (* (+ x 1) (- x 1))) b) (* (sin (* (+ x 1) (- x 1))) c))))'
+    eq0 = Equation(equationStr, 'scheme')
+    eq1 = Equation(equationStr, 'scheme', compact=True)
+    rootNode = None
+    for nonLeaf in eq1.ast.keys():
+        if str(nonLeaf[0]) == 'sin':
+            rootNode = nonLeaf
+            break
+    subTree = eq1._cutSubASTAtRoot(rootNode)
+    if verbose:
+        pp.pprint(subTree)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        dict(eq1.ast) == eq0.ast and
+        subTree == eq0._cutSubASTAtRoot(rootNode) and
+        Schemeparser(ast=eq1.ast)._unparse() == equationStr
+    ))
+
+
+def test__compactAst__smallerThanDictionary(verbose=False):
+    terms = ' '.join([f'(* (sin (+ x{i} 1)) a{i})' for i in range(200)])
+    equationStr = '(= z (+ ' + terms + '))'
+    ast = Schemeparser(equationStr=equationStr).ast
+    #everything the dictionary form holds on to (labels are shared strings, so are not counted)
+    dictionaryBytes = sys.getsizeof(ast)
+    for key, children in ast.items():
+        dictionaryBytes += sys.getsizeof(key) + sys.getsizeof(children)
+        for child in children:
+            dictionaryBytes += sys.getsizeof(child)
+    compactBytes = CompactAst.fromAst(ast).nbytes()
+    if verbose:
+        print(f'dictionary: {dictionaryBytes} bytes, compact: {compactBytes} bytes')
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', compactBytes * 4 < dictionaryBytes)
+
+
+if __name__=='__main__':
+    test__compactAst__roundTrip()
+    test__compactAst__viewActsLikeDictionary()
+    test__compactAst__equationCompact()
+    test__compactAst__smallerThanDictionary()
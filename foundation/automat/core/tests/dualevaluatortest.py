@@ -0,0 +1,60 @@
+import inspect
+import pprint
+import re
+
+from foundation.automat.core.dualevaluator import DualEvaluator
+from foundation.automat.core.equation import Equation
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__dualEvaluator__partials(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    ast = Schemeparser(equationStr='(= z (+ (* (sin x) a) (/ (^ x 2) (+ 1 3))))').ast
+    evaluator = DualEvaluator(ast, ('=', 0), ['a', 'x'])
+    if verbose:
+        print(evaluator.source)
+    x = np.linspace(-1, 1, 7)
+    a = np.array([[1.0], [2.0]]) # broadcasts with x
+    values, partials = evaluator.evaluate({'a':a, 'x':x})
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        values.shape == (2, 7) and partials['a'].shape == (2, 7) and partials['x'].shape == (2, 7) and
+        np.allclose(values, np.sin(x)*a + x**2/4, rtol=0, atol=1e-12) and
+        np.allclose(partials['a'], np.broadcast_to(np.sin(x), (2, 7)), rtol=0, atol=1e-12) and
+        np.allclose(partials['x'], np.cos(x)*a + x/2, rtol=0, atol=1e-12) and
+        len(re.findall(r'^ +g\d+=', evaluator.source, re.M)) == 5 and # not for the constant (+ 1 3)
+        len(re.findall(r'^ +d\d+_\d+=', evaluator.source, re.M)) == 5 # not by (+ 1 3), and not the 1 of the top +
+    ))
+
+
+def test__dualEvaluator__sameAsFiniteDifferences(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= (- y (/ q 2)) (log b (* (cosh p) (arctan q))))', 'scheme')
+    bindings = {'b':np.array([2.0, 3.0, 10.0]), 'p':np.array([0.1, 0.5, 1.0]), 'q':np.array([0.3, 1.2, 2.0])}
+    values, partials = eq0.gradient(bindings)
+    step = 1e-6
+    finiteDifferences = {}
+    for variable in bindings.keys():
+        up = dict(bindings)
+        up[variable] = bindings[variable] + step
+        down = dict(bindings)
+        down[variable] = bindings[variable] - step
+        finiteDifferences[variable] = (eq0.evaluate(up) - eq0.evaluate(down)) / (2 * step)
+    if verbose:
+        pp.pprint(partials)
+        pp.pprint(finiteDifferences)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        sorted(partials.keys()) == ['b', 'p', 'q'] and
+        np.allclose(values, eq0.evaluate(bindings), rtol=0, atol=1e-12) and
+        all(np.allclose(partials[variable], finiteDifferences[variable], rtol=1e-6, atol=1e-8)
+            for variable in bindings.keys()) and
+        eq0.dualEvaluator('y') is eq0.dualEvaluator('y') # kept on the equation
+    ))
+
+
+if __name__=='__main__':
+    test__dualEvaluator__partials()
+    test__dualEvaluator__sameAsFiniteDifferences()
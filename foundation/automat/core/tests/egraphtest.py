@@ -0,0 +1,80 @@
+import inspect
+import pprint
+
+from foundation.automat.core.egraph import EGraph
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.rewriteengine import RewriteRule
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__eGraph__congruenceAndConstants(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    egraph = EGraph()
+    a, b = egraph.add('a'), egraph.add('b')
+    sinA, sinB = egraph.add('sin', (a,)), egraph.add('sin', (b,))
+    sameBeforeMerge = egraph.find(sinA) == egraph.find(sinB)
+    egraph.merge(a, b)
+    egraph.rebuild()
+    product = egraph.add('*', (egraph.add('2'), egraph.add('3.0'))) # folded to 6
+    stopReason = egraph.saturate([RewriteRule('(+ $x $y)', '(+ $y $x)')])
+    if verbose:
+        pp.pprint(egraph._nodes)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        not sameBeforeMerge and
+        egraph.find(sinA) == egraph.find(sinB) and # congruence, after a and b were merged
+        egraph.find(product) == egraph.find(egraph.add('6')) and
+        stopReason == 'saturated'
+    ))
+
+
+def test__eGraph__optimise(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    results = {}
+    for equationStr, cost in [('(= a (+ (* x y) (* x z)))', 'size'), ('(= a (* 2 (* 3 b)))', 'size'),
+                              ('(= a (+ (* b 1) 0))', 'size'),
+                              ('(= a (+ (* (sin x) y) (* (sin x) z)))', 'evaluation')]:
+        results[equationStr] = Schemeparser(ast=Equation(equationStr, 'scheme').optimise(cost=cost))._unparse()
+    egraph = EGraph()
+    eq0 = Equation('(= a (+ (+ (+ (+ x y) z) w) v))', 'scheme') # commutativity and associativity keep growing
+    egraph.addAst(eq0.ast, ('=', 0))
+    rules = [RewriteRule(lhs, rhs) for lhs, rhs in EGraph.ALGEBRAIC_RULES]
+    if verbose:
+        pp.pprint(results)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        results == {
+            '(= a (+ (* x y) (* x z)))':'(= a (* x (+ y z)))',
+            '(= a (* 2 (* 3 b)))':'(= a (* b 6))',
+            '(= a (+ (* b 1) 0))':'(= a b)',
+            '(= a (+ (* (sin x) y) (* (sin x) z)))':'(= a (* (sin x) (+ y z)))',
+        } and
+        egraph.saturate(rules, nodeLimit=20) == 'nodeLimit'
+    ))
+
+
+def test__eGraph__deepAndTimeLimit(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import time
+    depth = 3000 # deeper than the recursion limit
+    optimised = Equation('(= z ' + '(* 2 ' * depth + 'y' + ')' * depth + ')', 'scheme').optimise(iterationLimit=1)
+    egraph = EGraph()
+    eq0 = Equation('(= z ' + '(* (+ a b) ' * depth + 'y' + ')' * depth + ')', 'scheme')
+    egraph.addAst(eq0.ast, ('=', 0))
+    rules = [RewriteRule(lhs, rhs) for lhs, rhs in EGraph.ALGEBRAIC_RULES]
+    startTime = time.monotonic()
+    stopReason = egraph.saturate(rules, nodeLimit=10**9, timeLimit=0.2)
+    elapsed = time.monotonic() - startTime
+    if verbose:
+        pp.pprint((stopReason, elapsed, len(egraph)))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(optimised) == depth + 1 and
+        stopReason == 'timeLimit' and elapsed < 0.4 # checked while matching and merging, not once per iteration
+    ))
+
+
+if __name__=='__main__':
+    test__eGraph__congruenceAndConstants()
+    test__eGraph__optimise()
+    test__eGraph__deepAndTimeLimit()
@@ -0,0 +1,98 @@
+import inspect
+import math
+import pprint
+
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__equationCompiler__commonSubexpressionOnce(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    ast = Schemeparser(equationStr='(= z (+ (* (sin (* x 2)) a) (* (sin (* x 2)) (sec b))))').ast
+    function = EquationCompiler.compileAst(ast, ('=', 0), ['a', 'b', 'x'])
+    if verbose:
+        print(function.source)
+    expected = math.sin(0.5*2)*1.5 + math.sin(0.5*2)/math.cos(0.25)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        function.source.count('sin(') == 1 and
+        function.variables == ['a', 'b', 'x'] and
+        abs(function(1.5, 0.25, 0.5) - expected) < 1e-12
+    ))
+
+
+def test__equationCompiler__compileEquation(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= (- x (/ y 2)) (^ e (* 3 q)))', 'scheme')
+    function = eq0.compile('q') # q = log_e(x - y/2)/3
+    if verbose:
+        print(function.source)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        function.variables == ['e', 'x', 'y'] and
+        abs(function(math.e, 5.0, 2.0) - math.log(4.0)/3) < 1e-12 and
+        eq0.compile('q') is function # kept on the equation
+    ))
+
+
+def test__equationCompiler__evaluateArrays(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= (- x (/ y 2)) (^ e (* 3 (sin q))))', 'scheme')
+    x = np.linspace(2, 3, 1001)
+    values = eq0.evaluate({'x':x, 'y':2.0, 'e':math.e}) # q is the only one not bound
+    function = eq0.compile('q')
+    if verbose:
+        print(eq0.compile('q', target='numpy').source)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        values.shape == (1001,) and
+        all(abs(values[idx] - function(math.e, x[idx], 2.0)) < 1e-12 for idx in range(0, 1001, 100)) and
+        eq0.evaluate({'q':0.1, 'y':1.0, 'e':np.full((2, 3), math.e)}, variable='x').shape == (2, 3) # broadcast
+    ))
+
+
+def test__equationCompiler__reservedNamesAndNonFinite(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    huge = '1' + '0' * 400 # a primitive too long for a float, it is inf
+    ast = Schemeparser(equationStr=f'(= z (- (^ pow 2) (/ float {huge})))').ast
+    function = EquationCompiler.compileAst(ast, ('=', 0), ['pow', 'float']) # pow and float are used by the code
+    numpyFunction = EquationCompiler.compileAst(ast, ('=', 0), ['pow', 'float'], target='numpy')
+    if verbose:
+        print(function.source)
+        print(numpyFunction.source)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        'def evaluate(p0, p1):' in function.source and "float('inf')" in function.source and
+        function(3.0, 1.0) == 9.0 and numpyFunction(3.0, 1.0) == 9.0
+    ))
+
+
+def test__equationCompiler__nonFiniteInEveryGenerator(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    huge = '1' + '0' * 400 # a primitive too long for a float, it is inf
+    eq0 = Equation(f'(= y (+ (* x x) (/ 2 {huge})))', 'scheme')
+    x = np.linspace(-1, 1, 5)
+    values = eq0.compile('y', target='numpy')(x) # EquationCompiler
+    blockedValues = eq0.evaluate({'x':x}, blockSize=2) # BlockedEvaluator
+    gradientValues, partials = eq0.gradient({'x':x}) # DualEvaluator
+    if verbose:
+        print(eq0.blockedEvaluator('y', blockSize=2).source)
+        print(eq0.dualEvaluator('y').source)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        np.allclose(values, x*x, rtol=0, atol=1e-12) and
+        np.allclose(blockedValues, x*x, rtol=0, atol=1e-12) and
+        np.allclose(gradientValues, x*x, rtol=0, atol=1e-12) and
+        np.allclose(partials['x'], 2*x, rtol=0, atol=1e-12)
+    ))
+
+
+if __name__=='__main__':
+    test__equationCompiler__commonSubexpressionOnce()
+    test__equationCompiler__compileEquation()
+    test__equationCompiler__evaluateArrays()
+    test__equationCompiler__reservedNamesAndNonFinite()
+    test__equationCompiler__nonFiniteInEveryGenerator()
@@ -0,0 +1,54 @@
+import inspect
+import os
+import pprint
+import tempfile
+
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.equationfile import EquationFile
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__equationFile__roundTrip(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStrs = ['(= (^ e (* i x)) (+ (cos x) (* i (sin x))))', '(= a (+ b (* c (* d 2))))', '(= x 1)']
+    equations = [Equation(equationStr, 'scheme') for equationStr in equationStrs]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'equations.bin')
+        count = EquationFile.write(path, (equation for equation in equations))
+        with EquationFile(path) as equationFile:
+            loaded = list(equationFile)
+            if verbose:
+                pp.pprint([dict(equation.ast) for equation in loaded])
+            passed = (
+                count == 3 and len(equationFile) == 3 and
+                all(dict(loadedEquation.ast) == dict(equation.ast) and
+                    loadedEquation.functions == equation.functions and
+                    loadedEquation.variables == equation.variables and
+                    loadedEquation.primitives == equation.primitives and
+                    loadedEquation.totalNodeCount == equation.totalNodeCount and
+                    loadedEquation._eqs == equation._eqs
+                    for loadedEquation, equation in zip(loaded, equations)) and
+                isinstance(equationFile.compactAst(-1).ids, memoryview) # not copied out of the file
+            )
+            del loaded
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', passed)
+
+
+def test__equationFile__loadedCanBeSolved(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'equations.bin')
+        EquationFile.write(path, [Equation('(= a (+ b (* c (* d 2))))', 'scheme', compact=True)])
+        with EquationFile(path) as equationFile:
+            modifiedAst = equationFile[0].makeSubject('b')
+            if verbose:
+                pp.pprint(modifiedAst)
+            passed = Schemeparser(ast=modifiedAst)._unparse() == '(= b (- a (* c (* d 2))))'
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', passed)
+
+
+if __name__=='__main__':
+    test__equationFile__roundTrip()
+    test__equationFile__loadedCanBeSolved()
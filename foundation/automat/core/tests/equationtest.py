@@ -1,7 +1,11 @@
 import inspect
 import pprint
 
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.core.compactast import CompactAst
 from foundation.automat.core.equation import Equation
+from foundation.automat.core.equationcompiler import EquationCompiler
+from foundation.automat.parser.sorte import Schemeparser
 
 
 def test__onetermFactorisation__cutSubtreeAtRoot(verbose=False):
@@ -34,6 +38,198 @@ def test__onetermFactorisation__cutSubtreeAtRoot0(verbose=False):
         pp.pprint(subTree) # we are expecting the AST of (sin (* (+ x 1) (- x 1)))
 
 
+def test__makeSubject__plus(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= a (+ b c))', 'scheme')
+    modifiedAst = eq0.makeSubject('b')
+    if verbose:
+        pp.pprint(modifiedAst)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=modifiedAst)._unparse() == '(= b (- a c))' and
+        Schemeparser(ast=eq0.ast)._unparse() == '(= a (+ b c))' # eq0 is not changed
+    ))
+
+
+def test__makeSubject__nested(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= (- x (/ y 2)) (^ e (* 3 q)))', 'scheme')
+    modifiedAst = eq0.makeSubject('q')
+    if verbose:
+        pp.pprint(modifiedAst)
+    eq1 = Equation('(= x (* (sin a) b))', 'scheme')
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=modifiedAst)._unparse() == '(= q (/ (log e (- x (/ y 2))) 3))' and
+        Schemeparser(ast=eq1.makeSubject('a'))._unparse() == '(= a (arcsin (/ x b)))' and
+        Schemeparser(ast=eq1.makeSubject('x'))._unparse() == '(= x (* (sin a) b))'
+    ))
+
+
+def test__makeSubject__sharesUnchangedRows(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= z (+ (sin (* x 2)) y))', 'scheme')
+    modifiedAst = eq0.makeSubject('y')
+    if verbose:
+        pp.pprint(modifiedAst)
+    unchangedRows = [node for node in eq0.ast.keys() if node[0] in ('sin', '*')]
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=modifiedAst)._unparse() == '(= y (- z (sin (* x 2))))' and
+        len(unchangedRows) == 2 and
+        all(modifiedAst[node] is eq0.ast[node] for node in unchangedRows) # not copied
+    ))
+
+
+def test__makeSubjectAll__sameAsMakeSubject(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= (- x (/ y 2)) (^ e (* 3 (sin q))))', 'scheme')
+    subjectAsts = eq0.makeSubjectAll()
+    subjectAstsInProcesses = eq0.makeSubjectAll(processes=2)
+    eq1 = Equation.fromCompactAst(CompactAst.fromAst(eq0.ast), dict(eq0.functions), dict(eq0.variables), eq0.primitives,
+                                  eq0.totalNodeCount) # no equation string to parse again
+    if verbose:
+        pp.pprint(dict((variable, Schemeparser(ast=ast)._unparse()) for variable, ast in subjectAsts.items()))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        sorted(subjectAsts.keys()) == ['e', 'q', 'x', 'y'] and
+        Schemeparser(ast=subjectAsts['q'])._unparse() == '(= q (arcsin (/ (log e (- x (/ y 2))) 3)))' and
+        all(ast == eq0.makeSubject(variable) for variable, ast in subjectAsts.items()) and
+        subjectAstsInProcesses == subjectAsts and
+        eq1.makeSubjectAll(processes=2) == subjectAsts
+    ))
+
+
+def test__makeSubject__solveCache(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    Equation.SOLVE_CACHE.clear()
+    eq0 = Equation('(= a (+ b (sin c)))', 'scheme')
+    modifiedAst0 = eq0.makeSubject('c')
+    modifiedAst0[('=', 0)].append(('junk', 99)) # the cache keeps its own rows
+    modifiedAst1 = Equation('(= a (+ b (sin c)))', 'scheme').makeSubject('c') # same ids, a new copy
+    eq2 = Equation('(= a (+ b (sin c)))', 'scheme') # same structure, but ids shifted by 10
+    eq2.ast = PersistentMap.fromMapping(dict(
+        ((node[0], node[1]+10), [(child[0], child[1]+10) for child in children]) for node, children in eq2.ast.items()))
+    modifiedAst2 = eq2.makeSubject('c')
+    if verbose:
+        pp.pprint(modifiedAst2)
+        pp.pprint(Equation.SOLVE_CACHE)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        modifiedAst0[('=', 0)][-1] == ('junk', 99) and
+        Schemeparser(ast=modifiedAst1)._unparse() == '(= c (arcsin (- a b)))' and
+        modifiedAst1 is not modifiedAst0 and len(modifiedAst1[('=', 0)]) == 2 and
+        Schemeparser(ast=modifiedAst2)._unparse() == '(= c (arcsin (- a b)))' and
+        all(node[1] >= 10 for node in modifiedAst2.keys()) and
+        Equation.SOLVE_CACHE.hits == 2 and Equation.SOLVE_CACHE.misses == 1
+    ))
+
+
+def test__makeSubject__concurrentThreads(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    from concurrent.futures import ThreadPoolExecutor
+    eq0 = Equation('(= a (+ (* b (sin c)) (/ (^ d 2) (- e f))))', 'scheme')
+    originalAst, originalStats = eq0.ast, (dict(eq0.functions), dict(eq0.variables), eq0.primitives, eq0.totalNodeCount)
+    variables = ['b', 'c', 'd', 'e', 'f']
+    expected = dict((variable, Schemeparser(ast=eq0.makeSubject(variable))._unparse()) for variable in variables)
+    results = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(20):
+            Equation.SOLVE_CACHE.clear() # so that the threads invert, not only read the cache
+            futures = [(variable, executor.submit(eq0.makeSubject, variable)) for variable in variables * 4]
+            results += [(variable, Schemeparser(ast=future.result())._unparse()) for variable, future in futures]
+    if verbose:
+        pp.pprint(expected)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        all(subjectStr == expected[variable] for variable, subjectStr in results) and len(results) == 400 and
+        eq0.ast is originalAst and
+        (eq0.functions, eq0.variables, eq0.primitives, eq0.totalNodeCount) == originalStats
+    ))
+
+
+def test__makeSubject__polynomialRoots(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= 0 (+ (* a (^ x 2)) (+ (* b x) c)))', 'scheme')
+    quadraticRoots = [Schemeparser(ast=subjectAst)._unparse() for subjectAst in eq0.makeSubject('x')]
+    rootsOf = lambda equationStr: np.sort([float(subjectAst[('=', 0)][1][0]) # (= x number)
+                                           for subjectAst in Equation(equationStr, 'scheme').makeSubject('x')])
+    realRootsOf = lambda coefficients: np.sort(np.real([root for root in np.roots(coefficients) if abs(np.imag(root)) < 1e-9]))
+    y = np.linspace(-12, 12, 9) # (x-1)(x-2)(x-5) = y has 3 real roots only for y in [-6.065, 0.879], y[4] is 0
+    cubic = [rootsOf(f'(= {yValue} (* (- x 1) (* (- x 2) (- x 5))))') for yValue in y]
+    quartic = [rootsOf(f'(= {yValue} (* (+ x 3) (* (- x 1) (* (- x 2) (- x 5)))))') for yValue in y]
+    expected = [realRootsOf([1, -8, 17, -10 - yValue]) for yValue in y] + \
+        [realRootsOf([1, -5, -7, 41, -30 - yValue]) for yValue in y]
+    oneRealRoot, twoRealRoots = rootsOf('(= (+ (^ x 3) x) 2)'), rootsOf('(= (+ (^ x 4) x) 3)')
+    try:
+        Equation('(= y (* (- x 1) (* (- x 2) (- x 5))))', 'scheme').makeSubject('x') # 1 or 3 real roots, depends on y
+        symbolicRaised = False
+    except Exception:
+        symbolicRaised = True
+    try:
+        Equation('(= y (+ x (sin x)))', 'scheme').makeSubject('x') # not a polynomial in x
+        raised = False
+    except Exception:
+        raised = True
+    if verbose:
+        pp.pprint(quadraticRoots)
+        pp.pprint(cubic)
+        pp.pprint(quartic)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        quadraticRoots == ['(= x (/ (+ (* -1 b) (nroot 2 (- (^ b 2) (* 4 (* a c))))) (* 2 a)))',
+                           '(= x (/ (+ (* -1 b) (* -1 (nroot 2 (- (^ b 2) (* 4 (* a c)))))) (* 2 a)))'] and
+        all(len(roots) == len(expectedRoots) and np.allclose(roots, expectedRoots, rtol=0, atol=1e-7)
+            for roots, expectedRoots in zip(cubic + quartic, expected)) and
+        [len(roots) for roots in cubic] == [1, 1, 3, 3, 3, 1, 1, 1, 1] and
+        np.allclose(quartic[4], [-3, 1, 2, 5]) and np.allclose(cubic[4], [1, 2, 5]) and
+        np.allclose(oneRealRoot, [1]) and # x^3+x-2 = (x-1)(x^2+x+2)
+        len(twoRealRoots) == 2 and np.allclose(twoRealRoots ** 4 + twoRealRoots - 3, 0, rtol=0, atol=1e-12) and
+        symbolicRaised and
+        raised
+    ))
+
+
+def test__onetermFactorisation__findAllDistributivePaths(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= z (+ (* 2 a) (+ (* 2 b) (+ (* 2 c) (+ (* 2 d) (+ (* 2 e) (+ (* 2 f) (+ (* 2 g) (+ (* 2 h) (+ (* 2 i) (+ (* 2 j) (* 2 k))))))))))))', 'scheme')
+    distributivePaths = eq0._findAllDistributivePaths('+', '*')
+    if verbose:
+        pp.pprint(distributivePaths)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(distributivePaths) == 1 and
+        len(distributivePaths[0]) == 11 and
+        all(termNode[0] == '*' for termNode in distributivePaths[0])
+    ))
+
+
+def test__onetermFactorisation__findCommonFactorOfDistributivePath(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= z (+ (* 2 a) (+ (* 2 b) (+ (* 2 c) (+ (* 2 d) (+ (* 2 e) (+ (* 2 f) (+ (* 2 g) (+ (* 2 h) (+ (* 2 i) (+ (* 2 j) (* 2 k))))))))))))', 'scheme')
+    commonFactors0 = eq0._findCommonFactorOfDistributivePath(eq0._findAllDistributivePaths('+', '*')[0])
+    eq1 = Equation('(= z (+ (* (sin (* (+ x 1) (- x 1))) a) (+ (* b (sin (* (+ x 1) (- x 1)))) (* c (* 2 (sin (* (+ x 1) (- x 1))))))))', 'scheme')
+    commonFactors1 = eq1._findCommonFactorOfDistributivePath(eq1._findAllDistributivePaths('+', '*')[0])
+    if verbose:
+        pp.pprint(commonFactors0)
+        pp.pprint(commonFactors1)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(commonFactors0) == 1 and list(commonFactors0[0].keys())[0][0] == '2' and
+        len(commonFactors1) == 1 and sorted(node[0] for node in commonFactors1[0].keys()) == ['*', '+', '-', 'sin'] # (sin (* (+ x 1) (- x 1)))
+    ))
+
+
 if __name__=='__main__':
     test__onetermFactorisation__cutSubtreeAtRoot()
-    test__onetermFactorisation__cutSubtreeAtRoot0()
\ No newline at end of file
+    test__onetermFactorisation__cutSubtreeAtRoot0()
+    test__makeSubject__plus()
+    test__makeSubject__nested()
+    test__makeSubject__sharesUnchangedRows()
+    test__makeSubjectAll__sameAsMakeSubject()
+    test__makeSubject__solveCache()
+    test__makeSubject__concurrentThreads()
+    test__makeSubject__polynomialRoots()
+    test__onetermFactorisation__findAllDistributivePaths()
+    test__onetermFactorisation__findCommonFactorOfDistributivePath()
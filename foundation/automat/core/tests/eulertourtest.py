@@ -0,0 +1,78 @@
+import inspect
+import pprint
+
+from foundation.automat.common.persistentmap import PersistentMap
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.eulertour import EulerTour
+
+
+def test__eulerTour__slicesAndAncestors(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= z (+ (* (sin (* (+ x 1) (- x 1))) a) (* (sin (* (+ x 1) (- x 1))) b)))', 'scheme')
+    eulerTour = eq0.eulerTour()
+    nodes = eulerTour.order
+    sinNodes = eq0.astIndex.nodesOf('sin')
+    sameSubAsts = True
+    for node in eq0.astIndex.nodesOfKind('function'): # same as a DFS from node
+        subAst, stack = {}, [node]
+        while len(stack) > 0:
+            current = stack.pop()
+            if current in eq0.ast:
+                subAst[current] = eq0.ast[current]
+                stack += eq0.ast[current]
+        sameSubAsts = sameSubAsts and eq0._cutSubASTAtRoot(node) == subAst
+    sameAncestors = all(eulerTour.isAncestor(ancestor, node) == (ancestor in set(eq0.astIndex.ancestors(node)))
+                        for ancestor in nodes for node in nodes)
+    if verbose:
+        pp.pprint(eulerTour.order)
+        pp.pprint(eq0._cutSubASTAtRoot(sinNodes[0]))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(nodes) == len(eq0.astIndex.parent) + 1 and eulerTour.subtreeSize(eq0.astIndex.root) == len(nodes) and
+        sameSubAsts and sameAncestors and
+        eulerTour.subtreeSize(sinNodes[0]) == 8 and
+        eulerTour.structureOf(sinNodes[0], eq0.ast) == eulerTour.structureOf(sinNodes[1], eq0.ast) and # identical
+        eulerTour.structureOf(sinNodes[0], eq0.ast) != eulerTour.structureOf(eq0.ast[('=', 0)][1], eq0.ast) and
+        eq0.eulerTour() is eulerTour # kept, self.ast was not replaced
+    ))
+
+
+def test__eulerTour__replaceRows(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= z (+ (* (+ x 1) a) (- (cos y) b)))', 'scheme')
+    ast = PersistentMap.fromMapping(eq0.ast)
+    eulerTour = EulerTour(ast, ('=', 0))
+    plusNode = eq0.ast[eq0.ast[('=', 0)][1]][0] # (* (+ x 1) a)
+    innerPlusNode = eq0.ast[plusNode][0] # (+ x 1)
+    cosNode = eq0.astIndex.nodesOf('cos')[0]
+    rewrites = [ # (oldRows, newRows), applied in order
+        ({innerPlusNode:ast[innerPlusNode]}, # (+ x 1) => (+ (sin (* x x)) 1), grows
+         {innerPlusNode:[('sin', 100), ('1', 101)], ('sin', 100):[('*', 102)], ('*', 102):[('x', 103), ('x', 104)]}),
+        ({cosNode:ast[cosNode], eq0.ast[('=', 0)][1]:ast[eq0.ast[('=', 0)][1]]}, # (cos y) => y, shrinks
+         {eq0.ast[('=', 0)][1]:[plusNode, ('-', 105)], ('-', 105):[('y', 106), ('b', 107)]}),
+        ({('=', 0):ast[('=', 0)]}, {('=', 0):list(reversed(ast[('=', 0)]))}), # the root, laid out again
+    ]
+    sameAsRebuilt = []
+    for oldRows, newRows in rewrites:
+        oldRows = dict((node, ast[node]) for node in oldRows.keys()) # rows as they are now
+        for node in oldRows.keys():
+            ast = ast.delete(node)
+        ast = ast.setMany(newRows)
+        eulerTour.replaceRows(oldRows, newRows, ast)
+        rebuilt = EulerTour(ast, ('=', 0))
+        sameAsRebuilt.append(eulerTour.order == rebuilt.order and eulerTour.enter == rebuilt.enter and
+                             eulerTour.exit == rebuilt.exit and eulerTour.parent == rebuilt.parent)
+    if verbose:
+        pp.pprint(eulerTour.order)
+        pp.pprint(sameAsRebuilt)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        sameAsRebuilt == [True, True, True] and
+        eulerTour.isAncestor(innerPlusNode, ('x', 104)) and not eulerTour.isAncestor(('-', 105), ('x', 104)) and
+        cosNode not in eulerTour.enter
+    ))
+
+
+if __name__=='__main__':
+    test__eulerTour__slicesAndAncestors()
+    test__eulerTour__replaceRows()
@@ -0,0 +1,48 @@
+import inspect
+import pprint
+
+from foundation.automat.core.hashconsedast import HashConsedAst
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__hashConsedAst__identicalSubtreesShareNode(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    equationStr = '(= (+ (sin (* x 2)) (cos (* x 2))) (- (sin (* x 2)) (* 2 x)))'
+    ast = Schemeparser(equationStr=equationStr).ast
+    hashConsedAst = HashConsedAst.fromAst(ast, ('=', 0))
+    if verbose:
+        pp.pprint(hashConsedAst.nodeToDagId)
+    sinNodes = [node for node in ast.keys() if node[0] == 'sin']
+    timesNodes = [node for node in ast.keys() if node[0] == '*']
+    reversedTimes = [node for node in timesNodes if ast[node][0][0] == '2'] # (* 2 x) is not (* x 2)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(sinNodes) == 2 and hashConsedAst.sameSubtree(sinNodes[0], sinNodes[1]) and
+        hashConsedAst.hashOf(sinNodes[0]) == hashConsedAst.hashOf(sinNodes[1]) and
+        len(reversedTimes) == 1 and
+        all(not hashConsedAst.sameSubtree(reversedTimes[0], node) for node in timesNodes if node != reversedTimes[0]) and
+        len(hashConsedAst) == 9 and # =, +, -, (sin (* x 2)), (cos (* x 2)), (* x 2), (* 2 x), x, 2
+        sorted(len(nodes) for nodes in hashConsedAst.commonSubexpressions().values()) == [2, 3] # (sin (* x 2)), (* x 2)
+    ))
+
+
+def test__hashConsedAst__hashIsStructural(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    #same tree, different ids
+    hashConsedAst0 = HashConsedAst.fromAst(Schemeparser(equationStr='(= a (+ (* b c) d))').ast, ('=', 0))
+    hashConsedAst1 = HashConsedAst.fromAst(Schemeparser(equationStr='(= e (- f (+ (* b c) d)))').ast, ('=', 0))
+    plus0 = [node for node in hashConsedAst0.nodeToDagId if node[0] == '+'][0]
+    plus1 = [node for node in hashConsedAst1.nodeToDagId if node[0] == '+'][0]
+    if verbose:
+        pp.pprint((plus0, plus1))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        plus0[1] != plus1[1] and
+        hashConsedAst0.hashOf(plus0) == hashConsedAst1.hashOf(plus1) and
+        hashConsedAst0.hashOf(('=', 0)) != hashConsedAst1.hashOf(('=', 0))
+    ))
+
+
+if __name__=='__main__':
+    test__hashConsedAst__identicalSubtreesShareNode()
+    test__hashConsedAst__hashIsStructural()
@@ -0,0 +1,78 @@
+import inspect
+import pprint
+
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.polynomial import Polynomial
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__polynomial__arithmetic(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    x, y = Polynomial.variable('x'), Polynomial.variable('y')
+    cube = (x + y) ** 3
+    dense = (x + 1) ** 40 # 41 coefficients, so (x+1)^40 * (x+1)^40 is convolved
+    sparse = Polynomial(('x',), dict(((power,), 1) for power in range(0, 200, 50))) # not dense, so not convolved
+    coefficients = (cube - y ** 3).coefficients('y')
+    convolved, multiplied = dense * dense, (x + 1) ** 80 # numpy.convolve is in floating point
+    if verbose:
+        pp.pprint(cube)
+        pp.pprint(coefficients)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        cube.terms == {(3, 0):1, (2, 1):3, (1, 2):3, (0, 3):1} and
+        (x - y) * (x + y) == x ** 2 - y ** 2 and
+        (x - x).terms == {} and (x - x).degree() == -1 and
+        Polynomial._isDense(dense.terms) and not Polynomial._isDense(sparse.terms) and
+        convolved.terms.keys() == multiplied.terms.keys() and
+        all(abs(convolved.terms[exponents] - coefficient) <= 1e-14 * coefficient
+            for exponents, coefficient in multiplied.terms.items()) and
+        ((x + 1) ** 20).terms[(10,)] == 184756 and # below DENSE_DEGREE, exact
+        (sparse * sparse).degree('x') == 300 and len((sparse * sparse).terms) == 7 and
+        coefficients[1] == 3 * x ** 2 and coefficients[2] == 3 * x and coefficients[0] == x ** 3 and 3 not in coefficients
+    ))
+
+
+def test__polynomial__expandEquation(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= (* (+ x 1) (- x 1)) (+ (* 2 (* x (sin a))) (/ (* 3 x) 2)))', 'scheme')
+    expanded = Schemeparser(ast=eq0.expand())._unparse()
+    rhsPolynomial = Polynomial.fromAst(eq0.ast, eq0.ast[('=', 0)][1], opaque=True)
+    try:
+        Polynomial.fromAst(eq0.ast, eq0.ast[('=', 0)][1]) # (sin a) is not a polynomial
+        raised = False
+    except Exception:
+        raised = True
+    eq1 = Equation('(= y (^ (+ x 1) 0.5))', 'scheme') # not a whole power, kept as it is
+    if verbose:
+        pp.pprint(expanded)
+        pp.pprint(rhsPolynomial.coefficients('x'))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        expanded == '(= (- (^ x 2) 1) (+ (* (* 2 (sin a)) x) (* 1.5 x)))' and
+        rhsPolynomial.degree('x') == 1 and list(rhsPolynomial.atoms.keys()) == ['(sin a)'] and
+        raised and
+        Schemeparser(ast=eq1.expand())._unparse() == '(= y (^ (+ x 1) 0.5))'
+    ))
+
+
+def test__polynomial__polishedRoots(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    x = Polynomial.variable('x')
+    cardano = [Schemeparser(ast=ast)._unparse() for ast in Equation('(= (^ x 3) (+ x 6))', 'scheme').makeSubject('x')]
+    ferrari = (x - 1) * (x - 2) * (x - 3) * (x - 4)
+    plastic = float((x ** 3 - x - 1).roots('x')[0][0]) # not an integer, only polished
+    if verbose:
+        pp.pprint(cardano)
+        pp.pprint(ferrari.roots('x'))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        cardano == ['(= x 2)'] and # not 1.9999999999999978
+        sorted(root[0] for root in ferrari.roots('x')) == ['1', '2', '3', '4'] and
+        abs(plastic ** 3 - plastic - 1) < 1e-15
+    ))
+
+
+if __name__=='__main__':
+    test__polynomial__arithmetic()
+    test__polynomial__expandEquation()
+    test__polynomial__polishedRoots()
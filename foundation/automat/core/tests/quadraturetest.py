@@ -0,0 +1,55 @@
+import inspect
+import pprint
+
+from foundation.automat.arithmetic.sfunctor.integrate import Integrate
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.quadrature import GaussKronrod
+
+
+def test__gaussKronrod__manyIntegrals(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    widths = np.array([1.0, 0.1, 0.01, 0.001]) # narrower peaks need more intervals
+    quadrature = GaussKronrod(absoluteTolerance=1e-10, relativeTolerance=1e-10)
+    values, errors, converged = quadrature.integrate(
+        lambda x, rows: widths[rows] / ((x - 0.3)**2 + widths[rows]**2), np.full(4, -1.0), 1.0) # peak at 0.3, 4 parameter sets
+    expected = np.arctan(0.7 / widths) + np.arctan(1.3 / widths)
+    rounds = quadrature.rounds
+    _, _, convergedWithFewIntervals = GaussKronrod(maxIntervals=2).integrate(
+        lambda x, rows: widths[rows] / ((x - 0.3)**2 + widths[rows]**2), np.full(4, -1.0), 1.0)
+    if verbose:
+        pp.pprint(values - expected)
+        pp.pprint(errors)
+        pp.pprint((rounds, quadrature.evaluations))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        converged.all() and
+        np.allclose(values, expected, rtol=1e-10, atol=0) and
+        (errors >= np.abs(values - expected)).all() and # the estimate is not too small
+        rounds < 40 and
+        convergedWithFewIntervals[0] and not convergedWithFewIntervals[-1] # the narrowest peak needs more than 2 intervals
+    ))
+
+
+def test__integrate__definiteWithParameters(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= y (int (* a (sin (* a x))) x 0 b))', 'scheme')
+    intNode = eq0.ast[('=', 0)][1]
+    a = np.linspace(1, 20, 1000).reshape(1, 1000)
+    b = np.array([[1.0], [np.pi]]) # the limits are parameters too
+    integrate = Integrate(eq0)
+    values, errors, converged = integrate.definite(intNode, {'a':a, 'b':b})
+    if verbose:
+        pp.pprint((integrate.quadrature.rounds, integrate.quadrature.evaluations))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        values.shape == (2, 1000) and converged.all() and
+        np.allclose(values, 1 - np.cos(a * b), rtol=0, atol=1e-10) and
+        integrate.quadrature.evaluations < 2000 * 15 * 20 # about a few intervals for each of the 2000 integrals
+    ))
+
+
+if __name__=='__main__':
+    test__gaussKronrod__manyIntegrals()
+    test__integrate__definiteWithParameters()
@@ -0,0 +1,75 @@
+import inspect
+import pprint
+
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.rewriteengine import RewriteEngine
+from foundation.automat.core.simplifier import Simplifier
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__rewriteEngine__onlyApplicableRules(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    engine = RewriteEngine([('(* $x 1)', '$x'), ('(* $x $x)', '(^ $x 2)'), ('(sin (- 0 $x))', '(- 0 (sin $x))')])
+    for idx in range(2000): # rules with other heads, never tried on the nodes below
+        engine.addRule(f'(f{idx} $x #y)', f'(f{idx} #y $x)')
+    ast = Equation('(= a (+ (* (sin b) (sin b)) (* c 1)))', 'scheme').ast
+    squareCandidates = engine.candidates(ast, ('*', 3))
+    oneCandidates = engine.candidates(ast, ('*', 4))
+    if verbose:
+        pp.pprint(squareCandidates)
+        pp.pprint(oneCandidates)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(engine.rules) == 2003 and
+        [rule.name for rule in squareCandidates] == ['(* $x $x) -> (^ $x 2)'] and
+        [rule.name for rule in oneCandidates] == ['(* $x 1) -> $x', '(* $x $x) -> (^ $x 2)'] and
+        engine.match(ast, ('*', 4))[0].name == '(* $x 1) -> $x' and
+        engine.match(ast, ('*', 3))[1] == {'$x':('sin', 5)} and
+        engine.match(ast, ('+', 2)) is None
+    ))
+
+
+def test__rewriteEngine__rewriteWithSimplifier(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    engine = RewriteEngine([('(* $x (+ $y $z))', '(+ (* $x $y) (* $x $z))')]) # x is copied
+    ast = Equation('(= a (* (sin b) (+ c 1)))', 'scheme').ast
+    rewrittenAst = Simplifier(ast, engine=engine).simplify()
+    if verbose:
+        pp.pprint(rewrittenAst)
+    nodes = set(rewrittenAst.keys()).union(*rewrittenAst.values())
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=rewrittenAst)._unparse() == '(= a (+ (* (sin b) c) (* (sin b) 1)))' and
+        len(set(node[1] for node in nodes)) == len(nodes) # the copy of (sin b) has new ids
+    ))
+
+
+def test__rewriteEngine__repeatedVariableLeavesNoOrphans(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    from foundation.automat.core.astindex import AstIndex
+    cancelledAst = Equation('(= y (+ c (- (* (sin a) b) (* (sin a) b))))', 'scheme').simplify() # (- $x $x) -> 0
+    engine = RewriteEngine([('(* $x $x)', '(^ $x 2)')]) # the first (sin (+ a b)) is reused, the second is removed
+    squaredAst = Simplifier(Equation('(= y (* (sin (+ a b)) (sin (+ a b))))', 'scheme').ast, engine=engine).simplify()
+    reachable = {}
+    for rewrittenAst in (cancelledAst, squaredAst):
+        stack, nodes = [('=', 0)], set()
+        while len(stack) > 0:
+            current = stack.pop()
+            nodes.add(current)
+            stack += rewrittenAst.get(current, [])
+        reachable[id(rewrittenAst)] = nodes
+    if verbose:
+        pp.pprint(cancelledAst)
+        pp.pprint(squaredAst)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        dict(cancelledAst) == {('=', 0):[('y', 1), ('c', 3)]} and AstIndex(cancelledAst).root == ('=', 0) and
+        Schemeparser(ast=squaredAst)._unparse() == '(= y (^ (sin (+ a b)) 2))' and
+        all(node in reachable[id(squaredAst)] for node in squaredAst.keys()) # no rows of the second (sin (+ a b))
+    ))
+
+
+if __name__=='__main__':
+    test__rewriteEngine__onlyApplicableRules()
+    test__rewriteEngine__rewriteWithSimplifier()
+    test__rewriteEngine__repeatedVariableLeavesNoOrphans()
@@ -0,0 +1,73 @@
+import inspect
+import pprint
+
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.rootfinder import RootFinder
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__rootFinder__bracketAndNewton(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    ast = Schemeparser(equationStr='(= x (* a (cos x)))').ast # x appears twice, cannot be made the subject
+    rootFinder = RootFinder(ast, ('=', 0), 'x', ['a'])
+    a = np.linspace(0.1, 5, 10000)
+    roots, converged = rootFinder.solve({'a':a}) # bracketed from guess
+    bracketedRoots, bracketedConverged = rootFinder.solve({'a':a}, lower=0, upper=2) # x - a cos(x) increases in [0, 2]
+    if verbose:
+        pp.pprint((rootFinder.iterations, rootFinder.evaluations))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        roots.shape == (10000,) and converged.all() and bracketedConverged.all() and
+        np.allclose(roots, a * np.cos(roots), rtol=0, atol=1e-10) and
+        np.allclose(bracketedRoots, roots, rtol=0, atol=1e-10) and
+        rootFinder.evaluations < 20 * 10000 # only the open rows are evaluated at each iteration
+    ))
+
+
+def test__rootFinder__convergenceMask(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    eq0 = Equation('(= y (+ (^ x 2) x))', 'scheme')
+    y = np.array([2.0, -1.0, 6.0]) # x^2+x=-1 has no real root
+    roots, converged = eq0.solveNumerically('x', {'y':y}, guess=np.array([0.5, 0.5, -5.0]))
+    eq2 = Equation('(= (* x (sin x)) c)', 'scheme')
+    bracketedRoots, bracketedConverged = eq2.solveNumerically('x', {'c':np.array([2.0, 1.0])}, lower=0, upper=2)
+    eq1 = Equation('(= (+ t (sin t)) c)', 'scheme')
+    values = eq1.evaluate({'c':np.array([0.0, 1.0, 2.0])}) # t appears twice, so evaluate solves numerically
+    if verbose:
+        pp.pprint(roots)
+        pp.pprint(values)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        converged.tolist() == [True, False, True] and
+        np.allclose(roots[[0, 2]], [1.0, -3.0], rtol=0, atol=1e-12) and
+        np.allclose(values + np.sin(values), [0.0, 1.0, 2.0], rtol=0, atol=1e-12) and
+        bracketedConverged.tolist() == [False, True] and np.isnan(bracketedRoots[0]) and # x sin(x) < 2 in [0, 2]
+        0 < bracketedRoots[1] < 2 and abs(bracketedRoots[1] * np.sin(bracketedRoots[1]) - 1) < 1e-12
+    ))
+
+
+def test__rootFinder__sharedBetweenThreads(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    ast = Schemeparser(equationStr='(= x (* a (cos x)))').ast
+    rootFinder = RootFinder(ast, ('=', 0), 'x', ['a'])
+    aValues = [np.linspace(0.1 * k, 0.1 * k + 1, 500 + 37 * k) for k in range(1, 17)] # different lengths, different roots
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(rootFinder.solve, {'a':a}) for a in aValues * 4]
+        results = [future.result() for future in futures]
+    if verbose:
+        pp.pprint((rootFinder.iterations, rootFinder.evaluations))
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        all(roots.shape == a.shape and converged.all() and np.allclose(roots, a * np.cos(roots), rtol=0, atol=1e-10)
+            for (roots, converged), a in zip(results, aValues * 4))
+    ))
+
+
+if __name__=='__main__':
+    test__rootFinder__bracketAndNewton()
+    test__rootFinder__convergenceMask()
+    test__rootFinder__sharedBetweenThreads()
@@ -0,0 +1,73 @@
+import inspect
+import pprint
+
+from foundation.automat.arithmetic.standard.multiply import Multiply
+from foundation.automat.core.equation import Equation
+from foundation.automat.core.simplifier import Simplifier
+from foundation.automat.parser.sorte import Schemeparser
+
+
+def test__simplifier__foldAndIdentities(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    results = {}
+    for equationStr in ['(= a (+ (* b 1) (* 2 3)))', '(= a (^ (^ x 2) 3))', '(= a (- (* x y) (* x y)))',
+                        '(= a (/ (* 0 x) 1))', '(= a (sin (- 1 1)))']:
+        results[equationStr] = Schemeparser(ast=Equation(equationStr, 'scheme').simplify())._unparse()
+    if verbose:
+        pp.pprint(results)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', results == {
+        '(= a (+ (* b 1) (* 2 3)))':'(= a (+ b 6))',
+        '(= a (^ (^ x 2) 3))':'(= a (^ x 6))',
+        '(= a (- (* x y) (* x y)))':'(= a 0)',
+        '(= a (/ (* 0 x) 1))':'(= a 0)',
+        '(= a (sin (- 1 1)))':'(= a 0)',
+    })
+
+
+def test__simplifier__afterSubstituteAndBudget(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    eq0 = Equation('(= a (+ b (* c (* d 2))))', 'scheme')
+    substitutedAst = Multiply(eq0).substitute({'c':3, 'd':0}) # (= a (+ b 0.0))
+    simplifiedAst = eq0.simplify(substitutedAst)
+    if verbose:
+        pp.pprint(simplifiedAst)
+    simplifier = Simplifier(Equation('(= a (+ (* (* b 1) 1) 0))', 'scheme').ast, nodeBudget=1)
+    partlySimplifiedAst = simplifier.simplify()
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        Schemeparser(ast=simplifiedAst)._unparse() == '(= a b)' and
+        dict(simplifiedAst) == {('=', 0):[('a', 1), ('b', 3)]} and
+        simplifier.nodesVisited == 1 and
+        Schemeparser(ast=partlySimplifiedAst)._unparse() == '(= a (+ (* b 1) 0))'
+    ))
+
+
+def test__simplifier__powerOfPowerNegativeBase(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    import numpy as np
+    from foundation.automat.core.equationcompiler import EquationCompiler
+    results = {}
+    for equationStr in ['(= y (^ (^ x 2) 0.5))', '(= y (^ (^ x 2) 3))', '(= y (^ (^ x 3) 2))']:
+        eq0 = Equation(equationStr, 'scheme')
+        results[equationStr] = (Schemeparser(ast=eq0.simplify())._unparse(), Schemeparser(ast=eq0.optimise())._unparse())
+    x = np.array([-3.0, -0.5, 2.0])
+    sqrtOfSquare = EquationCompiler.compileAst(Equation('(= y (^ (^ x 2) 0.5))', 'scheme').simplify(), ('=', 0), ['x'],
+                                               target='numpy')(x)
+    if verbose:
+        pp.pprint(results)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        results == {
+            '(= y (^ (^ x 2) 0.5))':('(= y (^ (^ x 2) 0.5))', '(= y (^ (^ x 2) 0.5))'), # |x|, not x
+            '(= y (^ (^ x 2) 3))':('(= y (^ x 6))', '(= y (^ x 6))'), # c is an integer
+            '(= y (^ (^ x 3) 2))':('(= y (^ x 6))', '(= y (^ x 6))'),
+        } and
+        np.allclose(sqrtOfSquare, np.abs(x)) # still right for a negative base
+    ))
+
+
+if __name__=='__main__':
+    test__simplifier__foldAndIdentities()
+    test__simplifier__afterSubstituteAndBudget()
+    test__simplifier__powerOfPowerNegativeBase()
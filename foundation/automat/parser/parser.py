@@ -1,11 +1,22 @@
 from abc import ABC
-import copy
+from hashlib import blake2b
+import os
+import pickle
+import tempfile
+import threading
+
+from foundation.automat.common.lrucache import LRUCache
+from foundation.automat.common.persistentmap import PersistentMap
 
 
 class Parser(ABC):
     """
     Abstract class for :class:`Equation` to parse an equation string
 
+    Results of :meth:`parse` are kept in Parser.PARSE_CACHE, shared by the whole process, keyed by (parserName,
+    normalised equation string), so the same equation string is only parsed once (the Latexparser has many stages).
+    Use :meth:`configureCache` to change its size, or to also keep the results in a folder, across restarts.
+
     :param parserName: the name of the parser
     :type parserName: str
     """
@@ -14,6 +25,11 @@ class Parser(ABC):
         'latex':'Latexparser',
         'html':'Htmlparser'
     }
+    PARSE_CACHE = LRUCache(maxSize=1024)
+    PARSE_CACHE_DIRECTORY = None # folder of the disk cache, None for no disk cache
+    PARSE_CACHE_VERSION = 2 # change when the parse results change, so that old files on disk are not used
+    diskHits = 0
+    _DISK_HITS_LOCK = threading.Lock()
 
     def __init__(self, parserName):
         """
@@ -28,7 +44,10 @@ class Parser(ABC):
     def parse(self, equationStr):
         """
         get the parser class lazily (because of circular import)
-        and then initialises it
+        and then initialises it. Looks in Parser.PARSE_CACHE (and the disk cache) first.
+
+        The cache keeps the rows of the ast as tuples, so no caller can change them, the ast returned is a new
+        :class:`PersistentMap` with the rows as lists, functions and variables are copies, so they can be changed
 
         :param equationStr: equation string to be parsed to ast
         :type equationStr: str
@@ -39,18 +58,120 @@ class Parser(ABC):
             - primitives (amount of primitives there are in the equation
             - totalNodeCount (total number of nodes in the ast)
         :rtype: tuple[
-            dict[tuple[str, int], list[tuple[str, int]]],
+            :class:`PersistentMap`,
             dict[str, int],
             dict[str, int],
             int,
             int]
         """
-        # will raise exception if parserName not in PARSERNAME_PARSERCLASSSTR
-        # actual parsing is done in individual child class
-        from foundation.automat.parser.sorte import Schemeparser, Latexparser, Htmlparser  #prevents circular import
-        parser = globals()[self.PARSERNAME_PARSERCLASSSTR[self.parserName]](equationStr)
-        ast, functions, variables, primitives, totalNodeCount = parser._parse()
-        return ast, functions, variables, primitives, totalNodeCount
+        equationStr = self.normalise(equationStr)
+        cacheKey = (self.parserName, equationStr)
+        cached = Parser.PARSE_CACHE.get(cacheKey)
+        if cached is None and Parser.PARSE_CACHE_DIRECTORY is not None:
+            cached = self._readDiskCache(cacheKey)
+            if cached is not None:
+                with Parser._DISK_HITS_LOCK:
+                    Parser.diskHits += 1
+                Parser.PARSE_CACHE.put(cacheKey, cached)
+        if cached is None:
+            # will raise exception if parserName not in PARSERNAME_PARSERCLASSSTR
+            # actual parsing is done in individual child class
+            from foundation.automat.parser.sorte import Schemeparser, Latexparser, Htmlparser  #prevents circular import
+            parser = locals()[self.PARSERNAME_PARSERCLASSSTR[self.parserName]](equationStr)
+            if hasattr(parser, 'totalNodeCount'): # already parsed in the constructor
+                ast, functions, variables, primitives, totalNodeCount = (
+                    parser.ast, parser.functions, parser.variables, parser.primitives, parser.totalNodeCount)
+            else:
+                ast, functions, variables, primitives, totalNodeCount = parser._parse()
+            cached = (self._frozenRows(ast), functions, variables, primitives, totalNodeCount)
+            Parser.PARSE_CACHE.put(cacheKey, cached)
+            if Parser.PARSE_CACHE_DIRECTORY is not None:
+                self._writeDiskCache(cacheKey, cached)
+        rows, functions, variables, primitives, totalNodeCount = cached
+        ast = PersistentMap.fromMapping(dict((node, list(children)) for node, children in rows.items()))
+        return ast, dict(functions), dict(variables), primitives, totalNodeCount
+
+    @classmethod
+    def _frozenRows(cls, ast):
+        """
+        :return: the rows of ast, as tuples, for the cache
+        :rtype: dict[tuple[str, int], tuple[tuple[str, int]]]
+        """
+        return dict((node, tuple(children)) for node, children in ast.items())
+
+    @classmethod
+    def normalise(cls, equationStr):
+        """
+        the form of equationStr that is parsed, and used in the key of PARSE_CACHE, whitespace around the equation
+        is removed
+        """
+        return equationStr.strip()
+
+    @classmethod
+    def configureCache(cls, maxSize=1024, directory=None):
+        """
+        replaces Parser.PARSE_CACHE with an empty one of maxSize entries
+
+        :param maxSize: maximum number of parse results kept in memory
+        :type maxSize: int
+        :param directory: folder to also keep the parse results in, across restarts, None for no disk cache
+        :type directory: str
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        Parser.PARSE_CACHE = LRUCache(maxSize=maxSize)
+        Parser.PARSE_CACHE_DIRECTORY = directory
+        with Parser._DISK_HITS_LOCK:
+            Parser.diskHits = 0
+
+    @classmethod
+    def cacheStats(cls):
+        """
+        :return: hits, misses, evictions of Parser.PARSE_CACHE, diskHits (misses in memory, found on disk), size and
+        hitRate (of the memory cache, 0 if nothing was parsed)
+        :rtype: dict[str, float]
+        """
+        cache = Parser.PARSE_CACHE
+        lookups = cache.hits + cache.misses
+        return {
+            'hits':cache.hits,
+            'misses':cache.misses,
+            'evictions':cache.evictions,
+            'diskHits':Parser.diskHits,
+            'size':len(cache),
+            'hitRate':cache.hits / lookups if lookups > 0 else 0,
+        }
+
+    @classmethod
+    def _diskCachePath(cls, cacheKey):
+        digest = blake2b(repr((cls.PARSE_CACHE_VERSION, cacheKey)).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(Parser.PARSE_CACHE_DIRECTORY, f'{digest}.pickle')
+
+    @classmethod
+    def _readDiskCache(cls, cacheKey):
+        """
+        :return: the parse result of cacheKey from the disk cache, None if it is not there (or unreadable)
+        :rtype: tuple
+        """
+        try:
+            with open(cls._diskCachePath(cacheKey), 'rb') as file:
+                storedKey, ast, functions, variables, primitives, totalNodeCount = pickle.load(file)
+        except Exception: # not there, or written by a different version
+            return None
+        if storedKey != cacheKey: # digest collision
+            return None
+        return (cls._frozenRows(ast), functions, variables, primitives, totalNodeCount)
+
+    @classmethod
+    def _writeDiskCache(cls, cacheKey, cached):
+        """
+        writes to a temporary file first, then renames it, so that other processes never read half a file
+        """
+        rows, functions, variables, primitives, totalNodeCount = cached
+        fileDescriptor, temporaryPath = tempfile.mkstemp(dir=Parser.PARSE_CACHE_DIRECTORY)
+        with os.fdopen(fileDescriptor, 'wb') as file:
+            pickle.dump((cacheKey, rows, functions, variables, primitives, totalNodeCount), file)
+        os.replace(temporaryPath, cls._diskCachePath(cacheKey))
 
 
 
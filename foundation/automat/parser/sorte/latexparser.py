@@ -1,7 +1,7 @@
 import inspect
 import multiprocessing as mp # TODO for Django, we might need to re-int  Django
 
-from foundation.automat.common import findAllMatches, isNum, lenOrZero, EnclosureTree
+from foundation.automat.common import findAllMatches, isNum, lenOrZero, EnclosureTree, Traversal
 from foundation.automat.arithmetic.function import Function
 from foundation.automat.parser.parser import Parser
 
@@ -3225,13 +3225,25 @@ $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$incomplete code to check variable_depende
 
 
     def _recursiveUnparse(self, keyTuple):
+        """
+        not recursive anymore (see :meth:`Traversal.foldUp`), so deep ASTs can be unparsed, kept the name for callers
+        """
+        return Traversal.foldUp(
+            self.ast, keyTuple,
+            lambda leaf: self._unparseNode(leaf, []),
+            self._unparseNode)
+
+    def _unparseNode(self, keyTuple, arguments):
+        """
+        :param arguments: unparsed arguments of keyTuple, from left to right
+        :type arguments: list[str]
+        """
         #~DRAFT~#
         name = keyTuple[0]
         #does not include backslash_variable although they are the real leaves. TODO have a consolidated AST, and a LatexAST...
         if name in self.leaves: # TODO, rename self.leaves to something ChildClass specific (confusing later)
             return name # return the namestr
         nid = keyTuple[1]
-        arguments = self.ast[keyTuple]
         if name in self.backslashes:
             aux = self.backslashes[name]
             """
@@ -3248,11 +3260,11 @@ $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$incomplete code to check variable_depende
             """
              # what about \sqrt, \log, \ln....
             if aux['hasArgument1'] and aux['hasArgument2']:
-                return f"\\{name}{aux['argument1SubSuper']}{aux['argument1OpenBracket']}{self._recursiveUnparse(arguments[0])}{aux['argument1CloseBracket']}{aux['argument2SubSuper']}{aux['argument2OpenBracket']}{self._recursiveUnparse(arguments[1])}{aux['argument2CloseBracket']}"
+                return f"\\{name}{aux['argument1SubSuper']}{aux['argument1OpenBracket']}{arguments[0]}{aux['argument1CloseBracket']}{aux['argument2SubSuper']}{aux['argument2OpenBracket']}{arguments[1]}{aux['argument2CloseBracket']}"
             elif aux['hasArgument1']:
-                return f"\\{name}{aux['argument1SubSuper']}{aux['argument1OpenBracket']}{self._recursiveUnparse(arguments[0])}{aux['argument1CloseBracket']}"
+                return f"\\{name}{aux['argument1SubSuper']}{aux['argument1OpenBracket']}{arguments[0]}{aux['argument1CloseBracket']}"
             elif aux['hasArgument2']:
-                return f"\\{name}{aux['argument2SubSuper']}{aux['argument2OpenBracket']}{self._recursiveUnparse(arguments[1])}{aux['argument2CloseBracket']}"
+                return f"\\{name}{aux['argument2SubSuper']}{aux['argument2OpenBracket']}{arguments[1]}{aux['argument2CloseBracket']}"
             else:
                 return f"\\{name}"
 
@@ -3266,7 +3278,7 @@ $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$incomplete code to check variable_depende
                 'rightCloseBracket':rightCloseBracket,
             }
             """
-            return f"\\{aux['leftOpenBracket']}{self._recursiveUnparse(arguments[0])}{aux['leftCloseBracket']}{name}{aux['rightOpenBracket']}{self._recursiveUnparse(arguments[1])}{aux['rightCloseBracket']}"#need to get the brackets....
+            return f"\\{aux['leftOpenBracket']}{arguments[0]}{aux['leftCloseBracket']}{name}{aux['rightOpenBracket']}{arguments[1]}{aux['rightCloseBracket']}"#need to get the brackets....
         raise Exception(f'Unhandled {keyTuple}')
 
     def latexToScheme(self):
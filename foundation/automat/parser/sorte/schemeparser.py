@@ -1,5 +1,5 @@
 from foundation.automat.arithmetic.function import Function
-from foundation.automat.common import Backtracker, findAllMatches, isNum, lenOrZero
+from foundation.automat.common import Backtracker, Traversal, findAllMatches, isNum, lenOrZero
 from foundation.automat.parser.parser import Parser
 
 class Schemeparser(Parser):
@@ -16,6 +16,7 @@ class Schemeparser(Parser):
             self.ast, self.functions, self.variables, self.primitives, self.totalNodeCount = self._parse()
         else:
             self.ast = ast
+            self.equalTuple = None
 
     def _parse(self):
         """
@@ -39,6 +40,7 @@ class Schemeparser(Parser):
             int,
             int]
         """
+        Function.gatherStandardFunctions() # so that Function.FUNC_NAMES is filled
         functionsD = {}# function(str) to no_of_such_functions in the ast(int)
         variablesD = {}# variable(str) to no_of_such_variables in the ast(int)
         primitives = 0#count of the number of primitives in the ast
@@ -49,12 +51,10 @@ class Schemeparser(Parser):
         ast = {}
         if self.verbose:
             print(f'return from _recursiveParse************* initialised ast: {ast}')
-        currentId = 0
-        stack = [{'bt':backtrackerRoot, 'tid':currentId}]
-        while len(stack) != 0:
-            currentBt = stack.pop(0)
-            tid = currentBt['tid']
-            current = currentBt['bt']
+        tids = {} # id(Backtracker) to the id of its node in the ast, nodes are numbered in level order
+        childrenOf = lambda bt: sorted(bt.neighbours, key=lambda neigh: neigh.argumentIdx, reverse=False)
+        for tid, (current, parentBt, argumentIdx) in enumerate(Traversal.levelOrder(None, backtrackerRoot, childrenOf=childrenOf)):
+            tids[id(current)] = tid
             if self.verbose:
                 print(f'label: {current.label}, argumentIdx: {current.argumentIdx}, id: {current.id}, tid:{tid}')
             #do the tabulating
@@ -66,26 +66,18 @@ class Schemeparser(Parser):
             else: # is a variable
                 variablesD[current.label] = variablesD.get(current.label, 0) + 1
             #end of tabulating
-            #node = (current.label, id)
-            #ast[node] = ast.get(node, []) + current.neighbours
-            #id += 1
-            thisNodeId = currentId
-            neighbourNodes = []
-            for neighbour in sorted(current.neighbours, key=lambda neigh: neigh.argumentIdx, reverse=False):
-                currentId += 1
-                neighbourNodes.append((neighbour.label, currentId))
-                stack.append({'bt':neighbour, 'tid':currentId})
-            currentNode = (current.label, (current.argumentIdx, current.id))
+            if parentBt is not None: # leaves are never keys, children come in order
+                ast.setdefault((parentBt.label, tids[id(parentBt)]), []).append((current.label, tid))
             if self.verbose:
-                print(f'ast: {ast}, currentNode: {currentNode}')
-            if len(neighbourNodes) > 0: # avoid putting leaves as keys
-                ast[(current.label, tid)] = neighbourNodes
+                print(f'ast: {ast}, currentNode: {(current.label, tid)}')
 
         return ast, functionsD, variablesD, primitives, totalNodeCount
 
     def _recursiveParse(self, eqs, level):
         """
-        Handles the syntex of 'Scheme', but just stores the tree in the memory stack of the process/thread
+        Handles the syntex of 'Scheme', but just stores the tree in the memory stack of the process/thread.
+        Not recursive anymore, the procedures that are still open are kept on a stack while going through the
+        brackets, so deep equations can be parsed, kept the name for callers
 
         :param eqs: the equation string to be parsed
         :type eqs: str
@@ -99,68 +91,46 @@ class Schemeparser(Parser):
         if (eqs.startswith('(') and not eqs.endswith(')')) or \
                 (not eqs.startswith('(') and eqs.endswith(')')):
             raise Exception('Closing Brackets Mismatch')
-
-        if eqs.startswith('('): # then it is a procedure
-            strippedEqs = eqs[1:-1] # remove start and end brackets
-            #find procedure label and end position of procedure label
-            procedureLabel = ''
-            procedureEndPosition = None
-            for idx, c in enumerate(strippedEqs):
-                if c == ' ': # is a space...
-                    procedureEndPosition = idx
-                    break
-                procedureLabel += c
-            argumentsStr = strippedEqs[procedureEndPosition:].strip()
-            if self.verbose:
-                print(f'argumentsStr: {argumentsStr}')
-            #find individual arguments START
-            bracketCounter = 0 #+1 for '(', -1 for ')'
-            currentArgumentStr = ''
-            arguments = []
-            for c in argumentsStr:
-                if self.veryVerbose:
-                    print(c, currentArgumentStr, c == ' ', bracketCounter == 0, '<<<<<<<<<<<<<<12<<<<<<<<<')  
-                currentArgumentStr += c
-                if c == '(':
-                    bracketCounter += 1
-                elif c == ')':
-                    bracketCounter -= 1
-                if c == ' ' and bracketCounter == 0: # (brackets are balanced) and this character c is a space
-                    if self.veryVerbose:
-                        print(c, currentArgumentStr, c == ' ', bracketCounter == 0, '<<<<<<<<<<<<<<<<<<<<<<<')
-                    currentArgumentStr = currentArgumentStr.strip()
-                    if len(currentArgumentStr) > 0:
-                        arguments.append(currentArgumentStr)
-                        currentArgumentStr = ''
-            if len(currentArgumentStr) > 0: # left-overs, please eat!
-                arguments.append(currentArgumentStr)
-            #find individual argumets END
-            if self.verbose:
-                print(f'level: {level}, arguments: {arguments}')
-            neighbours = []
-            for argumentIdx, backtrackNeighbour in enumerate(map(lambda argu: self._recursiveParse(argu, level+1), arguments)):
+        rootNode = None
+        openProcedures = [] # [procedureLabel, neighbours, level] of each procedure whose ')' is not reached yet
+        for token in findAllMatches(r'\(|\)|[^ ()]+', eqs):
+            token = token.group()
+            if token == '(': # then it is a procedure
+                openProcedures.append([None, [], level + len(openProcedures)])
+                continue
+            if token == ')':
+                if len(openProcedures) == 0:
+                    raise Exception('Closing Brackets Mismatch')
+                procedureLabel, neighbours, depthId = openProcedures.pop()
+                node = Backtracker(
+                    procedureLabel, # label
+                    neighbours, # neighbours
+                    0,#  argumentIdx, set below, when it is added to its parent
+                    None, #prev, not used
+                    depthId, #id,   (depthId)
+                )
+            elif len(openProcedures) > 0 and openProcedures[-1][0] is None: # first token after '(' is the procedure label
+                openProcedures[-1][0] = token
+                continue
+            else:#primitive or variable
+                node = Backtracker(
+                    token, # label
+                    [], # neighbours
+                    0, # not used, argumentIdx
+                    None, # not used, prev
+                    level + len(openProcedures) # not used, id
+                )
+            if len(openProcedures) > 0:
+                node.argumentIdx = len(openProcedures[-1][1])
+                openProcedures[-1][1].append(node)
                 if self.verbose:
-                    print(f'recursive level: {level}, eqs: {eqs}, argumentIdx: {argumentIdx}, id: {backtrackNeighbour.id}, label: {backtrackNeighbour.label}')
-                backtrackNeighbour.argumentIdx = argumentIdx
-                neighbours.append(backtrackNeighbour)
-            rootNode = Backtracker(
-                procedureLabel, # label
-                neighbours, # neighbours
-                0,#  argumentIdx, will be set by calling process (self._recursiveParse)
-                None, #prev, not used
-                level, #id,   (depthId)
-            )
-            #for backtrackNeighbour in neighbours:
-            #    backtrackNeighbour.prev = rootNode
-
-        else:#primitive or variable
-            rootNode = Backtracker(
-                eqs, # label
-                [], # neighbours
-                0, # not used, argumentIdx
-                None, # not used, prev
-                level # not used, id
-            )
+                    print(f'level: {openProcedures[-1][2]}, argumentIdx: {node.argumentIdx}, label: {node.label}')
+            elif rootNode is None:
+                rootNode = node
+            else: # more than one tree
+                raise Exception('Closing Brackets Mismatch')
+        if len(openProcedures) > 0 or rootNode is None:
+            raise Exception('Closing Brackets Mismatch')
         return rootNode
 
     def _findEqualTuple(self):
@@ -184,10 +154,13 @@ class Schemeparser(Parser):
         return self._recursiveUnparse(self.ast, self.equalTuple)
 
     def _recursiveUnparse(self, subAST, keyTuple):
-        if keyTuple not in subAST: # is Leaf
-            return keyTuple[0] # return the key, discard the ID
-        argumentStr = ' '.join([self._recursiveUnparse(subAST, argumentTuple) for argumentTuple in subAST[keyTuple]])
-        return f"({keyTuple[0]} {argumentStr})"
+        """
+        not recursive anymore (see :meth:`Traversal.foldUp`), so deep ASTs can be unparsed, kept the name for callers
+        """
+        return Traversal.foldUp(
+            subAST, keyTuple,
+            lambda leaf: leaf[0], # return the key, discard the ID
+            lambda node, argumentStrs: f"({node[0]} {' '.join(argumentStrs)})")
 
 
     def _toLatex(self):
@@ -0,0 +1,49 @@
+import inspect
+import pprint
+import tempfile
+
+from foundation.automat.parser.parser import Parser
+
+
+def test__parser__parseCache(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    Parser.configureCache(maxSize=2)
+    ast0, functions0, variables0, primitives0, totalNodeCount0 = Parser('scheme').parse('(= a (+ b c))')
+    functions0['+'] = 100 # copies, the cache is not changed
+    ast0[('=', 0)].append(('zzz', 99)) # rows are copies too
+    ast1, functions1, variables1, primitives1, totalNodeCount1 = Parser('scheme').parse(' (= a (+ b c))\n')
+    Parser('scheme').parse('(= a (- b c))')
+    Parser('scheme').parse('(= a (* b c))') # evicts (= a (+ b c))
+    stats = Parser.cacheStats()
+    if verbose:
+        pp.pprint(stats)
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        ast1 is not ast0 and dict(ast1) == {('=', 0):[('a', 1), ('+', 2)], ('+', 2):[('b', 3), ('c', 4)]} and
+        functions1 == {'+':1} and
+        stats['hits'] == 1 and stats['misses'] == 3 and stats['evictions'] == 1 and stats['hitRate'] == 0.25
+    ))
+    Parser.configureCache()
+
+
+def test__parser__diskCache(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Parser.configureCache(directory=directory)
+        parsed = Parser('scheme').parse('(= (/ 1 a) (+ (/ 1 b) (/ 1 c)))')
+        Parser.configureCache(directory=directory) # like a restart, memory cache is empty
+        reloaded = Parser('scheme').parse('(= (/ 1 a) (+ (/ 1 b) (/ 1 c)))')
+        stats = Parser.cacheStats()
+        if verbose:
+            pp.pprint(stats)
+        Parser.configureCache()
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        dict(reloaded[0]) == dict(parsed[0]) and reloaded[1:] == parsed[1:] and
+        stats['diskHits'] == 1 and stats['misses'] == 1
+    ))
+
+
+if __name__=='__main__':
+    test__parser__parseCache()
+    test__parser__diskCache()
@@ -97,9 +97,35 @@ def test__schemeParserTest__earlyEffectModel(verbose=False):
     unparsedStr = parser._unparse()
     print(inspect.currentframe().f_code.co_name, ' PASSED? ', (equationStr==unparsedStr) and (ast==expected_ast))
 
+
+def test__schemeParserTest__deepEquation(verbose=False):
+    pp = pprint.PrettyPrinter(indent=4)
+
+    depth = 1500 # deeper than the recursion limit
+    equationStr = '(= y ' + '(+ 1 ' * depth + 'x' + ')' * depth + ')'
+    parser = Schemeparser(equationStr=equationStr)
+    ast = parser.ast
+    mismatched = []
+    for badStr in ['(= y (+ 1 x)', '(= y (+ 1 x)))', '(= y x) (= z x)']:
+        try:
+            Schemeparser(equationStr=badStr)
+            mismatched.append(False)
+        except Exception:
+            mismatched.append(True)
+    if verbose:
+        pp.pprint(ast[('=', 0)])
+    print(inspect.currentframe().f_code.co_name, ' PASSED? ', (
+        len(ast) == depth + 1 and parser.totalNodeCount == 2 * depth + 3 and
+        parser.functions == {'+':depth} and parser.primitives == depth and
+        ast[('=', 0)] == [('y', 1), ('+', 2)] and ast[('+', 2)] == [('1', 3), ('+', 4)] and
+        parser._unparse() == equationStr and
+        mismatched == [True, True, True]
+    ))
+
 if __name__=='__main__':
     test__schemeParserTest__add()
     test__schemeParserTest__harmonicMean()
     test__schemeParserTest__phasorDiagram()
     test__schemeParserTest__ebersMollModelp1()
-    test__schemeParserTest__earlyEffectModel()
\ No newline at end of file
+    test__schemeParserTest__earlyEffectModel()
+    test__schemeParserTest__deepEquation()
\ No newline at end of file